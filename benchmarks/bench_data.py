@@ -0,0 +1,53 @@
+"""Benchmarks for the lazy list, ``L``.
+"""
+from lazy.data import L
+
+from harness import benchmark
+
+
+_sizes = tuple(10 ** n for n in range(3, 8))
+
+
+def _size(n):
+    return n
+
+
+def _list(n):
+    # ``L[0, ..., n - 1]`` produces the elements on demand
+    return L[0, ..., n - 1]
+
+
+@benchmark(params=_sizes, ops=_size, size=_size)
+def iterate(n):
+    xs = _list(n)
+
+    def run():
+        for _ in xs:
+            pass
+
+    return run
+
+
+@benchmark(params=_sizes, ops=_size, size=_size)
+def iterate_forced(n):
+    xs = _list(n)
+    for _ in xs:
+        pass
+
+    def run():
+        for _ in xs:
+            pass
+
+    return run
+
+
+@benchmark(params=_sizes, ops=_size, size=_size)
+def index_last(n):
+    xs = _list(n)
+    return lambda: xs[n - 1]
+
+
+@benchmark(params=_sizes, ops=_size, size=_size)
+def len_(n):
+    xs = _list(n)
+    return lambda: len(xs)
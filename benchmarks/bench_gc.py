@@ -0,0 +1,49 @@
+"""Benchmarks for the time the garbage collector takes with large graphs of
+thunks alive.
+"""
+import gc
+
+from lazy import strict_many, thunk
+
+from harness import benchmark
+
+
+_sizes = 10000, 100000, 1000000
+
+
+def _pending(n):
+    one = thunk.fromexpr(1)
+    return [one + m for m in range(n)]
+
+
+def _collect(graph):
+    def run():
+        # hold the graph alive while collecting
+        graph
+        gc.collect()
+
+    return run
+
+
+@benchmark(params=_sizes, size=lambda n: n, memory=False)
+def collect_pending(n):
+    """A pending graph over numbers.
+    """
+    return _collect(_pending(n))
+
+
+@benchmark(params=_sizes, size=lambda n: n, memory=False)
+def collect_forced(n):
+    """The same graph after it has been evaluated.
+    """
+    graph = _pending(n)
+    strict_many(graph)
+    return _collect(graph)
+
+
+@benchmark(params=_sizes, size=lambda n: n, memory=False)
+def collect_containers(n):
+    """A graph over lists, which must stay tracked.
+    """
+    empty = thunk.fromexpr([])
+    return _collect([empty + [m] for m in range(n)])
@@ -0,0 +1,31 @@
+"""Benchmarks for the time to import ``lazy`` in a new interpreter.
+"""
+import os
+import subprocess
+import sys
+
+from harness import benchmark
+
+
+# The number of interpreters started for each sample.
+_starts = 10
+
+_code = {
+    # the cost of starting the interpreter
+    'baseline': 'pass',
+    'lazy': 'import lazy',
+    'lazy_function': 'import lazy; lazy.lazy_function',
+}
+
+_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@benchmark(params=tuple(_code), ops=lambda name: _starts, memory=False)
+def import_(name):
+    argv = [sys.executable, '-c', _code[name]]
+
+    def run():
+        for _ in range(_starts):
+            subprocess.check_call(argv, cwd=_root)
+
+    return run
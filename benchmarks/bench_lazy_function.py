@@ -0,0 +1,84 @@
+"""Benchmarks for transforming functions with ``lazy_function`` and for
+calling the transformed functions.
+"""
+from lazy import lazy_function, strict
+
+from harness import benchmark
+
+
+# The number of calls made by each call benchmark.
+_calls = 10000
+
+
+def _small(a, b):
+    return a + b
+
+
+def _medium(a, b, c=1):
+    xs = [a * n + b for n in range(c)]
+    d = {'a': a, 'b': b}
+    if a is None:
+        return d
+    return (a + b) * c - d['a'], xs, not b
+
+
+@benchmark(params=('small', 'medium'), ops=lambda size: 100)
+def decorate(size):
+    f = {'small': _small, 'medium': _medium}[size]
+
+    def run():
+        for _ in range(100):
+            lazy_function(f)
+
+    return run
+
+
+@benchmark(
+    params=('plain', 'build', 'build_and_strict'),
+    ops=lambda kind: _calls,
+)
+def call_small(kind):
+    plain = _small
+    # call the function directly, not through the thunk that boxes it
+    lazy = strict(lazy_function(_small))
+    ns = range(_calls)
+
+    if kind == 'plain':
+        def run():
+            for n in ns:
+                plain(n, 1)
+    elif kind == 'build':
+        def run():
+            for n in ns:
+                lazy(n, 1)
+    else:
+        def run():
+            for n in ns:
+                strict(lazy(n, 1))
+
+    return run
+
+
+@benchmark(
+    params=('plain', 'build', 'build_and_strict'),
+    ops=lambda kind: _calls,
+)
+def call_medium(kind):
+    plain = _medium
+    lazy = strict(lazy_function(_medium))
+    ns = range(_calls)
+
+    if kind == 'plain':
+        def run():
+            for n in ns:
+                plain(n, 1, 3)
+    elif kind == 'build':
+        def run():
+            for n in ns:
+                lazy(n, 1, 3)
+    else:
+        def run():
+            for n in ns:
+                strict(lazy(n, 1, 3))
+
+    return run
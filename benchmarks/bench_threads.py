@@ -0,0 +1,79 @@
+"""Benchmarks for forcing thunks from many threads at once.
+
+With the GIL these show the cost of the single-flight bookkeeping, on a
+free-threaded build they show how the throughput scales with the number of
+threads.
+"""
+import operator as op
+import threading
+
+from lazy import strict_many, thunk
+
+from harness import benchmark
+
+
+# The number of thunks forced by each thread.
+_nodes = 20000
+
+_threads = 1, 2, 4, 8
+
+
+def _graph():
+    one = thunk.fromexpr(1)
+    return [thunk(op.add, one, n) for n in range(_nodes)]
+
+
+def _run_threads(targets):
+    threads = [threading.Thread(target=target) for target in targets]
+
+    def run():
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    return run
+
+
+@benchmark(
+    params=_threads,
+    ops=lambda threads: threads * _nodes,
+    size=lambda threads: threads * _nodes,
+)
+def force_private(threads):
+    """Each thread forces its own graph.
+    """
+    return _run_threads(
+        [lambda graph=_graph(): strict_many(graph) for _ in range(threads)],
+    )
+
+
+@benchmark(
+    params=_threads,
+    ops=lambda threads: _nodes,
+    size=lambda threads: _nodes,
+)
+def force_shared(threads):
+    """Every thread forces the same graph, each node is evaluated once.
+    """
+    graph = _graph()
+    return _run_threads([lambda: strict_many(graph)] * threads)
+
+
+@benchmark(
+    params=_threads,
+    ops=lambda threads: _nodes,
+    size=lambda threads: _nodes,
+)
+def force_shared_reversed(threads):
+    """Half of the threads force the same graph in the opposite order so the
+    threads meet in the middle and wait on each other.
+    """
+    graph = _graph()
+    backwards = graph[::-1]
+    return _run_threads([
+        (lambda: strict_many(graph))
+        if n % 2 else
+        (lambda: strict_many(backwards))
+        for n in range(threads)
+    ])
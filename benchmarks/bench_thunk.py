@@ -0,0 +1,130 @@
+"""Benchmarks for building and forcing thunks.
+"""
+import operator as op
+
+from lazy import strict, thunk
+
+from harness import benchmark
+
+
+# The number of thunks built by each creation benchmark.
+_creations = 100000
+
+_binary_slots = (
+    'add',
+    'sub',
+    'mul',
+    'matmul',
+    'truediv',
+    'floordiv',
+    'mod',
+    'pow',
+    'lshift',
+    'rshift',
+    'and_',
+    'or_',
+    'xor',
+    'lt',
+    'le',
+    'eq',
+    'ne',
+    'gt',
+    'ge',
+    'getitem',
+)
+_unary_slots = 'neg', 'pos', 'abs', 'invert'
+
+
+@benchmark(params=_binary_slots, ops=lambda slot: _creations)
+def create_binary(slot):
+    func = getattr(op, slot)
+    a = thunk.fromexpr(1)
+    b = thunk.fromexpr(2)
+    ns = range(_creations)
+
+    def run():
+        for _ in ns:
+            func(a, b)
+
+    return run
+
+
+@benchmark(params=_unary_slots, ops=lambda slot: _creations)
+def create_unary(slot):
+    func = getattr(op, slot)
+    a = thunk.fromexpr(1)
+    ns = range(_creations)
+
+    def run():
+        for _ in ns:
+            func(a)
+
+    return run
+
+
+@benchmark(params=('call', 'getattr', 'new', 'fromexpr'),
+           ops=lambda kind: _creations)
+def create_other(kind):
+    a = thunk.fromexpr(1)
+    f = thunk.fromexpr(op.neg)
+    ns = range(_creations)
+
+    if kind == 'call':
+        def run():
+            for _ in ns:
+                f(a)
+    elif kind == 'getattr':
+        def run():
+            for _ in ns:
+                a.real
+    elif kind == 'new':
+        def run():
+            for _ in ns:
+                thunk(op.neg, a)
+    else:
+        def run():
+            for n in ns:
+                thunk.fromexpr(n)
+
+    return run
+
+
+@benchmark(
+    params=(10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6),
+    ops=lambda n: n,
+    size=lambda n: n,
+)
+def strict_wide(n):
+    # one thunk with ``n`` pending children
+    expr = thunk(
+        lambda *args: len(args),
+        *(thunk(op.add, m, 1) for m in range(n))
+    )
+    return lambda: strict(expr)
+
+
+@benchmark(
+    params=(10 ** 2, 5 * 10 ** 2, 10 ** 3, 10 ** 4),
+    ops=lambda n: n,
+    size=lambda n: n,
+)
+def strict_deep(n):
+    # a chain of ``n`` pending additions
+    expr = thunk.fromexpr(0)
+    for _ in range(n):
+        expr = expr + 1
+    return lambda: strict(expr)
+
+
+@benchmark(
+    params=(10, 14, 18),
+    ops=lambda depth: depth,
+    size=lambda depth: depth,
+)
+def strict_shared(depth):
+    # ``depth`` levels where each level uses the previous level twice, there
+    # are ``2 ** depth`` paths through the graph but only ``depth`` thunks
+    expr = thunk.fromexpr(1)
+    for _ in range(depth):
+        expr = expr + expr
+    return lambda: strict(expr)
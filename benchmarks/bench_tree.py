@@ -0,0 +1,42 @@
+"""Benchmarks for converting expressions to and from ``LTree``.
+
+The expressions are DAGs where each level uses the previous level twice, so
+they have ``depth`` thunks but ``2 ** depth`` paths from the root.
+"""
+from lazy import thunk
+from lazy.tree import LTree, fold_subexprs
+
+from harness import benchmark
+
+
+_depths = 8, 12, 16
+
+
+def _tree_size(depth):
+    # the tree does not share nodes, so it has a node for each path
+    return 2 ** depth
+
+
+def _shared_dag(depth):
+    expr = thunk.fromexpr(1)
+    for _ in range(depth):
+        expr = expr + expr
+    return expr
+
+
+@benchmark(params=_depths, ops=lambda depth: depth, size=_tree_size)
+def parse(depth):
+    expr = _shared_dag(depth)
+    return lambda: LTree.parse(expr)
+
+
+@benchmark(params=_depths, ops=lambda depth: depth, size=_tree_size)
+def lcompile(depth):
+    tree = LTree.parse(_shared_dag(depth))
+    return tree.lcompile
+
+
+@benchmark(params=_depths, ops=lambda depth: depth, size=_tree_size)
+def fold(depth):
+    expr = _shared_dag(depth)
+    return lambda: fold_subexprs(expr)
@@ -0,0 +1,230 @@
+"""Registration, timing, and comparison of benchmarks.
+
+A benchmark is a function which takes a single parameter, does any setup,
+and returns a function of no arguments to time. The setup is run again
+before every sample so the timed function may consume its inputs, for
+example by forcing a graph of thunks.
+"""
+from collections import OrderedDict
+import gc
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+
+# name -> Benchmark
+registry = OrderedDict()
+
+
+class Benchmark:
+    """A registered benchmark.
+
+    Parameters
+    ----------
+    group : str
+        The name of the module the benchmark is defined in.
+    func : callable[any -> callable[[], any]]
+        The function which sets up the benchmark.
+    params : iterable[any]
+        The parameters to run the benchmark with.
+    ops : callable[any -> int]
+        The number of operations the timed function does for a parameter,
+        used to report the time per operation.
+    size : callable[any -> int] or None
+        The number of elements for a parameter, used to skip sizes above
+        ``--max-size``.
+    memory : bool
+        Should the peak memory of the timed function be measured?
+    """
+    def __init__(self, group, func, params, ops, size, memory):
+        self.group = group
+        self.func = func
+        self.params = tuple(params)
+        self.ops = ops
+        self.size = size
+        self.memory = memory
+
+    def names(self):
+        """The name of the benchmark for each parameter.
+        """
+        for param in self.params:
+            yield '%s.%s[%s]' % (self.group, self.func.__name__, param), param
+
+
+def benchmark(params=(None,), ops=None, size=None, memory=True):
+    """Register a benchmark.
+
+    Parameters
+    ----------
+    params : iterable[any], optional
+        The parameters to run the benchmark with.
+    ops : callable[any -> int], optional
+        The number of operations the timed function does for a parameter.
+        By default each call is one operation.
+    size : callable[any -> int], optional
+        The number of elements for a parameter. By default ``--max-size``
+        does not apply.
+    memory : bool, optional
+        Should the peak memory of the timed function be measured?
+
+    Returns
+    -------
+    decorator : callable
+        The decorator which registers the benchmark function.
+    """
+    def decorator(f):
+        group = f.__module__.rpartition('.')[2]
+        if group.startswith('bench_'):
+            group = group[len('bench_'):]
+
+        bench = Benchmark(
+            group,
+            f,
+            params,
+            ops if ops is not None else (lambda param: 1),
+            size,
+            memory,
+        )
+        for name, _ in bench.names():
+            registry[name] = bench
+        return f
+
+    return decorator
+
+
+def _time_once(bench, param):
+    run = bench.func(param)
+    gc.collect()
+    start = time.perf_counter()
+    run()
+    return time.perf_counter() - start
+
+
+def _peak_memory(bench, param):
+    run = bench.func(param)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        run()
+        return tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        tracemalloc.stop()
+
+
+def run_benchmark(bench, param, repeat):
+    """Measure a benchmark for one parameter.
+
+    Parameters
+    ----------
+    bench : Benchmark
+        The benchmark to run.
+    param : any
+        The parameter to run the benchmark with.
+    repeat : int
+        The number of timing samples to take.
+
+    Returns
+    -------
+    result : dict
+        The samples in seconds, the min and median, the min time per
+        operation, and the peak memory in bytes. If the benchmark raises,
+        the result holds the error instead.
+    """
+    try:
+        times = [_time_once(bench, param) for _ in range(repeat)]
+        peak = _peak_memory(bench, param) if bench.memory else None
+    except Exception as e:
+        return {'error': '%s: %s' % (type(e).__name__, e)}
+
+    return {
+        'times': times,
+        'min': min(times),
+        'median': statistics.median(times),
+        'per_op': min(times) / bench.ops(param),
+        'peak_memory': peak,
+    }
+
+
+def metadata():
+    """Information about the environment the benchmarks ran in.
+    """
+    import lazy
+
+    try:
+        commit = subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'],
+            stderr=subprocess.DEVNULL,
+            universal_newlines=True,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        'python': sys.version,
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'lazy_version': lazy.__version__,
+        'commit': commit,
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+    }
+
+
+def compare(old, new, threshold):
+    """Compare the results of two runs.
+
+    Parameters
+    ----------
+    old, new : dict
+        The results loaded from the JSON files.
+    threshold : float
+        The relative change in the min time which is reported as faster
+        or slower.
+
+    Returns
+    -------
+    rows : list[tuple]
+        The name, old and new min times, time ratio, old and new peak
+        memory, and the verdict for each benchmark in both runs.
+    """
+    old = old['benchmarks']
+    new = new['benchmarks']
+    rows = []
+    for name in old:
+        if name not in new:
+            continue
+        a = old[name]
+        b = new[name]
+        if 'error' in a or 'error' in b:
+            rows.append((
+                name,
+                a.get('min'),
+                b.get('min'),
+                None,
+                a.get('peak_memory'),
+                b.get('peak_memory'),
+                'error',
+            ))
+            continue
+
+        # The min is the least affected by other work on the machine.
+        ratio = b['min'] / a['min']
+        if ratio < 1 - threshold:
+            verdict = 'faster'
+        elif ratio > 1 + threshold:
+            verdict = 'slower'
+        else:
+            verdict = ''
+        rows.append((
+            name,
+            a['min'],
+            b['min'],
+            ratio,
+            a['peak_memory'],
+            b['peak_memory'],
+            verdict,
+        ))
+    return rows
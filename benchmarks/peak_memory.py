@@ -0,0 +1,86 @@
+"""Compare the peak memory of ``strict`` and ``lazy.schedule.strict_scheduled``
+on a wide graph of large intermediate values.
+
+Each branch of the graph combines a large value which is held until the
+branch is combined with a second large value that is only needed to
+compute a small summary. ``strict`` evaluates the held value first, so it
+holds both large values at once. The scheduled evaluator computes the
+summary first.
+
+usage: python benchmarks/peak_memory.py [--branches N] [--size BYTES]
+"""
+import argparse
+import resource
+import subprocess
+import sys
+
+from lazy import thunk, strict
+from lazy.schedule import strict_scheduled
+
+
+def block(nbytes):
+    return b'x' * nbytes
+
+
+def summarize(data):
+    return data.count(b'x') % 7
+
+
+def combine(held, summary):
+    return len(held) + summary
+
+
+def total(*branches):
+    return sum(branches)
+
+
+def build(branches, size):
+    return thunk(total, *(
+        thunk(
+            combine,
+            thunk(block, size),
+            thunk(summarize, thunk(block, 2 * size)),
+        )
+        for _ in range(branches)
+    ))
+
+
+def run(evaluator, branches, size):
+    expr = build(branches, size)
+    {'strict': strict, 'scheduled': strict_scheduled}[evaluator](expr)
+    del expr
+    # ru_maxrss is in kilobytes on linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--branches', type=int, default=32)
+    parser.add_argument('--size', type=int, default=64 * 2 ** 20)
+    parser.add_argument('--evaluator', choices=('strict', 'scheduled'))
+    args = parser.parse_args(argv)
+
+    if args.evaluator is not None:
+        print(run(args.evaluator, args.branches, args.size))
+        return
+
+    results = {}
+    for evaluator in ('strict', 'scheduled'):
+        # run each evaluator in a fresh process so that the peaks are
+        # independent
+        results[evaluator] = float(subprocess.check_output([
+            sys.executable,
+            __file__,
+            '--branches', str(args.branches),
+            '--size', str(args.size),
+            '--evaluator', evaluator,
+        ]))
+        print('%-10s peak rss: %8.1f MiB' % (evaluator, results[evaluator]))
+
+    print('reduction: %.1f%%' % (
+        100 * (1 - results['scheduled'] / results['strict'])
+    ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+"""Run the benchmark suite or compare two runs.
+
+usage: python benchmarks/run.py run [-o results.json] [-k PATTERN]
+                                    [--max-size N] [--repeat R]
+       python benchmarks/run.py compare old.json new.json [--threshold T]
+
+Benchmarks are defined in the ``bench_*.py`` modules next to this file.
+Each run records the time and peak traced memory of every benchmark along
+with the Python version and git commit, so results from two checkouts can
+be compared. The ``lazy`` package in the checkout that contains this script
+is benchmarked, build the extensions in place first.
+
+``--max-size`` skips the benchmarks whose parameter builds more than N
+thunks, list cells, or tree nodes. The import, thunk creation, and
+lazy_function benchmarks do a fixed amount of work and always run.
+"""
+import argparse
+from glob import glob
+from importlib import import_module
+import json
+import os
+import re
+import sys
+
+# Benchmark the checkout this script is in, even when another version of
+# lazy is installed or lazy is not installed at all.
+sys.path.insert(
+    1,
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+)
+
+from harness import compare, metadata, registry, run_benchmark  # noqa: E402
+
+
+def _load_benchmarks():
+    here = os.path.dirname(os.path.abspath(__file__))
+    for path in sorted(glob(os.path.join(here, 'bench_*.py'))):
+        import_module(os.path.splitext(os.path.basename(path))[0])
+
+
+def _format_time(seconds):
+    if seconds is None:
+        return '-'
+    for unit, scale in (('s', 1), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= scale:
+            return '%.2f%s' % (seconds / scale, unit)
+    return '%.1fns' % (seconds / 1e-9)
+
+
+def _format_bytes(nbytes):
+    if nbytes is None:
+        return '-'
+    for unit, scale in (('GiB', 2 ** 30), ('MiB', 2 ** 20), ('KiB', 2 ** 10)):
+        if nbytes >= scale:
+            return '%.1f%s' % (nbytes / scale, unit)
+    return '%dB' % nbytes
+
+
+def run(args):
+    _load_benchmarks()
+    pattern = re.compile(args.k) if args.k else None
+
+    results = {}
+    for name, bench in registry.items():
+        if pattern is not None and not pattern.search(name):
+            continue
+        param = dict(bench.names())[name]
+        if (args.max_size is not None and
+                bench.size is not None and
+                bench.size(param) > args.max_size):
+            continue
+
+        results[name] = result = run_benchmark(bench, param, args.repeat)
+        if 'error' in result:
+            print('%-50s %s' % (name, result['error']))
+        else:
+            print('%-50s %10s %10s/op %10s' % (
+                name,
+                _format_time(result['min']),
+                _format_time(result['per_op']),
+                _format_bytes(result['peak_memory']),
+            ))
+        sys.stdout.flush()
+
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(
+                {'metadata': metadata(), 'benchmarks': results},
+                f,
+                indent=2,
+                sort_keys=True,
+            )
+
+
+def compare_runs(args):
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+
+    print('%-50s %10s %10s %7s %10s %10s' % (
+        'benchmark', 'old', 'new', 'ratio', 'old mem', 'new mem',
+    ))
+    slower = False
+    for name, a, b, ratio, mem_a, mem_b, verdict in compare(
+            old, new, args.threshold):
+        print('%-50s %10s %10s %7s %10s %10s %s' % (
+            name,
+            _format_time(a),
+            _format_time(b),
+            '-' if ratio is None else '%.2fx' % ratio,
+            _format_bytes(mem_a),
+            _format_bytes(mem_b),
+            verdict,
+        ))
+        slower = slower or verdict == 'slower'
+
+    if args.fail_on_slower and slower:
+        sys.exit(1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+
+    run_parser = subparsers.add_parser('run', help='run the benchmarks')
+    run_parser.add_argument(
+        '-o',
+        '--output',
+        help='the path to write the results to as JSON',
+    )
+    run_parser.add_argument(
+        '-k',
+        help='only run the benchmarks whose names match this regex',
+    )
+    run_parser.add_argument(
+        '--max-size',
+        type=int,
+        help=(
+            'skip the benchmarks which build more than this many thunks,'
+            ' list cells, or tree nodes'
+        ),
+    )
+    run_parser.add_argument(
+        '--repeat',
+        type=int,
+        default=5,
+        help='the number of timing samples to take',
+    )
+    run_parser.set_defaults(func=run)
+
+    compare_parser = subparsers.add_parser(
+        'compare',
+        help='compare two runs',
+    )
+    compare_parser.add_argument('old')
+    compare_parser.add_argument('new')
+    compare_parser.add_argument(
+        '--threshold',
+        type=float,
+        default=0.05,
+        help='the relative change in the min time to report',
+    )
+    compare_parser.add_argument(
+        '--fail-on-slower',
+        action='store_true',
+        help='exit with a non-zero status if any benchmark got slower',
+    )
+    compare_parser.set_defaults(func=compare_runs)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,17 +1,93 @@
+from importlib import import_module
+from importlib.util import find_spec
 import sys
 
-from lazy import data
-from lazy._thunk import thunk, strict, get_children, operator
+from lazy._thunk import (
+    Cancelled,
+    Cell,
+    Deadline,
+    get_children,
+    operator,
+    stats,
+    strict,
+    strict_many,
+    thunk,
+)
 from lazy._undefined import undefined
-from lazy.bytecode import lazy_function
 from lazy.include import get_include
-from lazy.runtime import run_lazy
-from lazy.tree import parse
 
 __version__ = '0.2.1'
 
 
+# name -> (module, attribute) for the parts of the package which are imported
+# the first time they are used. The transformers and their dependencies take
+# much longer to import than the core thunk type.
+_deferred = {
+    'data': ('lazy.data', None),
+    'deepstrict': ('lazy.deep', 'deepstrict'),
+    'dumps': ('lazy.serialize', 'dumps'),
+    'profile': ('lazy.profile', None),
+    'lazy_function': (
+        'lazy.source' if sys.version_info >= (3, 8) else 'lazy.bytecode',
+        'lazy_function',
+    ),
+    'loads': ('lazy.serialize', 'loads'),
+    'parse': ('lazy.tree', 'parse'),
+    'run_lazy': ('lazy.runtime', 'run_lazy'),
+    'specialize': (
+        'lazy.source' if sys.version_info >= (3, 8) else 'lazy.bytecode',
+        'specialize',
+    ),
+    'strict_async': ('lazy.aio', 'strict_async'),
+    # requires numpy
+    'vectorize': ('lazy.array', 'vectorize'),
+}
+
+
+def __getattr__(name):
+    try:
+        module, attr = _deferred[name]
+    except KeyError:
+        raise AttributeError(
+            'module %r has no attribute %r' % (__name__, name),
+        )
+
+    try:
+        value = import_module(module)
+    except ImportError as e:
+        # only hide the error when numpy itself is missing, not a failure
+        # inside of ``lazy.array``
+        if name != 'vectorize' or e.name != 'numpy':
+            raise
+        raise AttributeError(
+            'module %r has no attribute %r, numpy is not installed' % (
+                __name__,
+                name,
+            ),
+        )
+
+    if attr is not None:
+        value = getattr(value, attr)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_deferred))
+
+
+if sys.version_info < (3, 7):  # pragma: no cover
+    # Module ``__getattr__`` was added in Python 3.7.
+    for _name in _deferred:
+        try:
+            __getattr__(_name)
+        except AttributeError:
+            pass
+    del _name
+
+
 def load_ipython_extension(ipython):  # pragma: no cover
+    from lazy.runtime import run_lazy
 
     def lazy_magic(line, cell=None):
         return run_lazy(
@@ -23,35 +99,34 @@ def load_ipython_extension(ipython):  # pragma: no cover
     ipython.register_magic_function(lazy_magic, 'line_cell', 'lazy')
 
 
-class operator_importer:
-    """Metapath finder and loader to remap ``lazy._thunk.operator`` to
-    ``lazy.operator``.
-    """
-
-    def find_module(self, fullname, path=None):
-        return self if fullname == 'lazy.operator' else None
-
-    def load_module(self, fullname):
-        try:
-            return sys.modules[fullname]
-        except KeyError:
-            pass
-        assert fullname == 'lazy.operator', 'ayyy lmao'
-        sys.modules[fullname] = operator
-        return operator
-sys.meta_path.append(operator_importer())
-del operator_importer
+# ``lazy._thunk.operator`` is created by the C extension, alias it so that it
+# may be imported as ``lazy.operator``.
+sys.modules['lazy.operator'] = operator
 
 
 __all__ = [
+    'Cancelled',
+    'Cell',
+    'Deadline',
     'run_lazy',
     'lazy_function',
+    'loads',
     'thunk',
     'data',
+    'deepstrict',
+    'dumps',
     'get_children',
     'get_include',
     'operator',
     'parse',
+    'specialize',
+    'stats',
     'undefined',
     'strict',
+    'strict_async',
+    'strict_many',
 ]
+if find_spec('numpy') is not None:
+    # look for numpy without importing it, ``lazy.vectorize`` is only
+    # available when numpy is installed
+    __all__.append('vectorize')
@@ -1,11 +1,14 @@
 #include <Python.h>
+#include <frameobject.h>
 #include <structmember.h>
 #include <stdbool.h>
 
+#define LZ_THUNK_MODULE
 #include "lazy.h"
 
-/* We can only use matmul on 3.5+. */
+/* We can only use matmul and the async protocol on 3.5+. */
 #define LZ_HAS_MATMUL PY_MINOR_VERSION >= 5
+#define LZ_HAS_ASYNC PY_MINOR_VERSION >= 5
 #if PY_MINOR_VERSION >= 5
 #define Lz_RecursionError PyExc_RecursionError
 #else
@@ -270,15 +273,605 @@ static PyTypeObject ternarywrapper_type = {
 
 /* thunk ------------------------------------------------------------------- */
 
+/* The thunk depends on a `Cell` and keeps its func, args and kwargs after
+   being evaluated so that it may be recomputed. */
+#define LZ_THUNK_INCREMENTAL (1 << 0)
+/* Another thread is waiting for the thread evaluating the thunk. */
+#define LZ_THUNK_WAITERS (1 << 1)
+
+/* Without a GIL, the state of a thunk is changed inside a critical section
+   on the thunk and the global counters are updated atomically. With the GIL
+   these are no-ops. */
+#ifdef Py_GIL_DISABLED
+#define LZ_BEGIN_CRITICAL_SECTION(ob) Py_BEGIN_CRITICAL_SECTION(ob)
+#define LZ_END_CRITICAL_SECTION() Py_END_CRITICAL_SECTION()
+#define LZ_INCREMENT(counter) _Py_atomic_add_ssize(&(counter), 1)
+#define LZ_DECREMENT(counter) _Py_atomic_add_ssize(&(counter), -1)
+#define LZ_LOAD(counter) _Py_atomic_load_ssize_relaxed(&(counter))
+#define LZ_LOAD_PTR(field) _Py_atomic_load_ptr_acquire(&(field))
+#define LZ_STORE_PTR(field, value)                                      \
+    _Py_atomic_store_ptr_release(&(field), value)
+#else
+#define LZ_BEGIN_CRITICAL_SECTION(ob) {
+#define LZ_END_CRITICAL_SECTION() }
+#define LZ_INCREMENT(counter) (++(counter))
+#define LZ_DECREMENT(counter) (--(counter))
+#define LZ_LOAD(counter) (counter)
+#define LZ_LOAD_PTR(field) (field)
+#define LZ_STORE_PTR(field, value) ((field) = (value))
+#endif
+
+/* The storage class of the evaluation state which is kept per thread.
+   MSVC does not support C11's `_Thread_local`. */
+#if defined(_MSC_VER)
+#define LZ_THREAD_LOCAL __declspec(thread)
+#elif defined(__STDC_VERSION__) && __STDC_VERSION__ >= 201112L
+#define LZ_THREAD_LOCAL _Thread_local
+#else
+#define LZ_THREAD_LOCAL __thread
+#endif
+
 typedef struct{
     PyObject_HEAD
     PyObject *th_func;
     PyObject *th_args;
     PyObject *th_kwargs;
     PyObject *th_normal;
+    unsigned int th_flags;
+    /* The line that created this thunk when profiling, see `th_site_code`. */
+    int th_site_line;
+    /* The revision when `th_normal` last changed. */
+    Py_ssize_t th_changed_at;
+    /* The revision when `th_normal` was last checked against the cells. */
+    Py_ssize_t th_verified_at;
+    /* The code object that created this thunk when profiling, otherwise
+       NULL. */
+    PyObject *th_site_code;
+    /* The thread evaluating this thunk while `th_normal` is
+       `recursionguard`. */
+    unsigned long th_owner;
 }thunk;
 
 static PyTypeObject thunk_type;
+static PyTypeObject cell_type;
+
+#define LzThunk_CheckExact(ob) (Py_TYPE(ob) == &thunk_type)
+
+#if PY_VERSION_HEX >= 0x03090000
+#define LZ_GC_IS_TRACKED(ob) PyObject_GC_IsTracked(ob)
+#else
+#define LZ_GC_IS_TRACKED(ob) _PyObject_GC_IS_TRACKED(ob)
+#endif
+
+static int LzThunk_IsNormal(PyObject *expr);
+
+/* Can `ob` be part of a reference cycle through a thunk that holds it?
+   Objects which are not containers cannot, and neither can untracked tuples
+   and untracked thunks in normal form because the references they hold do
+   not change. An untracked dict is not atomic because it may be given a
+   reference to the thunk later. A pending thunk is not atomic either, it
+   may be untracked now but its normal form may be part of a cycle and
+   forcing it only tracks the thunk itself, not the thunks that hold it. */
+static bool
+is_atomic(PyObject *ob)
+{
+    if (!PyObject_IS_GC(ob)) {
+        return true;
+    }
+    if (LZ_GC_IS_TRACKED(ob)) {
+        return false;
+    }
+    return PyTuple_CheckExact(ob) ||
+        (LzThunk_CheckExact(ob) && LzThunk_IsNormal(ob));
+}
+
+/* Untrack a thunk which cannot be part of a reference cycle, or track a
+   thunk which now may be. This is what CPython does for tuples of atomic
+   values, a large graph of thunks over numbers and strings is then not
+   walked by every collection.
+
+   This must be called again whenever the references held by the thunk
+   change. Subclasses and incremental thunks stay tracked because their
+   references may change at any time. */
+static void
+update_gc_tracking(thunk *self)
+{
+    PyObject *key;
+    PyObject *value;
+    Py_ssize_t n;
+    bool atomic;
+
+    if (!LzThunk_CheckExact(self) || self->th_flags & LZ_THUNK_INCREMENTAL) {
+        return;
+    }
+
+    atomic = !self->th_site_code || is_atomic(self->th_site_code);
+    if (self->th_normal) {
+        atomic = atomic && is_atomic(self->th_normal);
+    }
+    else {
+        atomic = atomic && is_atomic(self->th_func);
+        for (n = 0;atomic && n < PyTuple_GET_SIZE(self->th_args);++n) {
+            atomic = is_atomic(PyTuple_GET_ITEM(self->th_args, n));
+        }
+        n = 0;
+        while (atomic &&
+               self->th_kwargs &&
+               PyDict_Next(self->th_kwargs, &n, &key, &value)) {
+            atomic = is_atomic(value);
+        }
+    }
+
+    if (atomic && LZ_GC_IS_TRACKED((PyObject*) self)) {
+        PyObject_GC_UnTrack(self);
+    }
+    else if (!atomic && !LZ_GC_IS_TRACKED((PyObject*) self)) {
+        PyObject_GC_Track(self);
+    }
+}
+
+/* The revision is incremented every time a cell is set. */
+static Py_ssize_t revision = 0;
+
+/* Counters exposed with `lazy.stats()`. */
+static struct {
+    /* The number of thunks allocated. */
+    Py_ssize_t allocated;
+    /* The number of thunks deallocated before they were evaluated. */
+    Py_ssize_t deallocated_pending;
+    /* The number of thunks evaluated. */
+    Py_ssize_t forced;
+    /* The number of calls to a `__strict__` method. */
+    Py_ssize_t strict_dispatches;
+    /* The number of times a thunk needed its own value. */
+    Py_ssize_t recursion_guard_hits;
+    /* The deepest nesting of thunk evaluations. */
+    Py_ssize_t max_depth;
+} stats;
+
+/* The current nesting of thunk evaluations on this thread. */
+static LZ_THREAD_LOCAL Py_ssize_t eval_depth = 0;
+
+/* Profiling --------------------------------------------------------------- */
+
+/* Is the profiler on? When it is, thunks record the code and line that
+   created them and the time spent evaluating each thunk is charged to that
+   site. */
+static bool profiling = false;
+
+/* (code, line) or None -> (count, self_ns, total_ns) */
+static PyObject *profile_data = NULL;
+
+/* The time spent in the nested evaluations of the thunk being profiled on
+   this thread. */
+static LZ_THREAD_LOCAL long long profile_nested_ns = 0;
+
+/* Read CPython's monotonic clock, which is portable and does not need the
+   GIL.
+   return: The time in nanoseconds. */
+static long long
+monotonic_ns(void)
+{
+#if PY_VERSION_HEX >= 0x030d0000
+    PyTime_t t;
+
+    /* The raw clock only fails if the OS clock does, in which case the time
+       is 0. */
+    (void) PyTime_MonotonicRaw(&t);
+    return (long long) t;
+#else
+    return (long long) _PyTime_GetMonotonicClock();
+#endif
+}
+
+/* Record the code and line of the running Python frame as the creation site
+   of a thunk. */
+static void
+record_site(thunk *self)
+{
+    PyFrameObject *frame;
+
+    if (!(frame = PyEval_GetFrame())) {
+        return;
+    }
+#if PY_VERSION_HEX >= 0x03090000
+    self->th_site_code = (PyObject*) PyFrame_GetCode(frame);
+#else
+    self->th_site_code = (PyObject*) frame->f_code;
+    Py_INCREF(self->th_site_code);
+#endif
+    self->th_site_line = PyFrame_GetLineNumber(frame);
+}
+
+/* Get the key for the creation site of a thunk.
+   return: A new reference. */
+static PyObject *
+site_key(thunk *self)
+{
+    if (!self->th_site_code) {
+        Py_RETURN_NONE;
+    }
+    return Py_BuildValue("(Oi)", self->th_site_code, self->th_site_line);
+}
+
+/* Charge the time spent evaluating a thunk to its creation site.
+   return: 0 on success, -1 on failure. */
+static int
+record_profile(thunk *self, long long self_ns, long long total_ns)
+{
+    PyObject *key;
+    PyObject *old;
+    PyObject *new;
+    long long count = 0;
+    long long old_self_ns = 0;
+    long long old_total_ns = 0;
+    int status;
+
+    if (!(key = site_key(self))) {
+        return -1;
+    }
+    if ((old = PyDict_GetItem(profile_data, key)) &&
+        !PyArg_ParseTuple(old,
+                          "LLL",
+                          &count,
+                          &old_self_ns,
+                          &old_total_ns)) {
+        Py_DECREF(key);
+        return -1;
+    }
+    if (!(new = Py_BuildValue("(LLL)",
+                              count + 1,
+                              old_self_ns + self_ns,
+                              old_total_ns + total_ns))) {
+        Py_DECREF(key);
+        return -1;
+    }
+    status = PyDict_SetItem(profile_data, key, new);
+    Py_DECREF(key);
+    Py_DECREF(new);
+    return status;
+}
+
+/* Deadlines --------------------------------------------------------------- */
+
+typedef struct {
+    PyObject_HEAD
+    /* The monotonic time in nanoseconds when the deadline expires, or -1 if
+       there is no time limit. */
+    long long dl_expires_ns;
+    /* Has `cancel` been called? */
+    int dl_cancelled;
+    /* Is this deadline entered? */
+    int dl_entered;
+    /* The deadline which was the innermost deadline of the thread when this
+       deadline was entered, or NULL. */
+    PyObject *dl_outer;
+} deadline;
+
+static PyTypeObject deadline_type;
+
+/* The number of deadlines entered on any thread. Thunks only look for the
+   deadline of the running thread when this is nonzero so that evaluation
+   without a deadline only pays for this check. */
+static Py_ssize_t deadlines_entered = 0;
+
+/* The key in the thread state dict which holds the innermost deadline of a
+   thread. */
+static PyObject *deadline_key;
+
+/* The exception raised when a deadline is cancelled. */
+static PyObject *cancelled_error;
+
+/* Check the deadlines entered on the running thread.
+   return: 0 if evaluation may continue, -1 with an exception set if a
+   deadline has expired or been cancelled. */
+static int
+check_deadline(void)
+{
+    PyObject *dict;
+    deadline *dl;
+    long long now = -1;
+
+    if (!(dict = PyThreadState_GetDict())) {
+        return 0;
+    }
+    for (dl = (deadline*) PyDict_GetItem(dict, deadline_key);
+         dl;
+         dl = (deadline*) dl->dl_outer) {
+        if (dl->dl_cancelled) {
+            PyErr_SetString(cancelled_error, "evaluation was cancelled");
+            return -1;
+        }
+        if (dl->dl_expires_ns >= 0) {
+            if (now < 0) {
+                now = monotonic_ns();
+            }
+            if (now >= dl->dl_expires_ns) {
+                PyErr_SetString(PyExc_TimeoutError,
+                                "evaluation passed its deadline");
+                return -1;
+            }
+        }
+    }
+    return 0;
+}
+
+static PyObject *
+deadline_new(PyTypeObject *cls, PyObject *args, PyObject *kwargs)
+{
+    static char *keywords[] = {"timeout", NULL};
+    PyObject *timeout = Py_None;
+    double seconds = 0;
+    deadline *self;
+
+    if (!PyArg_ParseTupleAndKeywords(args,
+                                     kwargs,
+                                     "|O:Deadline",
+                                     keywords,
+                                     &timeout)) {
+        return NULL;
+    }
+
+    if (timeout != Py_None) {
+        seconds = PyFloat_AsDouble(timeout);
+        if (seconds == -1.0 && PyErr_Occurred()) {
+            return NULL;
+        }
+        if (seconds < 0) {
+            seconds = 0;
+        }
+    }
+
+    if (!(self = (deadline*) cls->tp_alloc(cls, 0))) {
+        return NULL;
+    }
+    self->dl_expires_ns = (timeout == Py_None) ?
+        -1 :
+        monotonic_ns() + (long long) (seconds * 1e9);
+    self->dl_cancelled = 0;
+    self->dl_entered = 0;
+    self->dl_outer = NULL;
+    return (PyObject*) self;
+}
+
+static void
+deadline_dealloc(deadline *self)
+{
+    Py_XDECREF(self->dl_outer);
+    Py_TYPE(self)->tp_free((PyObject*) self);
+}
+
+/* Make a deadline the innermost deadline of the running thread.
+   return: 0 on success, -1 on failure. */
+static int
+deadline_push(deadline *self)
+{
+    PyObject *dict;
+    PyObject *outer;
+
+    if (self->dl_entered) {
+        PyErr_SetString(PyExc_RuntimeError, "deadline is already entered");
+        return -1;
+    }
+    if (!(dict = PyThreadState_GetDict())) {
+        PyErr_SetString(PyExc_RuntimeError, "no thread state dict");
+        return -1;
+    }
+    outer = PyDict_GetItem(dict, deadline_key);
+    if (PyDict_SetItem(dict, deadline_key, (PyObject*) self)) {
+        return -1;
+    }
+    Py_XINCREF(outer);
+    self->dl_outer = outer;
+    self->dl_entered = 1;
+    LZ_INCREMENT(deadlines_entered);
+    return 0;
+}
+
+/* Restore the deadline which was innermost when `self` was entered. This
+   preserves the current exception.
+   return: 0 on success, -1 on failure. */
+static int
+deadline_pop(deadline *self)
+{
+    PyObject *dict;
+    PyObject *type;
+    PyObject *value;
+    PyObject *tb;
+    int status = 0;
+
+    if (!self->dl_entered) {
+        PyErr_SetString(PyExc_RuntimeError, "deadline is not entered");
+        return -1;
+    }
+
+    PyErr_Fetch(&type, &value, &tb);
+    if (!(dict = PyThreadState_GetDict())) {
+        status = -1;
+    }
+    else if (self->dl_outer) {
+        status = PyDict_SetItem(dict, deadline_key, self->dl_outer);
+    }
+    else if (PyDict_GetItem(dict, deadline_key)) {
+        status = PyDict_DelItem(dict, deadline_key);
+    }
+    if (status) {
+        Py_XDECREF(type);
+        Py_XDECREF(value);
+        Py_XDECREF(tb);
+    }
+    else {
+        PyErr_Restore(type, value, tb);
+    }
+
+    Py_CLEAR(self->dl_outer);
+    self->dl_entered = 0;
+    LZ_DECREMENT(deadlines_entered);
+    return status;
+}
+
+static PyObject *
+deadline_enter(deadline *self, PyObject *_)
+{
+    if (deadline_push(self)) {
+        return NULL;
+    }
+    Py_INCREF(self);
+    return (PyObject*) self;
+}
+
+static PyObject *
+deadline_exit(deadline *self, PyObject *_)
+{
+    if (deadline_pop(self)) {
+        return NULL;
+    }
+    Py_RETURN_NONE;
+}
+
+PyDoc_STRVAR(deadline_cancel_doc,
+             "Stop the evaluations under this deadline.\n"
+             "\n"
+             "Notes\n"
+             "-----\n"
+             "This may be called from any thread. The evaluation raises\n"
+             "``lazy.Cancelled`` before it evaluates its next thunk.\n");
+
+static PyObject *
+deadline_cancel(deadline *self, PyObject *_)
+{
+    self->dl_cancelled = 1;
+    Py_RETURN_NONE;
+}
+
+static PyMethodDef deadline_methods[] = {
+    {"__enter__", (PyCFunction) deadline_enter, METH_NOARGS, ""},
+    {"__exit__", (PyCFunction) deadline_exit, METH_VARARGS, ""},
+    {"cancel",
+     (PyCFunction) deadline_cancel,
+     METH_NOARGS,
+     deadline_cancel_doc},
+    {NULL},
+};
+
+static PyObject *
+deadline_get_cancelled(deadline *self, void *_)
+{
+    return PyBool_FromLong(self->dl_cancelled);
+}
+
+static PyObject *
+deadline_get_expired(deadline *self, void *_)
+{
+    return PyBool_FromLong(self->dl_cancelled ||
+                           (self->dl_expires_ns >= 0 &&
+                            monotonic_ns() >= self->dl_expires_ns));
+}
+
+static PyObject *
+deadline_get_remaining(deadline *self, void *_)
+{
+    long long remaining;
+
+    if (self->dl_expires_ns < 0) {
+        Py_RETURN_NONE;
+    }
+    remaining = self->dl_expires_ns - monotonic_ns();
+    return PyFloat_FromDouble(remaining > 0 ? remaining / 1e9 : 0.0);
+}
+
+static PyGetSetDef deadline_getsets[] = {
+    {"cancelled",
+     (getter) deadline_get_cancelled,
+     NULL,
+     "Has ``cancel`` been called?",
+     NULL},
+    {"expired",
+     (getter) deadline_get_expired,
+     NULL,
+     "Has the deadline passed or been cancelled?",
+     NULL},
+    {"remaining",
+     (getter) deadline_get_remaining,
+     NULL,
+     "The seconds left before the deadline, or None if there is no time\n"
+     "limit.",
+     NULL},
+    {NULL},
+};
+
+PyDoc_STRVAR(deadline_doc,
+             "A time limit and cancellation flag for evaluating thunks.\n"
+             "\n"
+             "Parameters\n"
+             "----------\n"
+             "timeout : float, optional\n"
+             "    The number of seconds from now until the deadline. By\n"
+             "    default there is no time limit and the deadline only ends\n"
+             "    when it is cancelled.\n"
+             "\n"
+             "Examples\n"
+             "--------\n"
+             ">>> with Deadline(0.05) as deadline:\n"
+             "...     strict(expr)\n"
+             "\n"
+             "Notes\n"
+             "-----\n"
+             "While a deadline is entered, evaluating a thunk on the same\n"
+             "thread raises ``TimeoutError`` once the deadline has passed or\n"
+             "``lazy.Cancelled`` once it has been cancelled. The check\n"
+             "happens before each thunk is evaluated, so a single slow\n"
+             "function is not interrupted. The thunks which finished before\n"
+             "the deadline keep their values, so evaluating the expression\n"
+             "again only computes the rest.\n"
+             "\n"
+             "Deadlines may be nested, evaluation stops when any of them\n"
+             "ends. A deadline may only be entered once at a time.\n");
+
+static PyTypeObject deadline_type = {
+    PyVarObject_HEAD_INIT(&PyType_Type, 0)
+    "lazy.Deadline",                            /* tp_name */
+    sizeof(deadline),                           /* tp_basicsize */
+    0,                                          /* tp_itemsize */
+    (destructor) deadline_dealloc,              /* tp_dealloc */
+    0,                                          /* tp_print */
+    0,                                          /* tp_getattr */
+    0,                                          /* tp_setattr */
+    0,                                          /* tp_reserved */
+    0,                                          /* tp_repr */
+    0,                                          /* tp_as_number */
+    0,                                          /* tp_as_sequence */
+    0,                                          /* tp_as_mapping */
+    0,                                          /* tp_hash */
+    0,                                          /* tp_call */
+    0,                                          /* tp_str */
+    PyObject_GenericGetAttr,                    /* tp_getattro */
+    0,                                          /* tp_setattro */
+    0,                                          /* tp_as_buffer */
+    Py_TPFLAGS_DEFAULT,                         /* tp_flags */
+    deadline_doc,                               /* tp_doc */
+    0,                                          /* tp_traverse */
+    0,                                          /* tp_clear */
+    0,                                          /* tp_richcompare */
+    0,                                          /* tp_weaklistoffset */
+    0,                                          /* tp_iter */
+    0,                                          /* tp_iternext */
+    deadline_methods,                           /* tp_methods */
+    0,                                          /* tp_members */
+    deadline_getsets,                           /* tp_getset */
+    0,                                          /* tp_base */
+    0,                                          /* tp_dict */
+    0,                                          /* tp_descr_get */
+    0,                                          /* tp_descr_set */
+    0,                                          /* tp_dictoffset */
+    0,                                          /* tp_init */
+    0,                                          /* tp_alloc */
+    (newfunc) deadline_new,                     /* tp_new */
+};
+
+#define LzThunk_IsIncremental(ob)                                       \
+    (PyObject_TypeCheck(ob, &thunk_type) &&                             \
+     ((thunk*) (ob))->th_flags & LZ_THUNK_INCREMENTAL)
 static PyObject *thunk_fromexpr(PyTypeObject *cls, PyObject *expr);
 
 /* strict ------------------------------------------------------------------- */
@@ -323,18 +916,44 @@ PyTypeObject recursionguard_type = {
     Py_TPFLAGS_DEFAULT,      /*tp_flags */
 };
 
-static PyObject recursionguard = {
-    _PyObject_EXTRA_INIT
-    1,
-    &recursionguard_type,
+static struct {
+    PyObject_HEAD
+} recursionguard_object = {
+    PyObject_HEAD_INIT(&recursionguard_type)
 };
 
+#define recursionguard (*(PyObject*) &recursionguard_object)
+
 static PyObject *strict_eval(PyObject*);
 
-_Py_IDENTIFIER(__strict__);
+/* The interned name of the `__strict__` method. */
+static PyObject *strict_str;
 
-static int
-_eval_call_thunk(thunk *self)
+/* Look up a special method on the type of an object and bind it to the
+   object.
+   return: A new reference or NULL without an exception set if the type
+   does not define the method. */
+static PyObject *
+lookup_special(PyObject *ob, PyObject *name)
+{
+    PyObject *res;
+    descrgetfunc f;
+
+    if (!(res = _PyType_Lookup(Py_TYPE(ob), name))) {
+        return NULL;
+    }
+
+    if (!(f = Py_TYPE(res)->tp_descr_get)) {
+        Py_INCREF(res);
+        return res;
+    }
+    return f(res, ob, (PyObject*) Py_TYPE(ob));
+}
+
+/* Call the function of a thunk with the normal forms of its arguments.
+   return: A new reference. */
+static PyObject *
+_call_thunk(thunk *self)
 {
     PyObject *normal_func;
     PyObject *normal_args;
@@ -344,38 +963,16 @@ _eval_call_thunk(thunk *self)
     PyObject *arg;
     PyObject *key;
     PyObject *value;
-    PyObject *tmp;
-    PyObject *strict_method;
-
-    if (!LzThunk_CheckExact(self)) {
-        if ((strict_method = _PyObject_LookupSpecial((PyObject*) self,
-                                                     &PyId___strict__))) {
-            tmp = PyObject_CallFunctionObjArgs(strict_method, NULL);
-            Py_DECREF(strict_method);
-            if (!tmp) {
-                return -1;
-            }
-            /* Remove the references to the function and args to not persist
-               these references. */
-            Py_CLEAR(self->th_func);
-            Py_CLEAR(self->th_args);
-            Py_CLEAR(self->th_kwargs);
-            self->th_normal = tmp;
-            return 0;
-        }
-    }
-    else if (PyErr_Occurred()) {
-        return -1;
-    }
+    PyObject *ret;
 
     if (!(normal_func = strict_eval(self->th_func))) {
-        return -1;
+        return NULL;
     }
 
     nargs = PyTuple_GET_SIZE(self->th_args);
     if (!(normal_args = PyTuple_New(nargs))) {
         Py_DECREF(normal_func);
-        return -1;
+        return NULL;
     }
 
     for (n = 0;n < nargs;++n) {
@@ -383,7 +980,7 @@ _eval_call_thunk(thunk *self)
                   PyTuple_GET_ITEM(self->th_args, n)))) {
             Py_DECREF(normal_func);
             Py_DECREF(normal_args);
-            return -1;
+            return NULL;
         }
         PyTuple_SET_ITEM(normal_args, n, arg);
     }
@@ -391,50 +988,452 @@ _eval_call_thunk(thunk *self)
         if (!(normal_kwargs = PyDict_Copy(self->th_kwargs))) {
             Py_DECREF(normal_func);
             Py_DECREF(normal_args);
-            return -1;
+            return NULL;
         }
 
         n = 0;
-        while (PyDict_Next(normal_args, &n, &key, &value)) {
-            if ((!(arg = strict_eval(value))) ||
-                PyDict_SetItem(normal_args, key, arg)) {
-
+        while (PyDict_Next(self->th_kwargs, &n, &key, &value)) {
+            if (!(arg = strict_eval(value))) {
                 Py_DECREF(normal_func);
                 Py_DECREF(normal_args);
                 Py_DECREF(normal_kwargs);
-                return -1;
+                return NULL;
+            }
+            if (PyDict_SetItem(normal_kwargs, key, arg)) {
+                Py_DECREF(arg);
+                Py_DECREF(normal_func);
+                Py_DECREF(normal_args);
+                Py_DECREF(normal_kwargs);
+                return NULL;
             }
+            Py_DECREF(arg);
         }
     }
     else {
         normal_kwargs = NULL;
     }
 
-    tmp = PyObject_Call(normal_func, normal_args, normal_kwargs);
+    ret = PyObject_Call(normal_func, normal_args, normal_kwargs);
 
     Py_DECREF(normal_func);
     Py_DECREF(normal_args);
     Py_XDECREF(normal_kwargs);
+    return ret;
+}
+
+/* The condition that threads wait on while another thread evaluates a thunk
+   they need. This is created the first time a thread needs to wait. */
+static PyObject *eval_condition = NULL;
+
+/* Get `eval_condition`, creating it if needed.
+   return: A borrowed reference. */
+static PyObject *
+get_eval_condition(void)
+{
+    PyObject *threading;
+    PyObject *condition;
+
+    if (eval_condition) {
+        return eval_condition;
+    }
+    if (!(threading = PyImport_ImportModule("threading"))) {
+        return NULL;
+    }
+    condition = PyObject_CallMethod(threading, "Condition", NULL);
+    Py_DECREF(threading);
+    if (!condition) {
+        return NULL;
+    }
+
+    /* Another thread may have created the condition while we imported
+       threading. */
+#ifdef Py_GIL_DISABLED
+    {
+        PyObject *expected = NULL;
+
+        if (!_Py_atomic_compare_exchange_ptr(&eval_condition,
+                                             &expected,
+                                             condition)) {
+            Py_DECREF(condition);
+        }
+    }
+#else
+    if (eval_condition) {
+        Py_DECREF(condition);
+    }
+    else {
+        eval_condition = condition;
+    }
+#endif
+    return eval_condition;
+}
+
+/* Call a method of `eval_condition`.
+   return: 0 on success, -1 on failure. */
+static int
+call_eval_condition(const char *method, double timeout)
+{
+    PyObject *ret;
+
+    if (timeout < 0) {
+        ret = PyObject_CallMethod(eval_condition, method, NULL);
+    }
+    else {
+        ret = PyObject_CallMethod(eval_condition, method, "d", timeout);
+    }
+    if (!ret) {
+        return -1;
+    }
+    Py_DECREF(ret);
+    return 0;
+}
+
+/* Is another thread evaluating a thunk? If so, ask it to wake the waiting
+   threads when it finishes. This must be called with `eval_condition`
+   held so the wake up cannot happen before the caller waits. */
+static bool
+should_wait(thunk *self)
+{
+    bool evaluating;
+
+    LZ_BEGIN_CRITICAL_SECTION(self);
+    if ((evaluating = self->th_normal == &recursionguard)) {
+        self->th_flags |= LZ_THUNK_WAITERS;
+    }
+    LZ_END_CRITICAL_SECTION();
+    return evaluating;
+}
 
-    if (!tmp) {
+/* Wait until a thunk is not being evaluated by another thread.
+   return: 0 on success, -1 on failure. */
+static int
+wait_for_thunk(thunk *self)
+{
+    int status = 0;
+
+    if (!get_eval_condition() || call_eval_condition("acquire", -1)) {
         return -1;
     }
+    while (should_wait(self)) {
+        if (LZ_LOAD(deadlines_entered)) {
+            /* Wake up periodically to check the deadline of this
+               thread. */
+            if ((status = check_deadline()) ||
+                (status = call_eval_condition("wait", 0.001))) {
+                break;
+            }
+        }
+        else if ((status = call_eval_condition("wait", -1))) {
+            break;
+        }
+    }
+    if (call_eval_condition("release", -1)) {
+        status = -1;
+    }
+    return status;
+}
+
+/* Wake up the threads waiting for any thunk. This preserves the current
+   exception. */
+static void
+notify_waiters(void)
+{
+    PyObject *type;
+    PyObject *value;
+    PyObject *tb;
+    int status;
+
+    if (!eval_condition) {
+        /* The waiting threads have not created the condition yet, they
+           check the thunk again after they acquire it. */
+        return;
+    }
+
+    PyErr_Fetch(&type, &value, &tb);
+    if (!(status = call_eval_condition("acquire", -1))) {
+        status = call_eval_condition("notify_all", -1);
+        if (call_eval_condition("release", -1)) {
+            status = -1;
+        }
+    }
+    if (status) {
+        PyErr_WriteUnraisable(eval_condition);
+    }
+    PyErr_Restore(type, value, tb);
+}
+
+/* Claim a thunk so that the running thread may evaluate it. If another
+   thread is evaluating the thunk then this waits for it to finish.
+   return: 1 if the thunk was claimed, 0 if the thunk has a value or is being
+   evaluated by the running thread, or -1 on failure. */
+static int
+claim_thunk(thunk *self)
+{
+    unsigned long thread = PyThread_get_thread_ident();
+    int claimed;
+    bool wait;
+
+    for (;;) {
+        claimed = 0;
+        wait = false;
+        LZ_BEGIN_CRITICAL_SECTION(self);
+        if (!self->th_normal) {
+            /* Set the `th_normal` to a sentinel object. If this thread
+               tries to evaluate a thunk whose `th_normal` is
+               `&recursionguard` then the thunk is defined in terms of
+               itself. */
+            self->th_owner = thread;
+            LZ_STORE_PTR(self->th_normal, &recursionguard);
+            claimed = 1;
+        }
+        else if (self->th_normal == &recursionguard &&
+                 self->th_owner != thread) {
+            wait = true;
+        }
+        LZ_END_CRITICAL_SECTION();
+
+        if (!wait) {
+            return claimed;
+        }
+        /* If the other thread fails, the thunk is pending again and this
+           thread will try to evaluate it. */
+        if (wait_for_thunk(self)) {
+            return -1;
+        }
+    }
+}
+
+/* Store the result of evaluating a claimed thunk and wake the threads
+   waiting for it.
+   normal: A new reference to the normal form or NULL if the evaluation
+           failed. A thunk which failed to evaluate is pending again.
+   keep_inputs: Should the func, args and kwargs be kept? */
+static void
+finish_thunk(thunk *self, PyObject *normal, bool keep_inputs)
+{
+    PyObject *func = NULL;
+    PyObject *args = NULL;
+    PyObject *kwargs = NULL;
+    bool waiters;
+
+    LZ_BEGIN_CRITICAL_SECTION(self);
+    LZ_STORE_PTR(self->th_normal, normal);
+    if (normal && keep_inputs) {
+        /* Keep the function and args so that we can recompute this thunk
+           when a cell it depends on changes. */
+        self->th_changed_at = revision;
+        self->th_verified_at = revision;
+    }
+    else if (normal) {
+        /* Remove the references to the function and args to not persist
+           these references. */
+        func = self->th_func;
+        args = self->th_args;
+        kwargs = self->th_kwargs;
+        self->th_func = NULL;
+        self->th_args = NULL;
+        self->th_kwargs = NULL;
+    }
+    waiters = self->th_flags & LZ_THUNK_WAITERS;
+    self->th_flags &= ~LZ_THUNK_WAITERS;
+    LZ_END_CRITICAL_SECTION();
+
+    Py_XDECREF(func);
+    Py_XDECREF(args);
+    Py_XDECREF(kwargs);
+    if (normal) {
+        update_gc_tracking(self);
+    }
+    if (waiters) {
+        notify_waiters();
+    }
+}
+
+/* Compute the normal form of a claimed thunk.
+   keep_inputs: Set to whether the func, args and kwargs should be kept.
+   return: A new reference. */
+static PyObject *
+_eval_call_thunk_inner(thunk *self, bool *keep_inputs)
+{
+    PyObject *tmp;
+    PyObject *normal;
+    PyObject *strict_method;
 
-    /* Set the `th_normal` to a sentinel object. We check for this in
-       `_strict_eval_borrowed`. If we ever try to evaluate a thunk whose
-       `th_normal` is `&recursionguard` then we can bail out. */
-    self->th_normal = &recursionguard;
-    self->th_normal = strict_eval(tmp);
+    if (!LzThunk_CheckExact(self)) {
+        if ((strict_method = lookup_special((PyObject*) self,
+                                            strict_str))) {
+            LZ_INCREMENT(stats.strict_dispatches);
+            normal = PyObject_CallFunctionObjArgs(strict_method, NULL);
+            Py_DECREF(strict_method);
+            return normal;
+        }
+        if (PyErr_Occurred()) {
+            return NULL;
+        }
+    }
 
+    if (!(tmp = _call_thunk(self))) {
+        return NULL;
+    }
+    normal = strict_eval(tmp);
     Py_DECREF(tmp);
-    if (!self->th_normal) {
+    *keep_inputs = self->th_flags & LZ_THUNK_INCREMENTAL;
+    return normal;
+}
+
+/* Call the function of a claimed thunk without computing the normal form of
+   the result.
+   keep_inputs: Set to whether the func, args and kwargs should be kept.
+   return: A new reference. */
+static PyObject *
+_call_claimed_thunk(thunk *self, bool *keep_inputs)
+{
+    *keep_inputs = self->th_flags & LZ_THUNK_INCREMENTAL;
+    return _call_thunk(self);
+}
+
+/* A function which evaluates a claimed thunk, either
+   `_eval_call_thunk_inner` or `_call_claimed_thunk`. */
+typedef PyObject *(*eval_claimed_func)(thunk*, bool*);
+
+/* Evaluate a claimed thunk, charging the time to its creation site.
+   keep_inputs: Set to whether the func, args and kwargs should be kept.
+   return: A new reference. */
+static PyObject *
+_eval_claimed_profiled(thunk *self,
+                       eval_claimed_func eval,
+                       bool *keep_inputs)
+{
+    long long outer_nested_ns = profile_nested_ns;
+    long long start;
+    long long total_ns;
+    PyObject *normal;
+
+    profile_nested_ns = 0;
+    start = monotonic_ns();
+    normal = eval(self, keep_inputs);
+    total_ns = monotonic_ns() - start;
+
+    if (normal &&
+        profiling &&
+        record_profile(self, total_ns - profile_nested_ns, total_ns)) {
+        Py_CLEAR(normal);
+    }
+    profile_nested_ns = outer_nested_ns + total_ns;
+    return normal;
+}
+
+/* Evaluate a thunk claimed by `claim_thunk`, recording the stats and
+   profile.
+   keep_inputs: Set to whether the func, args and kwargs should be kept.
+   return: A new reference. */
+static PyObject *
+_eval_claimed(thunk *self, eval_claimed_func eval, bool *keep_inputs)
+{
+    PyObject *ret;
+
+    LZ_INCREMENT(stats.forced);
+    if (++eval_depth > stats.max_depth) {
+        stats.max_depth = eval_depth;
+    }
+    if (profiling) {
+        ret = _eval_claimed_profiled(self, eval, keep_inputs);
+    }
+    else {
+        ret = eval(self, keep_inputs);
+    }
+    --eval_depth;
+    return ret;
+}
+
+/* Evaluate a thunk claimed by `claim_thunk`.
+   return: 0 on success, -1 on failure. */
+static int
+_eval_call_thunk(thunk *self)
+{
+    PyObject *normal;
+    bool keep_inputs = false;
+
+    normal = _eval_claimed(self, _eval_call_thunk_inner, &keep_inputs);
+    finish_thunk(self, normal, keep_inputs);
+    return normal ? 0 : -1;
+}
+
+static PyObject *_strict_eval_borrowed(PyObject*);
+
+/* Bring an input of an incremental thunk up to date.
+   return: 1 if `ob` changed after the revision `since`, 0 if it did not, or
+           -1 on failure. */
+static int
+_input_changed(PyObject *ob, Py_ssize_t since)
+{
+    if (!LzThunk_IsIncremental(ob)) {
+        return 0;
+    }
+    if (!_strict_eval_borrowed(ob)) {
         return -1;
     }
-    /* Remove the references to the function and args to not persist
-       these references. */
-    Py_CLEAR(self->th_func);
-    Py_CLEAR(self->th_args);
-    Py_CLEAR(self->th_kwargs);
+    return ((thunk*) ob)->th_changed_at > since;
+}
+
+/* Recompute an evaluated incremental thunk if any of its inputs have changed
+   since it was last verified. If the new value is equal to the old value then
+   the thunk is not marked as changed so that the thunks which depend on it
+   are not recomputed.
+   return: 0 on success, -1 on failure. */
+static int
+_verify_thunk(thunk *self)
+{
+    PyObject *key;
+    PyObject *value;
+    PyObject *tmp;
+    PyObject *normal;
+    Py_ssize_t n;
+    int changed;
+
+    changed = _input_changed(self->th_func, self->th_verified_at);
+    for (n = 0;!changed && n < PyTuple_GET_SIZE(self->th_args);++n) {
+        changed = _input_changed(PyTuple_GET_ITEM(self->th_args, n),
+                                 self->th_verified_at);
+    }
+    n = 0;
+    while (!changed &&
+           self->th_kwargs &&
+           PyDict_Next(self->th_kwargs, &n, &key, &value)) {
+        changed = _input_changed(value, self->th_verified_at);
+    }
+    if (changed < 0) {
+        return -1;
+    }
+
+    if (changed) {
+        if (!(tmp = _call_thunk(self))) {
+            return -1;
+        }
+        normal = strict_eval(tmp);
+        Py_DECREF(tmp);
+        if (!normal) {
+            return -1;
+        }
+
+        if (normal == self->th_normal ||
+            (changed = PyObject_RichCompareBool(normal,
+                                                self->th_normal,
+                                                Py_EQ)) > 0) {
+            Py_DECREF(normal);
+        }
+        else {
+            if (changed < 0) {
+                /* Values which cannot be compared are treated as changed. */
+                PyErr_Clear();
+            }
+            tmp = self->th_normal;
+            self->th_normal = normal;
+            Py_DECREF(tmp);
+            self->th_changed_at = revision;
+        }
+    }
+    self->th_verified_at = revision;
     return 0;
 }
 
@@ -443,16 +1442,32 @@ _eval_call_thunk(thunk *self)
 static PyObject *
 _strict_eval_borrowed(PyObject *self)
 {
+    thunk *th = (thunk*) self;
+    PyObject *normal = LZ_LOAD_PTR(th->th_normal);
+    int claimed;
 
-    if (!((thunk*) self)->th_normal && _eval_call_thunk((thunk*) self)) {
+    if (!normal || normal == &recursionguard) {
+        if (LZ_LOAD(deadlines_entered) && check_deadline()) {
+            return NULL;
+        }
+        if ((claimed = claim_thunk(th)) < 0 ||
+            (claimed && _eval_call_thunk(th))) {
+            return NULL;
+        }
+    }
+    else if (th->th_flags & LZ_THUNK_INCREMENTAL &&
+             th->th_func &&
+             th->th_verified_at != revision &&
+             _verify_thunk(th)) {
         return NULL;
     }
-    if (((thunk*) self)->th_normal == &recursionguard) {
-        /* Check for the recursionguard sentinel value. */
+    if ((normal = LZ_LOAD_PTR(th->th_normal)) == &recursionguard) {
+        /* This thread is already evaluating the thunk. */
+        LZ_INCREMENT(stats.recursion_guard_hits);
         PyErr_SetString(Lz_RecursionError, "recursivly defined thunk");
         return NULL;
     }
-    return ((thunk*) self)->th_normal;
+    return normal;
 }
 
 /* Strictly evaluate a thunk.
@@ -473,7 +1488,7 @@ strict_eval(PyObject *th)
         return NULL;
     }
 
-    if (!(strict_method = _PyObject_LookupSpecial(th, &PyId___strict__))) {
+    if (!(strict_method = lookup_special(th, strict_str))) {
         if (!PyErr_Occurred()) {
             Py_INCREF(th);
             normal = th;
@@ -482,33 +1497,159 @@ strict_eval(PyObject *th)
             return NULL;
         }
     }
-    else if (!(normal = PyObject_CallFunctionObjArgs(strict_method, NULL))) {
+    else {
+        LZ_INCREMENT(stats.strict_dispatches);
+        normal = PyObject_CallFunctionObjArgs(strict_method, NULL);
         Py_DECREF(strict_method);
+    }
+
+    return normal;
+}
+
+PyDoc_STRVAR(strict_many_doc,
+             "Strictly evaluate many expressions.\n"
+             "\n"
+             "Parameters\n"
+             "----------\n"
+             "exprs : iterable[any]\n"
+             "    The expressions to evaluate.\n"
+             "return_exceptions : bool, optional\n"
+             "    If true, an expression which raises an exception has the\n"
+             "    exception in its place in the result instead of the\n"
+             "    exception being raised.\n"
+             "\n"
+             "Returns\n"
+             "-------\n"
+             "normals : list[any]\n"
+             "    The normal forms of ``exprs`` in order.\n"
+             "\n"
+             "Notes\n"
+             "-----\n"
+             "This is a loop which calls ``strict`` on each expression in\n"
+             "order. It only saves the overhead of calling ``strict`` from\n"
+             "Python once per expression. The expressions are not evaluated\n"
+             "in a single traversal, a subexpression which is shared between\n"
+             "``exprs`` is only evaluated once because a thunk stores its\n"
+             "normal form, just like with repeated calls to ``strict``.\n");
+
+static PyObject *
+strict_many(PyObject *self, PyObject *args, PyObject *kwargs)
+{
+    static char *keywords[] = {"exprs", "return_exceptions", NULL};
+    PyObject *exprs;
+    int return_exceptions = 0;
+    PyObject *it;
+    PyObject *expr;
+    PyObject *normal;
+    PyObject *normals;
+    PyObject *type;
+    PyObject *value;
+    PyObject *tb;
+    int status;
+
+    if (!PyArg_ParseTupleAndKeywords(args,
+                                     kwargs,
+                                     "O|p:strict_many",
+                                     keywords,
+                                     &exprs,
+                                     &return_exceptions)) {
         return NULL;
     }
-    else {
-        Py_XDECREF(strict_method);
+
+    if (!(it = PyObject_GetIter(exprs))) {
+        return NULL;
     }
 
-    return normal;
+    if (!(normals = PyList_New(0))) {
+        Py_DECREF(it);
+        return NULL;
+    }
+
+    while ((expr = PyIter_Next(it))) {
+        if (PyObject_TypeCheck(expr, &thunk_type)) {
+            /* Skip the generic isinstance check in `strict_eval`. */
+            if ((normal = _strict_eval_borrowed(expr))) {
+                normal = strict_eval(normal);
+            }
+        }
+        else {
+            normal = strict_eval(expr);
+        }
+        Py_DECREF(expr);
+
+        if (!normal) {
+            if (!(return_exceptions &&
+                  PyErr_ExceptionMatches(PyExc_Exception))) {
+                Py_DECREF(it);
+                Py_DECREF(normals);
+                return NULL;
+            }
+            PyErr_Fetch(&type, &value, &tb);
+            PyErr_NormalizeException(&type, &value, &tb);
+            if (tb) {
+                PyException_SetTraceback(value, tb);
+            }
+            Py_DECREF(type);
+            Py_XDECREF(tb);
+            normal = value;
+        }
+
+        status = PyList_Append(normals, normal);
+        Py_DECREF(normal);
+        if (status) {
+            Py_DECREF(it);
+            Py_DECREF(normals);
+            return NULL;
+        }
+    }
+
+    Py_DECREF(it);
+    if (PyErr_Occurred()) {
+        Py_DECREF(normals);
+        return NULL;
+    }
+    return normals;
 }
 
 static PyObject *
 strict_new(PyTypeObject *cls, PyObject *args, PyObject *kwargs)
 {
-    static const char * const keywords[] = {"expr", NULL};
+    static const char * const keywords[] = {"expr", "deadline", NULL};
     PyObject *th;
+    PyObject *dl = Py_None;
+    PyObject *normal;
 
     if (cls == &LzStrict_Type) {
         if (!PyArg_ParseTupleAndKeywords(args,
                                          kwargs,
-                                         "O:strict",
+                                         "O|O:strict",
                                          (char**) keywords,
-                                         &th)) {
+                                         &th,
+                                         &dl)) {
             return NULL;
         }
 
-        return strict_eval(th);
+        if (dl == Py_None) {
+            return strict_eval(th);
+        }
+
+        if (PyObject_TypeCheck(dl, &deadline_type)) {
+            Py_INCREF(dl);
+        }
+        else if (!(dl = PyObject_CallFunctionObjArgs(
+                       (PyObject*) &deadline_type, dl, NULL))) {
+            return NULL;
+        }
+        if (deadline_push((deadline*) dl)) {
+            Py_DECREF(dl);
+            return NULL;
+        }
+        normal = strict_eval(th);
+        if (deadline_pop((deadline*) dl)) {
+            Py_CLEAR(normal);
+        }
+        Py_DECREF(dl);
+        return normal;
     }
 
     if (!(th = cls->tp_alloc(cls, 0))) {
@@ -524,6 +1665,9 @@ PyDoc_STRVAR(strict_doc,
              "---------\n"
              "expr : any\n"
              "    An expression of any type.\n"
+             "deadline : Deadline or float, optional\n"
+             "    Stop evaluating at this deadline, or after this many\n"
+             "    seconds. See ``lazy.Deadline``.\n"
              "\n"
              "Returns\n"
              "-------\n"
@@ -587,11 +1731,15 @@ thunk_free(thunk *self)
 static void
 thunk_dealloc(thunk *self)
 {
+    if (!self->th_normal) {
+        LZ_INCREMENT(stats.deallocated_pending);
+    }
     PyObject_GC_UnTrack((PyObject*) self);
     Py_CLEAR(self->th_func);
     Py_CLEAR(self->th_args);
     Py_CLEAR(self->th_kwargs);
     Py_CLEAR(self->th_normal);
+    Py_CLEAR(self->th_site_code);
     Py_TYPE(self)->tp_free((PyObject*) self);
 }
 
@@ -605,10 +1753,36 @@ _thunk_new_no_check(PyTypeObject *cls,
                     PyObject *kwargs)
 {
     thunk *self;
+    PyObject *key;
+    PyObject *value;
+    Py_ssize_t n;
+    unsigned int flags = 0;
+
+    if (cls == &cell_type) {
+        /* Expressions built from cells are not cells. */
+        cls = &thunk_type;
+    }
+
+    /* A thunk is incremental if any of its inputs are incremental. */
+    if (LzThunk_IsIncremental(func)) {
+        flags |= LZ_THUNK_INCREMENTAL;
+    }
+    for (n = 0;!flags && n < PyTuple_GET_SIZE(args);++n) {
+        if (LzThunk_IsIncremental(PyTuple_GET_ITEM(args, n))) {
+            flags |= LZ_THUNK_INCREMENTAL;
+        }
+    }
+    n = 0;
+    while (!flags && kwargs && PyDict_Next(kwargs, &n, &key, &value)) {
+        if (LzThunk_IsIncremental(value)) {
+            flags |= LZ_THUNK_INCREMENTAL;
+        }
+    }
 
     if (!(self = (thunk*) cls->tp_alloc(cls, 0))) {
         return NULL;
     }
+    LZ_INCREMENT(stats.allocated);
 
     Py_INCREF(func);
     self->th_func = func;
@@ -620,8 +1794,14 @@ _thunk_new_no_check(PyTypeObject *cls,
     self->th_kwargs = kwargs;
 
     self->th_normal = NULL;
+    self->th_flags = flags;
+    self->th_site_code = NULL;
+    if (profiling) {
+        record_site(self);
+    }
 
     PyObject_Init((PyObject*) self, cls);
+    update_gc_tracking(self);
     return (PyObject*) self;
 }
 
@@ -630,16 +1810,24 @@ _thunk_new_normal(PyTypeObject *cls, PyObject *normal)
 {
     thunk *self;
 
+    if (cls == &cell_type) {
+        cls = &thunk_type;
+    }
+
     if (!(self = (thunk*) cls->tp_alloc(cls, 0))) {
         return NULL;
     }
+    LZ_INCREMENT(stats.allocated);
     self->th_func = NULL;
     self->th_args = NULL;
     self->th_kwargs = NULL;
     self->th_normal = normal;
     Py_INCREF(normal);
+    self->th_flags = 0;
+    self->th_site_code = NULL;
 
     PyObject_Init((PyObject*) self, cls);
+    update_gc_tracking(self);
     return (PyObject*) self;
 }
 
@@ -686,31 +1874,79 @@ LzThunk_New(PyObject *func, PyObject *args, PyObject *kwargs)
     return inner_thunk_new((PyObject*) &thunk_type, func, args, kwargs);
 }
 
-/* Create a thunk OR construct a strict type.
-   return: A new reference. */
 static PyObject *
-thunk_new(PyObject *cls, PyObject *args, PyObject *kwargs)
+LzThunk_CallVector(PyObject *func,
+                   PyObject *const *args,
+                   Py_ssize_t nargs,
+                   PyObject *kwnames)
 {
-    PyObject *th_func;
-    PyObject *th_args = NULL;
-    Py_ssize_t nargs;
+    PyObject *th_args;
+    PyObject *th_kwargs = NULL;
+    Py_ssize_t nkwargs = kwnames ? PyTuple_GET_SIZE(kwnames) : 0;
     Py_ssize_t n;
-    PyObject *tmp;
     PyObject *ret;
 
-    nargs = PyTuple_GET_SIZE(args);
-    if (nargs < 1) {
-        PyErr_SetString(PyExc_TypeError, "missing callable argument");
+    if (!(th_args = PyTuple_New(nargs))) {
         return NULL;
     }
-
-    th_func = PyTuple_GET_ITEM(args, 0);
-    if (!(th_args = PyTuple_New(nargs - 1))) {
-        return NULL;
+    for (n = 0;n < nargs;++n) {
+        Py_INCREF(args[n]);
+        PyTuple_SET_ITEM(th_args, n, args[n]);
     }
-    for (n = 0;n < nargs - 1;++n) {
-        tmp = PyTuple_GET_ITEM(args, n + 1);
-        Py_INCREF(tmp);
+
+    if (nkwargs) {
+        if (!(th_kwargs = PyDict_New())) {
+            Py_DECREF(th_args);
+            return NULL;
+        }
+        for (n = 0;n < nkwargs;++n) {
+            if (PyDict_SetItem(th_kwargs,
+                               PyTuple_GET_ITEM(kwnames, n),
+                               args[nargs + n])) {
+                Py_DECREF(th_args);
+                Py_DECREF(th_kwargs);
+                return NULL;
+            }
+        }
+    }
+
+    ret = LzThunk_New(func, th_args, th_kwargs);
+    Py_DECREF(th_args);
+    Py_XDECREF(th_kwargs);
+    return ret;
+}
+
+static PyObject *
+LzThunk_NewVector(PyObject *func, PyObject *const *args, Py_ssize_t nargs)
+{
+    return LzThunk_CallVector(func, args, nargs, NULL);
+}
+
+/* Create a thunk OR construct a strict type.
+   return: A new reference. */
+static PyObject *
+thunk_new(PyObject *cls, PyObject *args, PyObject *kwargs)
+{
+    PyObject *th_func;
+    PyObject *th_args = NULL;
+    Py_ssize_t nargs;
+    Py_ssize_t n;
+    PyObject *tmp;
+    PyObject *ret;
+
+    nargs = PyTuple_GET_SIZE(args);
+    if (nargs < 1) {
+        PyErr_SetString(PyExc_TypeError, "missing callable argument");
+        return NULL;
+    }
+
+    th_func = PyTuple_GET_ITEM(args, 0);
+    if (!(th_args = PyTuple_New(nargs - 1))) {
+        return NULL;
+    }
+    for (n = 0;n < nargs - 1;++n) {
+        tmp = PyTuple_GET_ITEM(args, n + 1);
+        Py_INCREF(tmp);
         PyTuple_SET_ITEM(th_args, n, tmp);
     }
     ret = inner_thunk_new(cls, th_func, th_args, kwargs);
@@ -1048,6 +2284,9 @@ thunk_traverse(thunk *self, visitproc visit, void *arg)
     if (self->th_normal) {
         Py_VISIT(self->th_normal);
     }
+    if (self->th_site_code) {
+        Py_VISIT(self->th_site_code);
+    }
     return 0;
 }
 
@@ -1058,6 +2297,7 @@ thunk_clear(thunk *self)
     Py_CLEAR(self->th_args);
     Py_CLEAR(self->th_kwargs);
     Py_CLEAR(self->th_normal);
+    Py_CLEAR(self->th_site_code);
     return 0;
 }
 
@@ -1092,264 +2332,1143 @@ thunk_next(thunk *self)
 
 /* Rich compare helpers ---------------------------------------------------- */
 
-#define THUNK_CMPOP(name, op)                                           \
-    static inline PyObject *                                            \
-    thunk_ ## name(PyObject *self, PyObject *other)                     \
-    {                                                                   \
-        return PyObject_RichCompare(self, other, op);                   \
-    }                                                                   \
-    BINWRAPPER_FROM_FUNC(thunk_ ## name, name)
+#define THUNK_CMPOP(name, op)                                           \
+    static inline PyObject *                                            \
+    thunk_ ## name(PyObject *self, PyObject *other)                     \
+    {                                                                   \
+        return PyObject_RichCompare(self, other, op);                   \
+    }                                                                   \
+    BINWRAPPER_FROM_FUNC(thunk_ ## name, name)
+
+THUNK_CMPOP(lt, Py_LT)
+THUNK_CMPOP(le, Py_LE)
+THUNK_CMPOP(eq, Py_EQ)
+THUNK_CMPOP(ne, Py_NE)
+THUNK_CMPOP(gt, Py_GT)
+THUNK_CMPOP(ge, Py_GE)
+
+static PyObject *
+thunk_richcmp(thunk *self, PyObject *other, int op)
+{
+    PyObject *func;
+    PyObject *arg;
+    PyObject *ret;
+
+    if (!(arg = PyTuple_Pack(2, self, other))) {
+        return NULL;
+    }
+
+    switch(op) {
+    case Py_LT:
+        func = LzBinary_lt;
+        break;
+    case Py_LE:
+        func = LzBinary_le;
+        break;
+    case Py_EQ:
+        func = LzBinary_eq;
+        break;
+    case Py_NE:
+        func = LzBinary_ne;
+        break;
+    case Py_GT:
+        func = LzBinary_gt;
+        break;
+    case Py_GE:
+        func = LzBinary_ge;
+        break;
+    default:
+      Py_DECREF(arg);
+      PyErr_BadInternalCall();
+      return NULL;
+    }
+
+    ret = _thunk_new_no_check(Py_TYPE(self), func, arg, NULL);
+    Py_DECREF(arg);
+    return ret;
+}
+
+/* Extra methods ----------------------------------------------------------- */
+
+PyDoc_STRVAR(thunk_fromexpr_doc,
+             "Create a thunk that wraps an expression.\n"
+             "\n"
+             "Parameters\n"
+             "----------\n"
+             "expr : any\n"
+             "    The expression to wrap.\n"
+             "\n"
+             "Returns\n"
+             "-------\n"
+             "th : thunk\n"
+             "    The boxed version of ``expr``.\n"
+             "\n"
+             "Notes\n"
+             "-----\n"
+             "A normal python value is an expression in normal form.\n"
+             "When passed a normal python value, this function will return a\n"
+             "thunk that is already in normal form and will evaluate to the\n"
+             "passed. When passed a thunk, this will act as the identity\n");
+
+/* Create a thunk that wraps an expression. */
+static PyObject *
+thunk_fromexpr(PyTypeObject *cls, PyObject *expr)
+{
+    int status;
+
+    if ((status = PyObject_IsSubclass((PyObject*) Py_TYPE(expr),
+                                      (PyObject*) &thunk_type)) > 0 ||
+        ((status = PyObject_IsInstance(expr, (PyObject*) &PyType_Type)) > 0 &&
+         (status = PyObject_IsSubclass(expr, (PyObject*) &LzStrict_Type)) > 0) ||
+        (status = PyObject_IsInstance(expr, (PyObject*) &LzStrict_Type))) {
+        /* if the expr is a thunk or a strict type constructor then
+         * ths is the identity */
+        Py_INCREF(expr);
+        return expr;
+    }
+    else if (status < 0) {
+        return NULL;
+    }
+
+    return _thunk_new_normal(cls, expr);
+}
+
+static PyObject *
+LzThunk_FromExpr(PyObject *expr)
+{
+    return thunk_fromexpr(&thunk_type, expr);
+}
+
+PyDoc_STRVAR(get_children_doc,
+             "Get the children of a thunk.\n"
+             "\n"
+             "Parameters\n"
+             "----------\n"
+             "th : thunk\n"
+             "    The thunk to get the children of.\n"
+             "\n"
+             "Returns\n"
+             "-------\n"
+             "children : tuple\n"
+             "    The children of ``th``. This will either be a tuple of:\n"
+             "        (func, args, kwargs)\n"
+             "    or\n"
+             "        (normal,)\n"
+             "    The first case is when the thunk has never been computed.\n"
+             "    The second case is when the thunk has been computed. By\n"
+             "    this point we no longer have the func, args or kwargs.\n"
+             "    Thunks which depend on a ``Cell`` always return their func,\n"
+             "    args and kwargs because they may need to be recomputed.\n");
+
+static PyObject *
+LzThunk_GetChildren(PyObject *th)
+{
+    thunk *asthunk;
+    PyObject *kwargs;
+    PyObject *ret;
+    int status;
+
+    if (!(status = PyObject_IsInstance(th, (PyObject*)  &thunk_type))) {
+        PyErr_SetString(
+            PyExc_TypeError,
+            "get_children expected argument of type thunk");
+        return NULL;
+    }
+    else if (status < 0) {
+        return NULL;
+    }
+    asthunk = (thunk*) th;
+
+    /* Read the children in a critical section because the thread which
+       evaluates the thunk clears them. */
+    LZ_BEGIN_CRITICAL_SECTION(th);
+    if (asthunk->th_normal &&
+        asthunk->th_normal != &recursionguard &&
+        !(asthunk->th_flags & LZ_THUNK_INCREMENTAL && asthunk->th_func)) {
+        ret = PyTuple_Pack(1, asthunk->th_normal);
+    }
+    else if (!((kwargs = asthunk->th_kwargs) || (kwargs = PyDict_New()))) {
+        /* we use `NULL` for kwargs when there are no kwargs present, we need
+           to create an empty dictionary to pass back to python */
+        ret = NULL;
+    }
+    else {
+        /* to unify the code path with creation of a new empty dict, we incref
+           the kwargs to keep the reference count neutral when we decref
+           below */
+        Py_INCREF(kwargs);
+        ret = PyTuple_Pack(3,
+                           asthunk->th_func,
+                           asthunk->th_args,
+                           kwargs);
+        Py_DECREF(kwargs);
+    }
+    LZ_END_CRITICAL_SECTION();
+    return ret;
+}
+
+static PyObject *
+get_children(PyObject *self, PyObject *th)
+{
+    return LzThunk_GetChildren(th);
+}
+
+/* Check that the argument of one of the functions for evaluating a thunk
+   outside of `strict` is a thunk.
+   return: The thunk or NULL with an exception set. */
+static thunk *
+thunk_arg(PyObject *ob, const char *name)
+{
+    if (!PyObject_TypeCheck(ob, &thunk_type)) {
+        PyErr_Format(PyExc_TypeError,
+                     "%s expected argument of type thunk",
+                     name);
+        return NULL;
+    }
+    return (thunk*) ob;
+}
+
+/* Check that a thunk was claimed by the running thread.
+   return: 0 if it was, otherwise -1 with an exception set. */
+static int
+check_claimed(thunk *th, const char *name)
+{
+    if (LZ_LOAD_PTR(th->th_normal) != &recursionguard ||
+        th->th_owner != PyThread_get_thread_ident()) {
+        PyErr_Format(PyExc_ValueError,
+                     "%s: the thunk is not claimed by the running thread",
+                     name);
+        return -1;
+    }
+    return 0;
+}
+
+PyDoc_STRVAR(claim_doc,
+             "Claim a pending thunk so that the running thread may compute\n"
+             "its normal form without calling ``strict``.\n"
+             "\n"
+             "Parameters\n"
+             "----------\n"
+             "th : thunk\n"
+             "    The thunk to claim.\n"
+             "\n"
+             "Returns\n"
+             "-------\n"
+             "claimed : bool\n"
+             "    True if the thunk was claimed. The running thread must then\n"
+             "    call ``_finish`` or ``_release``. False if the thunk is\n"
+             "    already in normal form.\n"
+             "\n"
+             "Raises\n"
+             "------\n"
+             "RecursionError\n"
+             "    Raised when the running thread is already evaluating\n"
+             "    ``th``.\n"
+             "\n"
+             "Notes\n"
+             "-----\n"
+             "Like ``strict``, this checks the deadline of the running\n"
+             "thread and waits for another thread which is evaluating\n"
+             "``th``. Other threads which force ``th`` wait until it is\n"
+             "finished or released.\n");
+
+/* Claim a thunk for evaluation outside of `strict`.
+   return: 1 if the thunk was claimed, 0 if it is in normal form, or -1 on
+   failure. */
+static int
+claim_pending(thunk *th)
+{
+    int claimed;
+
+    if (LZ_LOAD(deadlines_entered) && check_deadline()) {
+        return -1;
+    }
+    if ((claimed = claim_thunk(th)) < 0) {
+        return -1;
+    }
+    if (!claimed && LZ_LOAD_PTR(th->th_normal) == &recursionguard) {
+        /* This thread is already evaluating the thunk. */
+        LZ_INCREMENT(stats.recursion_guard_hits);
+        PyErr_SetString(Lz_RecursionError, "recursivly defined thunk");
+        return -1;
+    }
+    return claimed;
+}
+
+static PyObject *
+claim(PyObject *self, PyObject *ob)
+{
+    thunk *th;
+    int claimed;
+
+    if (!(th = thunk_arg(ob, "_claim")) || (claimed = claim_pending(th)) < 0) {
+        return NULL;
+    }
+    if (claimed) {
+        LZ_INCREMENT(stats.forced);
+    }
+    return PyBool_FromLong(claimed);
+}
+
+PyDoc_STRVAR(eval_call_doc,
+             "Claim a pending thunk and call its function without computing\n"
+             "the normal form of the result.\n"
+             "\n"
+             "Parameters\n"
+             "----------\n"
+             "th : thunk\n"
+             "    The thunk to evaluate.\n"
+             "\n"
+             "Returns\n"
+             "-------\n"
+             "claimed : bool\n"
+             "    True if the thunk was claimed. The running thread must then\n"
+             "    call ``_finish`` or ``_release``.\n"
+             "value : any\n"
+             "    The result of the call if the thunk was claimed, otherwise\n"
+             "    the normal form of the thunk.\n"
+             "\n"
+             "Raises\n"
+             "------\n"
+             "RecursionError\n"
+             "    Raised when the running thread is already evaluating\n"
+             "    ``th``.\n"
+             "\n"
+             "Notes\n"
+             "-----\n"
+             "The arguments are evaluated with ``strict`` and the call is\n"
+             "counted and profiled like it is in ``strict``. The thunk stays\n"
+             "claimed after the call returns, if the call fails the thunk is\n"
+             "released. Subclasses which define ``__strict__`` are evaluated\n"
+             "with ``strict`` and are not claimed.\n");
+
+static PyObject *
+eval_call(PyObject *self, PyObject *ob)
+{
+    thunk *th;
+    PyObject *strict_method;
+    PyObject *value;
+    bool keep_inputs = false;
+    int claimed;
+
+    if (!(th = thunk_arg(ob, "_eval_call"))) {
+        return NULL;
+    }
+    if (!LzThunk_CheckExact(th)) {
+        if ((strict_method = lookup_special(ob, strict_str))) {
+            Py_DECREF(strict_method);
+            if (!(value = strict_eval(ob))) {
+                return NULL;
+            }
+            return Py_BuildValue("ON", Py_False, value);
+        }
+        if (PyErr_Occurred()) {
+            return NULL;
+        }
+    }
+
+    if ((claimed = claim_pending(th)) < 0) {
+        return NULL;
+    }
+    if (!claimed) {
+        if (!(value = strict_eval(ob))) {
+            return NULL;
+        }
+        return Py_BuildValue("ON", Py_False, value);
+    }
+
+    if (!(value = _eval_claimed(th, _call_claimed_thunk, &keep_inputs))) {
+        finish_thunk(th, NULL, false);
+        return NULL;
+    }
+    return Py_BuildValue("ON", Py_True, value);
+}
+
+PyDoc_STRVAR(finish_doc,
+             "Store the normal form of a thunk claimed by the running\n"
+             "thread and wake the threads waiting for it.\n"
+             "\n"
+             "Parameters\n"
+             "----------\n"
+             "th : thunk\n"
+             "    The claimed thunk.\n"
+             "normal : any\n"
+             "    The normal form of ``th``.\n");
+
+static PyObject *
+finish(PyObject *self, PyObject *args)
+{
+    PyObject *ob;
+    PyObject *normal;
+    thunk *th;
+
+    if (!PyArg_ParseTuple(args, "OO:_finish", &ob, &normal)) {
+        return NULL;
+    }
+    if (!(th = thunk_arg(ob, "_finish")) || check_claimed(th, "_finish")) {
+        return NULL;
+    }
+    Py_INCREF(normal);
+    finish_thunk(th, normal, th->th_flags & LZ_THUNK_INCREMENTAL);
+    Py_RETURN_NONE;
+}
+
+PyDoc_STRVAR(release_doc,
+             "Release a thunk claimed by the running thread whose\n"
+             "evaluation failed. The thunk is pending again.\n"
+             "\n"
+             "Parameters\n"
+             "----------\n"
+             "th : thunk\n"
+             "    The claimed thunk.\n");
+
+static PyObject *
+release(PyObject *self, PyObject *ob)
+{
+    thunk *th;
+
+    if (!(th = thunk_arg(ob, "_release")) || check_claimed(th, "_release")) {
+        return NULL;
+    }
+    finish_thunk(th, NULL, false);
+    Py_RETURN_NONE;
+}
+
+/* Python hooks ------------------------------------------------------------ */
+
+/* Call the function `name` from the module `module_name` with `self`
+   prepended to `args`. The module is only imported the first time the hook
+   is used and then cached in `*module`. This lets the protocols which are
+   implemented in python, like `lazy.array`, keep their dependencies optional.
+   return: A new reference. */
+static PyObject *
+_call_hook(PyObject **module,
+           const char *module_name,
+           const char *name,
+           PyObject *self,
+           PyObject *args,
+           PyObject *kwargs)
+{
+    PyObject *hook;
+    PyObject *hook_args;
+    PyObject *tmp;
+    PyObject *ret;
+    Py_ssize_t nargs;
+    Py_ssize_t n;
+
+    if (!*module && !(*module = PyImport_ImportModule(module_name))) {
+        return NULL;
+    }
+
+    if (!(hook = PyObject_GetAttrString(*module, name))) {
+        return NULL;
+    }
+
+    nargs = PyTuple_GET_SIZE(args);
+    if (!(hook_args = PyTuple_New(nargs + 1))) {
+        Py_DECREF(hook);
+        return NULL;
+    }
+    Py_INCREF(self);
+    PyTuple_SET_ITEM(hook_args, 0, self);
+    for (n = 0;n < nargs;++n) {
+        tmp = PyTuple_GET_ITEM(args, n);
+        Py_INCREF(tmp);
+        PyTuple_SET_ITEM(hook_args, n + 1, tmp);
+    }
+
+    ret = PyObject_Call(hook, hook_args, kwargs);
+    Py_DECREF(hook);
+    Py_DECREF(hook_args);
+    return ret;
+}
+
+/* NumPy protocols --------------------------------------------------------- */
+
+static PyObject *array_module = NULL;
+
+static PyObject *
+thunk_array_ufunc(PyObject *self, PyObject *args, PyObject *kwargs)
+{
+    return _call_hook(&array_module,
+                      "lazy.array",
+                      "array_ufunc",
+                      self,
+                      args,
+                      kwargs);
+}
+
+static PyObject *
+thunk_array_function(PyObject *self, PyObject *args)
+{
+    return _call_hook(&array_module,
+                      "lazy.array",
+                      "array_function",
+                      self,
+                      args,
+                      NULL);
+}
+
+PyDoc_STRVAR(thunk_array_ufunc_doc,
+             "Defer a numpy ufunc call that has a thunk as an input.\n"
+             "\n"
+             "Elementwise ufunc calls are fused with their pending\n"
+             "elementwise inputs, see ``lazy.array.fuse``.\n");
+
+PyDoc_STRVAR(thunk_array_function_doc,
+             "Defer a numpy function call that has a thunk as an argument.\n");
+
+/* Async protocol ---------------------------------------------------------- */
+
+#if LZ_HAS_ASYNC
+static PyObject *aio_module = NULL;
+
+/* Awaiting a thunk evaluates it with `lazy.aio.strict_async`. */
+static PyObject *
+thunk_await(PyObject *self)
+{
+    PyObject *args;
+    PyObject *coro;
+    PyObject *ret;
+
+    if (!(args = PyTuple_New(0))) {
+        return NULL;
+    }
+    coro = _call_hook(&aio_module,
+                      "lazy.aio",
+                      "strict_async",
+                      self,
+                      args,
+                      NULL);
+    Py_DECREF(args);
+    if (!coro) {
+        return NULL;
+    }
+
+    ret = PyObject_CallMethod(coro, "__await__", NULL);
+    Py_DECREF(coro);
+    return ret;
+}
+
+static PyAsyncMethods thunk_as_async = {
+    (unaryfunc) thunk_await,                    /* am_await */
+    0,                                          /* am_aiter */
+    0,                                          /* am_anext */
+};
+#endif
+
+PyMethodDef thunk_methods[] = {
+    {"fromexpr",
+     (PyCFunction) thunk_fromexpr,
+     METH_CLASS | METH_O,
+     thunk_fromexpr_doc},
+    {"__array_ufunc__",
+     (PyCFunction) thunk_array_ufunc,
+     METH_VARARGS | METH_KEYWORDS,
+     thunk_array_ufunc_doc},
+    {"__array_function__",
+     (PyCFunction) thunk_array_function,
+     METH_VARARGS,
+     thunk_array_function_doc},
+    {NULL},
+};
+
+/* thunk definition -------------------------------------------------------- */
+
+PyDoc_STRVAR(thunk_doc,
+             "A deferred computation.\n"
+             "\n"
+             "Parameters\n"
+             "----------\n"
+             "func : callable\n"
+             "    The function to delay calling.\n"
+             "*args : any\n"
+             "    The positional arguments to pass to ``func``.\n"
+             "**kwargs : any\n"
+             "    The keyword arguments to pass to ``func``.\n");
+
+static PyTypeObject thunk_type = {
+    PyVarObject_HEAD_INIT(&PyType_Type, 0)
+    "lazy.thunk",                               /* tp_name */
+    sizeof(thunk),                              /* tp_basicsize */
+    0,                                          /* tp_itemsize */
+    (destructor) thunk_dealloc,                 /* tp_dealloc */
+    0,                                          /* tp_print */
+    0,                                          /* tp_getattr */
+    0,                                          /* tp_setattr */
+#if LZ_HAS_ASYNC
+    &thunk_as_async,                            /* tp_as_async */
+#else
+    0,                                          /* tp_reserved */
+#endif
+    (reprfunc) thunk_repr,                      /* tp_repr */
+    &thunk_as_number,                           /* tp_as_number */
+    0,                                          /* tp_as_sequence */
+    &thunk_as_mapping,                          /* tp_as_mapping */
+    (hashfunc) thunk_hash,                      /* tp_hash */
+    (ternaryfunc) thunk_call,                   /* tp_call */
+    (reprfunc) thunk_str,                       /* tp_str */
+    (getattrofunc) thunk_getattro,              /* tp_getattro */
+    (setattrofunc) thunk_setattro,              /* tp_setattro */
+    0,                                          /* tp_as_buffer */
+    Py_TPFLAGS_DEFAULT |
+    Py_TPFLAGS_BASETYPE |
+    Py_TPFLAGS_HAVE_GC,                         /* tp_flags */
+    thunk_doc,                                  /* tp_doc */
+    (traverseproc) thunk_traverse,              /* tp_traverse */
+    (inquiry) thunk_clear,                      /* tp_clear */
+    (richcmpfunc) thunk_richcmp,                /* tp_richcompare */
+    0,                                          /* tp_weaklistoffset */
+    (getiterfunc) thunk_iter,                   /* tp_iter */
+    (iternextfunc) thunk_next,                  /* tp_iternext */
+    thunk_methods,                              /* tp_methods */
+    0,                                          /* tp_members */
+    0,                                          /* tp_getset */
+    &PyBaseObject_Type,                         /* tp_base */
+    0,                                          /* tp_dict */
+    0,                                          /* tp_descr_get */
+    0,                                          /* tp_descr_set */
+    0,                                          /* tp_dictoffset */
+    0,                                          /* tp_init */
+    (allocfunc) PyType_GenericAlloc,            /* tp_alloc */
+    (newfunc) thunk_new,                        /* tp_new */
+    (freefunc) thunk_free,                      /* tp_free */
+};
+
+/* cell -------------------------------------------------------------------- */
+
+static PyObject *
+cell_new(PyTypeObject *cls, PyObject *args, PyObject *kwargs)
+{
+    static char *keywords[] = {"value", NULL};
+    PyObject *value;
+    thunk *self;
+
+    if (!PyArg_ParseTupleAndKeywords(args,
+                                     kwargs,
+                                     "O:Cell",
+                                     keywords,
+                                     &value)) {
+        return NULL;
+    }
+
+    if (!(value = strict_eval(value))) {
+        return NULL;
+    }
+
+    if (!(self = (thunk*) cls->tp_alloc(cls, 0))) {
+        Py_DECREF(value);
+        return NULL;
+    }
+    LZ_INCREMENT(stats.allocated);
+    self->th_normal = value;
+    self->th_flags = LZ_THUNK_INCREMENTAL;
+    self->th_site_code = NULL;
+    self->th_changed_at = revision;
+    self->th_verified_at = revision;
+    return (PyObject*) self;
+}
+
+PyDoc_STRVAR(cell_set_doc,
+             "Replace the value of the cell.\n"
+             "\n"
+             "Parameters\n"
+             "----------\n"
+             "value : any\n"
+             "    The new value. This is strictly evaluated.\n");
+
+static PyObject *
+cell_set(thunk *self, PyObject *value)
+{
+    PyObject *tmp;
+
+    if (!(value = strict_eval(value))) {
+        return NULL;
+    }
+
+    if (value == self->th_normal) {
+        Py_DECREF(value);
+        Py_RETURN_NONE;
+    }
+
+    ++revision;
+    tmp = self->th_normal;
+    self->th_normal = value;
+    Py_XDECREF(tmp);
+    self->th_changed_at = revision;
+    self->th_verified_at = revision;
+    Py_RETURN_NONE;
+}
+
+static PyObject *
+cell_getattro(PyObject *self, PyObject *name)
+{
+    if (!PyUnicode_CompareWithASCIIString(name, "set")) {
+        return PyObject_GenericGetAttr(self, name);
+    }
+    return thunk_getattro(self, name);
+}
+
+PyMethodDef cell_methods[] = {
+    {"set",
+     (PyCFunction) cell_set,
+     METH_O,
+     cell_set_doc},
+    {NULL},
+};
+
+PyDoc_STRVAR(cell_doc,
+             "A thunk whose value may be replaced.\n"
+             "\n"
+             "Parameters\n"
+             "----------\n"
+             "value : any\n"
+             "    The initial value of the cell. This is strictly evaluated.\n"
+             "\n"
+             "Notes\n"
+             "-----\n"
+             "Thunks built from a cell remember how they were computed. After\n"
+             "``set`` is called, the next ``strict`` of a thunk recomputes\n"
+             "only the parts of the expression which depend on a changed\n"
+             "cell. If a recomputed subexpression is equal to its previous\n"
+             "value, the thunks which depend on it are not recomputed.\n"
+             "\n"
+             "Only the func, args, and kwargs that a thunk was built with are\n"
+             "tracked; cells which are read inside of a function call are\n"
+             "not dependencies of the result.\n");
+
+static PyTypeObject cell_type = {
+    PyVarObject_HEAD_INIT(&PyType_Type, 0)
+    "lazy.Cell",                                /* tp_name */
+    sizeof(thunk),                              /* tp_basicsize */
+    0,                                          /* tp_itemsize */
+    (destructor) thunk_dealloc,                 /* tp_dealloc */
+    0,                                          /* tp_print */
+    0,                                          /* tp_getattr */
+    0,                                          /* tp_setattr */
+    0,                                          /* tp_reserved */
+    0,                                          /* tp_repr */
+    0,                                          /* tp_as_number */
+    0,                                          /* tp_as_sequence */
+    0,                                          /* tp_as_mapping */
+    0,                                          /* tp_hash */
+    0,                                          /* tp_call */
+    0,                                          /* tp_str */
+    (getattrofunc) cell_getattro,               /* tp_getattro */
+    0,                                          /* tp_setattro */
+    0,                                          /* tp_as_buffer */
+    Py_TPFLAGS_DEFAULT |
+    Py_TPFLAGS_HAVE_GC,                         /* tp_flags */
+    cell_doc,                                   /* tp_doc */
+    (traverseproc) thunk_traverse,              /* tp_traverse */
+    (inquiry) thunk_clear,                      /* tp_clear */
+    0,                                          /* tp_richcompare */
+    0,                                          /* tp_weaklistoffset */
+    0,                                          /* tp_iter */
+    0,                                          /* tp_iternext */
+    cell_methods,                               /* tp_methods */
+    0,                                          /* tp_members */
+    0,                                          /* tp_getset */
+    &thunk_type,                                /* tp_base */
+    0,                                          /* tp_dict */
+    0,                                          /* tp_descr_get */
+    0,                                          /* tp_descr_set */
+    0,                                          /* tp_dictoffset */
+    0,                                          /* tp_init */
+    (allocfunc) PyType_GenericAlloc,            /* tp_alloc */
+    (newfunc) cell_new,                         /* tp_new */
+    (freefunc) thunk_free,                      /* tp_free */
+};
+
+/* boxcache ---------------------------------------------------------------- */
+
+/* A cache of the last value boxed at a single load site in a lazy function.
+   Globals are usually the same object on every load so this saves
+   allocating a new normal thunk each time. */
+typedef struct {
+    PyObject_HEAD
+    PyTypeObject *bc_cls;
+    PyObject *bc_raw;
+    PyObject *bc_boxed;
+} boxcache;
+
+static PyObject *
+boxcache_new(PyTypeObject *cls, PyObject *args, PyObject *kwargs)
+{
+    static char *keywords[] = {"cls", NULL};
+    PyTypeObject *thunk_cls;
+    boxcache *self;
+
+    if (!PyArg_ParseTupleAndKeywords(args,
+                                     kwargs,
+                                     "O!:boxcache",
+                                     keywords,
+                                     &PyType_Type,
+                                     &thunk_cls)) {
+        return NULL;
+    }
+
+    if (!PyType_IsSubtype(thunk_cls, &thunk_type)) {
+        PyErr_Format(PyExc_TypeError,
+                     "cls must be a subclass of thunk, got %R",
+                     thunk_cls);
+        return NULL;
+    }
+
+    if (!(self = (boxcache*) cls->tp_alloc(cls, 0))) {
+        return NULL;
+    }
+    Py_INCREF(thunk_cls);
+    self->bc_cls = thunk_cls;
+    self->bc_raw = NULL;
+    self->bc_boxed = NULL;
+    return (PyObject*) self;
+}
+
+static PyObject *
+boxcache_call(boxcache *self, PyObject *args, PyObject *kwargs)
+{
+    PyObject *raw;
+    PyObject *boxed;
+
+    if (kwargs && PyDict_Size(kwargs)) {
+        PyErr_SetString(PyExc_TypeError,
+                        "boxcache takes no keyword arguments");
+        return NULL;
+    }
+    if (!PyArg_UnpackTuple(args, "boxcache", 1, 1, &raw)) {
+        return NULL;
+    }
+
+    LZ_BEGIN_CRITICAL_SECTION(self);
+    if (raw == self->bc_raw) {
+        boxed = self->bc_boxed;
+        Py_INCREF(boxed);
+    }
+    /* The name was rebound or this is the first load. */
+    else if ((boxed = thunk_fromexpr(self->bc_cls, raw))) {
+        Py_INCREF(raw);
+        Py_XSETREF(self->bc_raw, raw);
+        Py_INCREF(boxed);
+        Py_XSETREF(self->bc_boxed, boxed);
+    }
+    LZ_END_CRITICAL_SECTION();
+    return boxed;
+}
+
+static int
+boxcache_traverse(boxcache *self, visitproc visit, void *arg)
+{
+    Py_VISIT(self->bc_cls);
+    Py_VISIT(self->bc_raw);
+    Py_VISIT(self->bc_boxed);
+    return 0;
+}
+
+static int
+boxcache_clear(boxcache *self)
+{
+    Py_CLEAR(self->bc_cls);
+    Py_CLEAR(self->bc_raw);
+    Py_CLEAR(self->bc_boxed);
+    return 0;
+}
+
+static void
+boxcache_dealloc(boxcache *self)
+{
+    PyObject_GC_UnTrack((PyObject*) self);
+    boxcache_clear(self);
+    Py_TYPE(self)->tp_free((PyObject*) self);
+}
+
+PyDoc_STRVAR(boxcache_doc,
+             "A cache for boxing the values loaded at one site.\n"
+             "\n"
+             "Parameters\n"
+             "----------\n"
+             "cls : type\n"
+             "    The subclass of thunk to box values with.\n"
+             "\n"
+             "Notes\n"
+             "-----\n"
+             "Calling the cache with a value returns ``cls.fromexpr(value)``.\n"
+             "If the value is the same object as the previous call, the\n"
+             "previous box is returned instead of allocating a new one.\n");
+
+static PyTypeObject boxcache_type = {
+    PyVarObject_HEAD_INIT(&PyType_Type, 0)
+    "lazy._thunk.boxcache",                     /* tp_name */
+    sizeof(boxcache),                           /* tp_basicsize */
+    0,                                          /* tp_itemsize */
+    (destructor) boxcache_dealloc,              /* tp_dealloc */
+    0,                                          /* tp_print */
+    0,                                          /* tp_getattr */
+    0,                                          /* tp_setattr */
+    0,                                          /* tp_reserved */
+    0,                                          /* tp_repr */
+    0,                                          /* tp_as_number */
+    0,                                          /* tp_as_sequence */
+    0,                                          /* tp_as_mapping */
+    0,                                          /* tp_hash */
+    (ternaryfunc) boxcache_call,                /* tp_call */
+    0,                                          /* tp_str */
+    0,                                          /* tp_getattro */
+    0,                                          /* tp_setattro */
+    0,                                          /* tp_as_buffer */
+    Py_TPFLAGS_DEFAULT |
+    Py_TPFLAGS_HAVE_GC,                         /* tp_flags */
+    boxcache_doc,                               /* tp_doc */
+    (traverseproc) boxcache_traverse,           /* tp_traverse */
+    (inquiry) boxcache_clear,                   /* tp_clear */
+    0,                                          /* tp_richcompare */
+    0,                                          /* tp_weaklistoffset */
+    0,                                          /* tp_iter */
+    0,                                          /* tp_iternext */
+    0,                                          /* tp_methods */
+    0,                                          /* tp_members */
+    0,                                          /* tp_getset */
+    0,                                          /* tp_base */
+    0,                                          /* tp_dict */
+    0,                                          /* tp_descr_get */
+    0,                                          /* tp_descr_set */
+    0,                                          /* tp_dictoffset */
+    0,                                          /* tp_init */
+    (allocfunc) PyType_GenericAlloc,            /* tp_alloc */
+    (newfunc) boxcache_new,                     /* tp_new */
+    (freefunc) PyObject_GC_Del,                 /* tp_free */
+};
+
+/* Module level ------------------------------------------------------------ */
+
+PyDoc_STRVAR(module_doc,"A defered computation.");
 
-THUNK_CMPOP(lt, Py_LT)
-THUNK_CMPOP(le, Py_LE)
-THUNK_CMPOP(eq, Py_EQ)
-THUNK_CMPOP(ne, Py_NE)
-THUNK_CMPOP(gt, Py_GT)
-THUNK_CMPOP(ge, Py_GE)
+PyDoc_STRVAR(stats_doc,
+             "Read the runtime counters.\n"
+             "\n"
+             "Parameters\n"
+             "----------\n"
+             "reset : bool, optional\n"
+             "    Set the counters back to zero after reading them.\n"
+             "\n"
+             "Returns\n"
+             "-------\n"
+             "stats : dict[str, int]\n"
+             "    The counters:\n"
+             "        allocated : thunks allocated\n"
+             "        deallocated_pending : thunks deallocated before they\n"
+             "            were evaluated, the work which was never needed\n"
+             "        forced : thunks evaluated\n"
+             "        strict_dispatches : calls to ``__strict__`` methods\n"
+             "        recursion_guard_hits : thunks which needed their own\n"
+             "            value\n"
+             "        max_depth : the deepest nesting of thunk evaluations\n"
+             "\n"
+             "Notes\n"
+             "-----\n"
+             "The counters are always on, each event costs one increment.\n");
 
 static PyObject *
-thunk_richcmp(thunk *self, PyObject *other, int op)
+get_stats(PyObject *self, PyObject *args, PyObject *kwargs)
 {
-    PyObject *func;
-    PyObject *arg;
+    static char *keywords[] = {"reset", NULL};
+    int reset = 0;
     PyObject *ret;
 
-    if (!(arg = PyTuple_Pack(2, self, other))) {
+    if (!PyArg_ParseTupleAndKeywords(args,
+                                     kwargs,
+                                     "|p:stats",
+                                     keywords,
+                                     &reset)) {
         return NULL;
     }
 
-    switch(op) {
-    case Py_LT:
-        func = LzBinary_lt;
-        break;
-    case Py_LE:
-        func = LzBinary_le;
-        break;
-    case Py_EQ:
-        func = LzBinary_eq;
-        break;
-    case Py_NE:
-        func = LzBinary_ne;
-        break;
-    case Py_GT:
-        func = LzBinary_gt;
-        break;
-    case Py_GE:
-        func = LzBinary_ge;
-        break;
-    default:
-      Py_DECREF(arg);
-      PyErr_BadInternalCall();
-      return NULL;
+    ret = Py_BuildValue("{s:n,s:n,s:n,s:n,s:n,s:n}",
+                        "allocated", stats.allocated,
+                        "deallocated_pending", stats.deallocated_pending,
+                        "forced", stats.forced,
+                        "strict_dispatches", stats.strict_dispatches,
+                        "recursion_guard_hits", stats.recursion_guard_hits,
+                        "max_depth", stats.max_depth);
+    if (ret && reset) {
+        memset(&stats, 0, sizeof(stats));
     }
-
-    ret = _thunk_new_no_check(Py_TYPE(self), func, arg, NULL);
-    Py_DECREF(arg);
     return ret;
 }
 
-/* Extra methods ----------------------------------------------------------- */
-
-PyDoc_STRVAR(thunk_fromexpr_doc,
-             "Create a thunk that wraps an expression.\n"
+PyDoc_STRVAR(set_profiling_doc,
+             "Turn the creation site profiler on or off.\n"
              "\n"
              "Parameters\n"
              "----------\n"
-             "expr : any\n"
-             "    The expression to wrap.\n"
-             "\n"
-             "Returns\n"
-             "-------\n"
-             "th : thunk\n"
-             "    The boxed version of ``expr``.\n"
+             "on : bool\n"
+             "    Should thunks record their creation site and the time\n"
+             "    spent evaluating them?\n"
              "\n"
              "Notes\n"
              "-----\n"
-             "A normal python value is an expression in normal form.\n"
-             "When passed a normal python value, this function will return a\n"
-             "thunk that is already in normal form and will evaluate to the\n"
-             "passed. When passed a thunk, this will act as the identity\n");
+             "Use ``lazy.profile.Profile`` instead of calling this directly.\n");
 
-/* Create a thunk that wraps an expression. */
 static PyObject *
-thunk_fromexpr(PyTypeObject *cls, PyObject *expr)
+set_profiling(PyObject *self, PyObject *on)
 {
     int status;
 
-    if ((status = PyObject_IsSubclass((PyObject*) Py_TYPE(expr),
-                                      (PyObject*) &thunk_type)) > 0 ||
-        ((status = PyObject_IsInstance(expr, (PyObject*) &PyType_Type)) > 0 &&
-         (status = PyObject_IsSubclass(expr, (PyObject*) &LzStrict_Type)) > 0) ||
-        (status = PyObject_IsInstance(expr, (PyObject*) &LzStrict_Type))) {
-        /* if the expr is a thunk or a strict type constructor then
-         * ths is the identity */
-        Py_INCREF(expr);
-        return expr;
+    if ((status = PyObject_IsTrue(on)) < 0) {
+        return NULL;
     }
-    else if (status < 0) {
+    if (status && !profile_data && !(profile_data = PyDict_New())) {
         return NULL;
     }
-
-    return _thunk_new_normal(cls, expr);
-}
-
-static PyObject *
-LzThunk_FromExpr(PyObject *expr)
-{
-    return thunk_fromexpr(&thunk_type, expr);
+    profiling = status;
+    Py_RETURN_NONE;
 }
 
-PyDoc_STRVAR(get_children_doc,
-             "Get the children of a thunk.\n"
+PyDoc_STRVAR(profile_data_doc,
+             "Read the time charged to each creation site.\n"
              "\n"
              "Parameters\n"
              "----------\n"
-             "th : thunk\n"
-             "    The thunk to get the children of.\n"
+             "reset : bool, optional\n"
+             "    Clear the data after reading it.\n"
              "\n"
              "Returns\n"
              "-------\n"
-             "children : tuple\n"
-             "    The children of ``th``. This will either be a tuple of:\n"
-             "        (func, args, kwargs)\n"
-             "    or\n"
-             "        (normal,)\n"
-             "    The first case is when the thunk has never been computed.\n"
-             "    The second case is when the thunk has been computed. By\n"
-             "    this point we no longer have the func, args or kwargs.\n");
+             "data : dict[(code, int) or None -> (int, int, int)]\n"
+             "    A map from the code and line that created thunks, or None\n"
+             "    for thunks created while the profiler was off, to the\n"
+             "    number of thunks evaluated, the nanoseconds spent\n"
+             "    evaluating them excluding nested thunks, and the\n"
+             "    nanoseconds including nested thunks.\n");
 
 static PyObject *
-LzThunk_GetChildren(PyObject *th)
+get_profile_data(PyObject *self, PyObject *args, PyObject *kwargs)
 {
-    thunk *asthunk;
-    PyObject *kwargs;
+    static char *keywords[] = {"reset", NULL};
+    int reset = 0;
     PyObject *ret;
-    int status;
 
-    if (!(status = PyObject_IsInstance(th, (PyObject*)  &thunk_type))) {
-        PyErr_SetString(
-            PyExc_TypeError,
-            "get_children expected argument of type thunk");
+    if (!PyArg_ParseTupleAndKeywords(args,
+                                     kwargs,
+                                     "|p:_profile_data",
+                                     keywords,
+                                     &reset)) {
         return NULL;
     }
-    else if (status < 0) {
-        return NULL;
-    }
-    asthunk = (thunk*) th;
 
-    if (asthunk->th_normal) {
-        return PyTuple_Pack(1, asthunk->th_normal);
+    if (!profile_data) {
+        return PyDict_New();
     }
-
-    kwargs = asthunk->th_kwargs;
-    if (!(kwargs || (kwargs = PyDict_New()))) {
-        /* we use `NULL` for kwargs when there are no kwargs present, we need
-           to create an empty dictionary to pass back to python */
+    if (!(ret = PyDict_Copy(profile_data))) {
         return NULL;
     }
-    else {
-        /* to unify the code path with creation of a new empty dict, we incref
-           the kwargs to keep the reference count neutral when we decref
-           below */
-        Py_INCREF(kwargs);
+    if (reset) {
+        PyDict_Clear(profile_data);
     }
-
-    ret = PyTuple_Pack(3,
-                       asthunk->th_func,
-                       asthunk->th_args,
-                       kwargs);
-    Py_DECREF(kwargs);
     return ret;
 }
 
-static PyObject *
-get_children(PyObject *self, PyObject *th)
-{
-    return LzThunk_GetChildren(th);
-}
-
-PyMethodDef thunk_methods[] = {
-    {"fromexpr",
-     (PyCFunction) thunk_fromexpr,
-     METH_CLASS | METH_O,
-     thunk_fromexpr_doc},
-    {NULL},
-};
-
-/* thunk definition -------------------------------------------------------- */
-
-PyDoc_STRVAR(thunk_doc,
-             "A deferred computation.\n"
+PyDoc_STRVAR(get_site_doc,
+             "Get the creation site of a thunk.\n"
              "\n"
              "Parameters\n"
              "----------\n"
-             "func : callable\n"
-             "    The function to delay calling.\n"
-             "*args : any\n"
-             "    The positional arguments to pass to ``func``.\n"
-             "**kwargs : any\n"
-             "    The keyword arguments to pass to ``func``.\n");
-
-static PyTypeObject thunk_type = {
-    PyVarObject_HEAD_INIT(&PyType_Type, 0)
-    "lazy.thunk",                               /* tp_name */
-    sizeof(thunk),                              /* tp_basicsize */
-    0,                                          /* tp_itemsize */
-    (destructor) thunk_dealloc,                 /* tp_dealloc */
-    0,                                          /* tp_print */
-    0,                                          /* tp_getattr */
-    0,                                          /* tp_setattr */
-    0,                                          /* tp_reserved */
-    (reprfunc) thunk_repr,                      /* tp_repr */
-    &thunk_as_number,                           /* tp_as_number */
-    0,                                          /* tp_as_sequence */
-    &thunk_as_mapping,                          /* tp_as_mapping */
-    (hashfunc) thunk_hash,                      /* tp_hash */
-    (ternaryfunc) thunk_call,                   /* tp_call */
-    (reprfunc) thunk_str,                       /* tp_str */
-    (getattrofunc) thunk_getattro,              /* tp_getattro */
-    (setattrofunc) thunk_setattro,              /* tp_setattro */
-    0,                                          /* tp_as_buffer */
-    Py_TPFLAGS_DEFAULT |
-    Py_TPFLAGS_BASETYPE |
-    Py_TPFLAGS_HAVE_GC,                         /* tp_flags */
-    thunk_doc,                                  /* tp_doc */
-    (traverseproc) thunk_traverse,              /* tp_traverse */
-    (inquiry) thunk_clear,                      /* tp_clear */
-    (richcmpfunc) thunk_richcmp,                /* tp_richcompare */
-    0,                                          /* tp_weaklistoffset */
-    (getiterfunc) thunk_iter,                   /* tp_iter */
-    (iternextfunc) thunk_next,                  /* tp_iternext */
-    thunk_methods,                              /* tp_methods */
-    0,                                          /* tp_members */
-    0,                                          /* tp_getset */
-    &PyBaseObject_Type,                         /* tp_base */
-    0,                                          /* tp_dict */
-    0,                                          /* tp_descr_get */
-    0,                                          /* tp_descr_set */
-    0,                                          /* tp_dictoffset */
-    0,                                          /* tp_init */
-    (allocfunc) PyType_GenericAlloc,            /* tp_alloc */
-    (newfunc) thunk_new,                        /* tp_new */
-    (freefunc) thunk_free,                      /* tp_free */
-};
+             "th : thunk\n"
+             "    The thunk to look up.\n"
+             "\n"
+             "Returns\n"
+             "-------\n"
+             "site : (code, int) or None\n"
+             "    The code and line that created ``th`` or None if it was\n"
+             "    created while the profiler was off.\n");
 
-/* Module level ------------------------------------------------------------ */
+static PyObject *
+get_site(PyObject *self, PyObject *th)
+{
+    int status;
 
-PyDoc_STRVAR(module_doc,"A defered computation.");
+    if (!(status = PyObject_IsInstance(th, (PyObject*) &thunk_type))) {
+        PyErr_SetString(PyExc_TypeError,
+                        "_get_site expected argument of type thunk");
+        return NULL;
+    }
+    else if (status < 0) {
+        return NULL;
+    }
+    return site_key((thunk*) th);
+}
 
 static PyMethodDef module_methods[] = {
     {"get_children",
      (PyCFunction) get_children,
      METH_O,
      get_children_doc},
+    {"strict_many",
+     (PyCFunction) strict_many,
+     METH_VARARGS | METH_KEYWORDS,
+     strict_many_doc},
+    {"_claim",
+     (PyCFunction) claim,
+     METH_O,
+     claim_doc},
+    {"_eval_call",
+     (PyCFunction) eval_call,
+     METH_O,
+     eval_call_doc},
+    {"_finish",
+     (PyCFunction) finish,
+     METH_VARARGS,
+     finish_doc},
+    {"_release",
+     (PyCFunction) release,
+     METH_O,
+     release_doc},
+    {"stats",
+     (PyCFunction) get_stats,
+     METH_VARARGS | METH_KEYWORDS,
+     stats_doc},
+    {"_set_profiling",
+     (PyCFunction) set_profiling,
+     METH_O,
+     set_profiling_doc},
+    {"_profile_data",
+     (PyCFunction) get_profile_data,
+     METH_VARARGS | METH_KEYWORDS,
+     profile_data_doc},
+    {"_get_site",
+     (PyCFunction) get_site,
+     METH_O,
+     get_site_doc},
     {NULL},
 };
 
+static PyObject *
+LzThunk_Strict(PyObject *expr)
+{
+    return strict_eval(expr);
+}
+
+static int
+LzThunk_IsNormal(PyObject *expr)
+{
+    PyObject *normal;
+
+    if (!PyObject_TypeCheck(expr, &thunk_type)) {
+        return 1;
+    }
+    normal = LZ_LOAD_PTR(((thunk*) expr)->th_normal);
+    return normal && normal != &recursionguard;
+}
+
 static LzExported exported_symbols = {
     LzThunk_New,
     LzThunk_FromExpr,
     LzThunk_GetChildren,
+    &thunk_type,
+    LzThunk_Strict,
+    LzThunk_IsNormal,
+    LzThunk_NewVector,
+    LzThunk_CallVector,
 };
 
 static struct PyModuleDef _thunk_module = {
@@ -1390,9 +3509,28 @@ PyInit__thunk(void)
                              &recursionguard_type,
                              &LzStrict_Type,
                              &thunk_type,
+                             &cell_type,
+                             &boxcache_type,
+                             &deadline_type,
                              NULL};
     size_t n = 0;
 
+    if (!(strict_str = PyUnicode_InternFromString("__strict__"))) {
+        return NULL;
+    }
+
+    if (!(deadline_key = PyUnicode_InternFromString("lazy.deadline"))) {
+        return NULL;
+    }
+
+    if (!(cancelled_error = PyErr_NewExceptionWithDoc(
+              "lazy.Cancelled",
+              "Raised when evaluating a thunk under a cancelled deadline.",
+              NULL,
+              NULL))) {
+        return NULL;
+    }
+
     if (!(symbols = PyCapsule_New(&exported_symbols,
                                   "lazy._thunk._exported_symbols",
                                   NULL))) {
@@ -1412,6 +3550,16 @@ PyInit__thunk(void)
         return NULL;
     }
 
+#ifdef Py_GIL_DISABLED
+    /* Evaluating a thunk is safe without the GIL. Updating a `Cell` while
+       other threads evaluate the thunks which depend on it is not. */
+    if (PyUnstable_Module_SetGIL(m, Py_MOD_GIL_NOT_USED)) {
+        Py_DECREF(symbols);
+        Py_DECREF(m);
+        return NULL;
+    }
+#endif
+
     n = PyObject_SetAttrString(m, "_exported_symbols", symbols);
     Py_DECREF(symbols);
     if (n) {
@@ -1419,6 +3567,13 @@ PyInit__thunk(void)
         return NULL;
     }
 
+    if (PyModule_AddIntConstant(m,
+                                "_exported_symbols_version",
+                                LZ_EXPORTED_VERSION)) {
+        Py_DECREF(m);
+        return NULL;
+    }
+
     if (!(operator = PyModule_Create(&_operator_module))) {
         Py_DECREF(m);
         return NULL;
@@ -1448,6 +3603,8 @@ PyInit__thunk(void)
     ADD_BINARY_OPERATOR(add);
     ADD_BINARY_OPERATOR(sub);
     ADD_BINARY_OPERATOR(mul);
+    ADD_BINARY_OPERATOR(floordiv);
+    ADD_BINARY_OPERATOR(truediv);
     ADD_BINARY_OPERATOR(rem);
     ADD_BINARY_OPERATOR(divmod);
     ADD_BINARY_OPERATOR(lshift);
@@ -1492,5 +3649,25 @@ PyInit__thunk(void)
         return NULL;
     }
 
+    if (PyObject_SetAttrString(m, "Cell", (PyObject*) &cell_type)) {
+        Py_DECREF(m);
+        return NULL;
+    }
+
+    if (PyObject_SetAttrString(m, "boxcache", (PyObject*) &boxcache_type)) {
+        Py_DECREF(m);
+        return NULL;
+    }
+
+    if (PyObject_SetAttrString(m, "Deadline", (PyObject*) &deadline_type)) {
+        Py_DECREF(m);
+        return NULL;
+    }
+
+    if (PyObject_SetAttrString(m, "Cancelled", cancelled_error)) {
+        Py_DECREF(m);
+        return NULL;
+    }
+
     return m;
 }
@@ -41,8 +41,7 @@ PyInit__undefined(void)
     PyObject *m;
     int err;
 
-    if (!(lazy_symbols =
-          PyCapsule_Import("lazy._thunk._exported_symbols", 0))) {
+    if (!(lazy_symbols = LzExported_Import(1))) {
         return NULL;
     }
 
@@ -64,6 +63,11 @@ PyInit__undefined(void)
     if (!(m = PyModule_Create(&_undefined_module))) {
         goto error;
     }
+#ifdef Py_GIL_DISABLED
+    if (PyUnstable_Module_SetGIL(m, Py_MOD_GIL_NOT_USED)) {
+        goto error;
+    }
+#endif
 
 
     if (!(strict_meth = PyCFunction_NewEx(&strict, undefined_inner, m))) {
@@ -0,0 +1,154 @@
+import asyncio
+from inspect import isawaitable
+from threading import get_ident
+
+from lazy._thunk import (
+    thunk,
+    strict,
+    get_children,
+    _claim,
+    _finish,
+    _release,
+)
+from lazy.utils import is_pending
+
+
+# (thread id, thunk id) -> (thunk, task) for the thunks claimed by a task
+# on the event loop of each thread. Another evaluation on the same loop must
+# await the task, claiming the thunk again would look like recursion.
+_running = {}
+
+
+class _AsyncEvaluator:
+    """State for evaluating a single expression with ``strict_async``.
+
+    Each pending thunk is evaluated in its own task so that shared
+    subexpressions are only computed once and independent subexpressions
+    are awaited concurrently.
+    """
+    def __init__(self):
+        # id -> (thunk, task); we hold the thunk to keep its id alive
+        self._tasks = {}
+
+    def _task(self, th):
+        try:
+            return self._tasks[id(th)][1]
+        except KeyError:
+            pass
+
+        key = get_ident(), id(th)
+        try:
+            return _running[key][1]
+        except KeyError:
+            pass
+
+        task = asyncio.ensure_future(self._eval_call(th))
+        self._tasks[id(th)] = _running[key] = th, task
+
+        def done(task):
+            if _running.get(key, (None, None))[1] is task:
+                del _running[key]
+
+        task.add_done_callback(done)
+        return task
+
+    async def gather(self, obs):
+        """Evaluate a sequence of expressions concurrently.
+
+        Parameters
+        ----------
+        obs : iterable[any]
+            The expressions to evaluate.
+
+        Returns
+        -------
+        normals : list[any]
+            The normal forms of ``obs``.
+        """
+        normals = []
+        pending = []
+        for n, ob in enumerate(obs):
+            if is_pending(ob):
+                pending.append((n, self._task(ob)))
+                normals.append(None)
+            else:
+                normals.append(strict(ob))
+
+        if pending:
+            results = await asyncio.gather(*(task for _, task in pending))
+            for (n, _), normal in zip(pending, results):
+                normals[n] = normal
+
+        return normals
+
+    async def _eval_call(self, th):
+        # Claim the thunk before awaiting anything so that another thread
+        # which forces it waits for this task instead of computing it again.
+        if not _claim(th):
+            return strict(th)
+
+        try:
+            func, args, kwargs = get_children(th)
+            nargs = len(args)
+            normals = await self.gather(
+                (func,) + args + tuple(kwargs.values()),
+            )
+            result = normals[0](
+                *normals[1:nargs + 1],
+                **dict(zip(kwargs, normals[nargs + 1:]))
+            )
+            while isawaitable(result) and not isinstance(result, thunk):
+                result = await result
+
+            normal, = await self.gather((result,))
+        except BaseException:
+            _release(th)
+            raise
+
+        _finish(th, normal)
+        return normal
+
+    def cancel(self):
+        """Cancel any tasks which are still running.
+        """
+        for _, task in self._tasks.values():
+            task.cancel()
+
+
+async def strict_async(expr):
+    """Strictly evaluate an expression, awaiting the results of any calls
+    which return awaitables.
+
+    Parameters
+    ----------
+    expr : any
+        The expression to evaluate.
+
+    Returns
+    -------
+    normal : any
+        The normal form of ``expr``.
+
+    Examples
+    --------
+    >>> async def fetch(key):
+    ...     await asyncio.sleep(1)
+    ...     return key
+    >>> await strict_async(thunk(fetch, 1) + thunk(fetch, 2))
+    3
+
+    Notes
+    -----
+    Independent subexpressions are awaited concurrently with
+    ``asyncio.gather``, so the example above takes one second, not two.
+    Each thunk in ``expr`` is evaluated at most once and is left in normal
+    form afterwards.
+
+    Awaiting a thunk is the same as awaiting ``strict_async`` of the thunk.
+    """
+    evaluator = _AsyncEvaluator()
+    try:
+        normal, = await evaluator.gather((expr,))
+    finally:
+        evaluator.cancel()
+    return normal
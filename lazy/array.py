@@ -0,0 +1,601 @@
+from numbers import Number
+import operator as _op
+
+import numpy as np
+
+from lazy._thunk import thunk, strict, get_children, operator as op
+from lazy.tree import Normal, parse
+
+
+# The ``lazy.operator`` wrappers which are elementwise when applied to arrays
+# mapped to the equivalent ufunc.
+_operator_ufuncs = {
+    op.add: np.add,
+    op.sub: np.subtract,
+    op.mul: np.multiply,
+    op.truediv: np.true_divide,
+    op.floordiv: np.floor_divide,
+    op.rem: np.remainder,
+    op.lshift: np.left_shift,
+    op.rshift: np.right_shift,
+    getattr(op, 'and'): np.bitwise_and,
+    getattr(op, 'or'): np.bitwise_or,
+    op.xor: np.bitwise_xor,
+    op.lt: np.less,
+    op.le: np.less_equal,
+    op.eq: np.equal,
+    op.ne: np.not_equal,
+    op.gt: np.greater,
+    op.ge: np.greater_equal,
+    op.neg: np.negative,
+    op.pos: np.positive,
+    op.abs: np.absolute,
+    op.inv: np.invert,
+}
+
+# Ufuncs that treat bools differently from python, for example
+# ``True + True`` is ``2`` but ``np.add(True, True)`` is ``True``.
+_arithmetic_ufuncs = frozenset({
+    np.add,
+    np.subtract,
+    np.multiply,
+    np.true_divide,
+    np.floor_divide,
+    np.remainder,
+    np.power,
+    np.left_shift,
+    np.right_shift,
+    np.negative,
+    np.positive,
+    np.absolute,
+    np.invert,
+})
+
+
+def _strict_nested(ob):
+    """Strictly evaluate ``ob`` and any thunks in nested lists or tuples.
+    """
+    ob = strict(ob)
+    if type(ob) in (list, tuple):
+        return type(ob)(map(_strict_nested, ob))
+    return ob
+
+
+class _ArrayFunction:
+    """Wrapper for a numpy function which strictly evaluates thunks that
+    appear in sequence arguments before calling the function.
+
+    Parameters
+    ----------
+    func : callable
+        The numpy function to wrap.
+
+    Notes
+    -----
+    Without this, a call like ``np.concatenate([th_1, th_2])`` would
+    dispatch back to ``thunk.__array_function__`` when evaluated.
+    """
+    __slots__ = '_func',
+
+    def __init__(self, func):
+        self._func = func
+
+    @property
+    def __name__(self):
+        return self._func.__name__
+
+    def __call__(self, *args, **kwargs):
+        return self._func(
+            *map(_strict_nested, args),
+            **{k: _strict_nested(v) for k, v in kwargs.items()}
+        )
+
+    def __repr__(self):
+        return '<array-function %s>' % self.__name__
+
+
+class FusedKernel:
+    """A chain of elementwise operations evaluated in blocks.
+
+    Parameters
+    ----------
+    program : tuple
+        The expression to evaluate. Each node is either an int, which is the
+        index of an argument, or a tuple of
+        ``(ufunc, func, (node, ...))`` where ``func`` is the function that
+        appeared in the original expression and ``ufunc`` is the equivalent
+        numpy ufunc.
+    blocksize : int, optional
+        The number of elements to compute at a time.
+
+    Notes
+    -----
+    When all of the arguments are ndarrays or scalars, the program is run over
+    ``blocksize`` elements at a time and written directly into the result.
+    This means the intermediate results never exist at full size. Otherwise,
+    the program is evaluated with the original functions so that the result
+    is the same as the unfused expression.
+    """
+    __slots__ = 'program', 'blocksize'
+
+    def __init__(self, program, blocksize=8192):
+        self.program = program
+        self.blocksize = blocksize
+
+    @property
+    def __name__(self):
+        def fmt(node):
+            if isinstance(node, int):
+                return '_%d' % node
+            return '%s(%s)' % (
+                node[1].__name__,
+                ', '.join(map(fmt, node[2])),
+            )
+
+        return 'fused[%s]' % fmt(self.program)
+
+    def __repr__(self):
+        return '<%s>' % self.__name__
+
+    @classmethod
+    def _evaluate(cls, node, values, fast):
+        if isinstance(node, int):
+            return values[node]
+        ufunc, func, children = node
+        return (ufunc if fast else func)(*(
+            cls._evaluate(child, values, fast) for child in children
+        ))
+
+    def __call__(self, *values):
+        arrays = []
+        for n, value in enumerate(values):
+            if type(value) is np.ndarray:
+                if value.ndim:
+                    arrays.append(n)
+            elif not isinstance(value, (Number, np.generic)):
+                # Some other type may define the operators differently than
+                # the ufuncs do.
+                return self._evaluate(self.program, values, False)
+
+        if not arrays:
+            return self._evaluate(self.program, values, False)
+
+        block = list(values)
+        for n in arrays:
+            block[n] = np.empty(0, dtype=values[n].dtype)
+        dtype = np.asarray(self._evaluate(self.program, block, True)).dtype
+
+        it = np.nditer(
+            [values[n] for n in arrays] + [None],
+            flags=['external_loop', 'buffered', 'zerosize_ok', 'refs_ok'],
+            op_flags=(
+                [['readonly']] * len(arrays) + [['writeonly', 'allocate']]
+            ),
+            op_dtypes=[values[n].dtype for n in arrays] + [dtype],
+            buffersize=self.blocksize,
+        )
+        with it:
+            for *chunks, out in it:
+                for n, chunk in zip(arrays, chunks):
+                    block[n] = chunk
+                out[...] = self._evaluate(self.program, block, True)
+            return it.operands[-1]
+
+
+def _elementwise(func, args):
+    """Find the ufunc for an elementwise node.
+
+    Parameters
+    ----------
+    func : any
+        The function of a pending thunk.
+    args : tuple
+        The arguments of the pending thunk.
+
+    Returns
+    -------
+    node : tuple or None
+        ``(ufunc, func, args)`` or None if the node is not elementwise.
+    """
+    if isinstance(func, np.ufunc):
+        if func.nout == 1 and func.nin == len(args):
+            return func, func, args
+        return None
+
+    if func is op.pow:
+        if len(args) == 3 and args[2] is None:
+            return np.power, _op.pow, args[:2]
+        return None
+
+    try:
+        ufunc = _operator_ufuncs[func]
+    except (KeyError, TypeError):
+        return None
+    if ufunc.nin != len(args):
+        return None
+    return ufunc, func, args
+
+
+def _fuse(th, rewrite=None):
+    """Fuse the elementwise region rooted at ``th`` into a single node.
+
+    Parameters
+    ----------
+    th : thunk
+        The root of the region.
+    rewrite : callable, optional
+        A function to apply to each argument of the fused node.
+
+    Returns
+    -------
+    fused : thunk
+        A thunk that calls a ``FusedKernel`` or ``th`` if there is nothing to
+        fuse.
+    """
+    leaves = []
+    index = {}
+    nops = 0
+
+    def leaf(arg):
+        try:
+            return index[id(arg)]
+        except KeyError:
+            index[id(arg)] = n = len(leaves)
+            leaves.append(arg)
+            return n
+
+    def build(arg):
+        nonlocal nops
+
+        if isinstance(arg, thunk):
+            children = get_children(arg)
+            if len(children) == 3 and not children[2]:
+                func, args, _ = children
+                if isinstance(func, FusedKernel):
+                    nops += 1
+                    return relabel(func.program, tuple(map(build, args)))
+
+                node = _elementwise(func, args)
+                if node is not None:
+                    nops += 1
+                    ufunc, func, args = node
+                    return ufunc, func, tuple(map(build, args))
+        return leaf(arg)
+
+    def relabel(node, labels):
+        if isinstance(node, int):
+            return labels[node]
+        ufunc, func, children = node
+        return ufunc, func, tuple(relabel(c, labels) for c in children)
+
+    program = build(th)
+    if nops < 2:
+        return th
+
+    if rewrite is not None:
+        leaves = map(rewrite, leaves)
+    return type(th)(FusedKernel(program), *leaves)
+
+
+def fuse(expr):
+    """Fuse chains of elementwise operations in an expression.
+
+    Parameters
+    ----------
+    expr : any
+        The expression to fuse.
+
+    Returns
+    -------
+    fused : any
+        The fused expression.
+
+    Notes
+    -----
+    Pending ufunc calls and ``lazy.operator`` calls like ``a * b + c`` are
+    replaced with a single call to a ``FusedKernel`` which evaluates the
+    whole chain in cache sized blocks without allocating full size
+    intermediates.
+
+    A pending elementwise node that is used in more than one chain is
+    computed once per chain.
+    """
+    memo = {}
+
+    def rewrite(th):
+        if not isinstance(th, thunk):
+            return th
+
+        try:
+            return memo[id(th)]
+        except KeyError:
+            pass
+
+        ret = _fuse(th, rewrite)
+        if ret is th:
+            children = get_children(th)
+            if len(children) == 3:
+                func, args, kwargs = children
+                new_func = rewrite(func)
+                new_args = tuple(map(rewrite, args))
+                new_kwargs = {k: rewrite(v) for k, v in kwargs.items()}
+                if (new_func is not func or
+                        any(a is not b for a, b in zip(new_args, args)) or
+                        any(new_kwargs[k] is not v
+                            for k, v in kwargs.items())):
+                    ret = type(th)(new_func, *new_args, **new_kwargs)
+
+        memo[id(th)] = ret
+        return ret
+
+    return rewrite(expr)
+
+
+def array_ufunc(self, ufunc, method, *inputs, **kwargs):
+    """Implementation of ``thunk.__array_ufunc__``.
+    """
+    if method == 'at' or 'out' in kwargs:
+        # These write into their arguments so they cannot be deferred.
+        return getattr(ufunc, method)(
+            *map(_strict_nested, inputs),
+            **{k: _strict_nested(v) for k, v in kwargs.items()}
+        )
+
+    cls = type(self)
+    if method != '__call__':
+        return cls(_ArrayFunction(getattr(ufunc, method)), *inputs, **kwargs)
+
+    return _fuse(cls(ufunc, *inputs, **kwargs))
+
+
+def array_function(self, func, types, args, kwargs):
+    """Implementation of ``thunk.__array_function__``.
+    """
+    return type(self)(_ArrayFunction(func), *args, **kwargs)
+
+
+class _Column:
+    """A value in a vectorized expression that is different for each row.
+
+    Parameters
+    ----------
+    values : np.ndarray
+        The value for each row.
+    """
+    __slots__ = 'values',
+
+    def __init__(self, values):
+        self.values = values
+
+    def rows(self):
+        values = self.values
+        # ``tolist`` gives back python scalars instead of numpy scalars.
+        return values.tolist() if values.ndim == 1 else list(values)
+
+    @classmethod
+    def from_rows(cls, rows):
+        types = set(map(type, rows))
+        if len(types) == 1 and issubclass(
+                types.pop(),
+                (bool, int, float, complex, str, bytes, np.generic)):
+            try:
+                return cls(np.array(rows))
+            except OverflowError:
+                pass
+
+        values = np.empty(len(rows), dtype=object)
+        for n, row in enumerate(rows):
+            values[n] = row
+        return cls(values)
+
+
+def _vectorized_call(func, args):
+    """Apply ``func`` to ``args`` with array operations.
+
+    Returns
+    -------
+    result : _Column or None
+        The result or None if the call cannot be vectorized.
+    """
+    if func is op.getitem:
+        container, key = args
+        if isinstance(container, _Column):
+            if (not isinstance(key, (_Column, bool)) and
+                    isinstance(key, (int, slice)) and
+                    container.values.ndim > 1):
+                return _Column(container.values[:, key])
+        elif (isinstance(container, np.ndarray) and
+                key.values.dtype.kind in 'iu'):
+            return _Column(container[key.values])
+        return None
+
+    if func is _op.not_:
+        ufunc = np.logical_not
+    elif isinstance(func, FusedKernel):
+        ufunc = func
+    else:
+        node = _elementwise(func, args)
+        if node is None:
+            return None
+        ufunc, _, args = node
+
+    values = []
+    for arg in args:
+        if isinstance(arg, _Column):
+            arg = arg.values
+            if ufunc in _arithmetic_ufuncs and arg.dtype == bool:
+                arg = arg.astype(int)
+        values.append(arg)
+
+    try:
+        return _Column(np.asarray(ufunc(*values)))
+    except TypeError:
+        # The dtype is not supported by the ufunc, for example: adding
+        # strings with numpy < 2.
+        return None
+
+
+class Input:
+    """A placeholder for an input of a vectorized expression.
+
+    Parameters
+    ----------
+    name : str
+        The name of the input, used in error messages.
+
+    Notes
+    -----
+    The expression passed to ``vectorize`` is built once, so control flow
+    in a lazy function which depends on an input is decided by the value
+    used to build the expression, not by the rows. Any operation on an
+    ``Input`` other than comparing it to another ``Input`` raises a
+    ``TypeError`` so that building such an expression fails instead of
+    silently baking in one branch.
+    """
+    __slots__ = 'name',
+
+    def __init__(self, name):
+        self.name = name
+
+    def __repr__(self):
+        return '%s(%r)' % (type(self).__name__, self.name)
+
+    def _used(self, *args):
+        raise TypeError(
+            '%r was used while building the expression, vectorize does not'
+            ' support control flow which depends on its inputs' % self,
+        )
+
+    def __eq__(self, other):
+        if isinstance(other, Input):
+            return self is other
+        self._used()
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = object.__hash__
+
+
+for _name in (
+        'bool', 'index', 'int', 'float', 'complex', 'len', 'iter',
+        'contains', 'getitem', 'call', 'round', 'lt', 'le', 'gt', 'ge',
+        'neg', 'pos', 'abs', 'invert'):
+    setattr(Input, '__%s__' % _name, Input._used)
+for _name in (
+        'add', 'sub', 'mul', 'matmul', 'truediv', 'floordiv', 'mod',
+        'divmod', 'pow', 'lshift', 'rshift', 'and', 'or', 'xor'):
+    setattr(Input, '__%s__' % _name, Input._used)
+    setattr(Input, '__r%s__' % _name, Input._used)
+del _name
+
+
+def vectorize(expr, leaves):
+    """Create a function which evaluates an expression for many inputs at
+    once.
+
+    Parameters
+    ----------
+    expr : any
+        The expression to evaluate.
+    leaves : iterable[any]
+        The terms of ``expr`` to replace with the inputs. These are matched
+        against the nodes of ``LTree.parse(expr)`` like ``LTree.subs``.
+
+    Returns
+    -------
+    vectorized : callable[*arrays -> np.ndarray]
+        A function which accepts an array for each leaf and returns an
+        array of the values of ``expr`` for each row of inputs.
+
+    Examples
+    --------
+    >>> @strict
+    ... @lazy_function
+    ... def f(a, b):
+    ...     return a * 2 + b
+    >>> a, b = Input('a'), Input('b')
+    >>> vectorized = vectorize(f(a, b), [a, b])
+    >>> vectorized([1, 2, 3], [4, 5, 6])
+    array([ 6,  9, 12])
+
+    Notes
+    -----
+    ``lazy.operator`` functions and ufuncs are applied to the whole column
+    of inputs at once. These follow numpy's rules for overflow and division
+    by zero. Any other node is evaluated once per row.
+
+    ``expr`` is evaluated from its tree, so an ``if`` or ``while`` that
+    depends on an input and was run while building ``expr`` is not run
+    again for each row. Build ``expr`` with ``Input`` placeholders to get a
+    ``TypeError`` in that case. A branch inside a function which is still
+    pending in ``expr`` is evaluated once per row and is correct.
+    """
+    tree = parse(expr)
+    leaves = tuple(map(parse, leaves))
+
+    def vectorized(*columns):
+        if len(columns) != len(leaves):
+            raise TypeError(
+                'expected %d arrays, got %d' % (len(leaves), len(columns)),
+            )
+
+        columns = tuple(_Column(np.asarray(c)) for c in columns)
+        nrows = len(columns[0].values) if columns else 1
+        for column in columns:
+            if len(column.values) != nrows:
+                raise ValueError('all arrays must be the same length')
+
+        scope = dict(zip(leaves, columns))
+
+        def evaluate(node):
+            try:
+                return scope[node]
+            except KeyError:
+                pass
+
+            if isinstance(node, Normal):
+                return node.value
+
+            func = evaluate(node.func)
+            args = tuple(map(evaluate, node.args))
+            kwargs = {k: evaluate(v) for k, v in node.kwargs.items()}
+
+            columns = [
+                arg for arg in (func,) + args + tuple(kwargs.values())
+                if isinstance(arg, _Column)
+            ]
+            if not columns:
+                ret = strict(thunk(func, *args, **kwargs))
+            elif isinstance(func, _Column) or kwargs:
+                ret = None
+            else:
+                ret = _vectorized_call(func, args)
+
+            if ret is None:
+                # Fall back to evaluating this node one row at a time.
+                rows = {id(c): c.rows() for c in columns}
+
+                def row(arg, n):
+                    if isinstance(arg, _Column):
+                        return rows[id(arg)][n]
+                    return arg
+
+                ret = _Column.from_rows([
+                    strict(thunk(
+                        row(func, n),
+                        *(row(arg, n) for arg in args),
+                        **{k: row(v, n) for k, v in kwargs.items()}
+                    ))
+                    for n in range(nrows)
+                ])
+
+            scope[node] = ret
+            return ret
+
+        ret = evaluate(tree)
+        if not isinstance(ret, _Column):
+            ret = _Column.from_rows([ret] * nrows)
+        return ret.values
+
+    return vectorized
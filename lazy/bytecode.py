@@ -1,5 +1,7 @@
-from functools import partial
-from operator import is_, not_
+import dis
+from functools import partial, reduce
+from inspect import CO_VARARGS, CO_VARKEYWORDS
+import operator as op
 import sys
 from types import CodeType, FunctionType
 
@@ -7,16 +9,281 @@ from codetransformer import CodeTransformer, Code, pattern, instructions
 from codetransformer.patterns import matchany, var
 
 
-from lazy._thunk import strict, thunk
+from lazy._thunk import boxcache, strict, thunk
+from lazy.transform import (
+    _LazyFunction,
+    _box_defaults,
+    _fold,
+    _inlined_global,
+    _lazy_is,
+    _lazy_not,
+    _may_inline,
+    _stream,
+)
 from lazy.utils import instance
 
 
-def _lazy_is(a, b, *, is_=is_):
-    return thunk(is_, a, b)
+# The names of the code objects whose functions are wrapped with ``_stream``.
+_streaming_comprehensions = frozenset({'<listcomp>', '<genexpr>'})
+
+
+# The most instructions an inlined function may have.
+_inline_max_instructions = 32
+
+# The instructions which only build thunks when run in a lazy function.
+# Jumps would force a value and stores to attributes or items would cause a
+# side effect when the caller is run instead of when the call is forced.
+_inline_opnames = frozenset({
+    'BINARY_ADD',
+    'BINARY_AND',
+    'BINARY_FLOOR_DIVIDE',
+    'BINARY_LSHIFT',
+    'BINARY_MATRIX_MULTIPLY',
+    'BINARY_MODULO',
+    'BINARY_MULTIPLY',
+    'BINARY_OR',
+    'BINARY_POWER',
+    'BINARY_RSHIFT',
+    'BINARY_SUBSCR',
+    'BINARY_SUBTRACT',
+    'BINARY_TRUE_DIVIDE',
+    'BINARY_XOR',
+    'BUILD_LIST',
+    'BUILD_MAP',
+    'BUILD_SET',
+    'BUILD_SLICE',
+    'BUILD_TUPLE',
+    'CALL_FUNCTION',
+    'CALL_FUNCTION_KW',
+    'COMPARE_OP',
+    'DUP_TOP',
+    'EXTENDED_ARG',
+    'LOAD_ATTR',
+    'LOAD_CONST',
+    'LOAD_FAST',
+    'LOAD_GLOBAL',
+    'NOP',
+    'POP_TOP',
+    'RETURN_VALUE',
+    'ROT_THREE',
+    'ROT_TWO',
+    'STORE_FAST',
+    'UNARY_INVERT',
+    'UNARY_NEGATIVE',
+    'UNARY_NOT',
+    'UNARY_POSITIVE',
+})
+
+
+def _is_inlinable(code):
+    """Can calls to the lazy version of a function be inlined into the
+    caller?
 
+    Parameters
+    ----------
+    code : CodeType
+        The code of the function before being transformed.
+
+    Returns
+    -------
+    inlinable : bool
+        True when ``code`` is small and only builds an expression.
+
+    See Also
+    --------
+    lazy.transform._may_inline
+    """
+    instrs = list(dis.get_instructions(code))
+    return len(instrs) <= _inline_max_instructions and all(
+        instr.opname in _inline_opnames and
+        # ``in`` iterates over the thunk
+        not (instr.opname == 'COMPARE_OP' and
+             instr.argval in ('in', 'not in'))
+        for instr in instrs
+    )
+
+
+# The operations that may be folded when all of their operands are known.
+_binary_folds = {
+    'BINARY_ADD': op.add,
+    'BINARY_AND': op.and_,
+    'BINARY_FLOOR_DIVIDE': op.floordiv,
+    'BINARY_LSHIFT': op.lshift,
+    'BINARY_MODULO': op.mod,
+    'BINARY_MULTIPLY': op.mul,
+    'BINARY_OR': op.or_,
+    'BINARY_POWER': op.pow,
+    'BINARY_RSHIFT': op.rshift,
+    'BINARY_SUBSCR': op.getitem,
+    'BINARY_SUBTRACT': op.sub,
+    'BINARY_TRUE_DIVIDE': op.truediv,
+    'BINARY_XOR': op.xor,
+}
+_unary_folds = {
+    'UNARY_INVERT': op.invert,
+    'UNARY_NEGATIVE': op.neg,
+    'UNARY_NOT': op.not_,
+    'UNARY_POSITIVE': op.pos,
+}
+# ``dis.cmp_op`` starts with the rich comparisons.
+_compare_folds = (op.lt, op.le, op.eq, op.ne, op.gt, op.ge)
+
+
+class _specializer(CodeTransformer):
+    """Replace the loads of known arguments with constants and fold the
+    operations on constants.
+
+    Parameters
+    ----------
+    known : dict[str -> any]
+        The values of the arguments to replace.
+    """
+    def __init__(self, known):
+        self._known = known
+
+    def transform(self, code, **kwargs):
+        # Folding removes instructions, it is not safe to remove an
+        # instruction that something jumps to.
+        self._jump_targets = {instr.arg for instr in code if instr.is_jmp}
+        return super().transform(code, **kwargs)
+
+    def transform_consts(self, consts):
+        # Nested code objects have their own locals.
+        return consts
+
+    def _folded(self, instrs, func, *args):
+        if any(instr in self._jump_targets for instr in instrs[1:]):
+            yield from instrs
+            return
+
+        folded, value = _fold(func, *args)
+        if folded:
+            yield instructions.LOAD_CONST(value).steal(instrs[0])
+        else:
+            yield from instrs
+
+    @pattern(instructions.LOAD_FAST)
+    def _load_fast(self, instr):
+        try:
+            value = self._known[instr.arg]
+        except KeyError:
+            yield instr
+        else:
+            yield instructions.LOAD_CONST(value).steal(instr)
+
+    @pattern(
+        instructions.LOAD_CONST,
+        instructions.LOAD_CONST,
+        reduce(
+            op.or_,
+            (getattr(instructions, name) for name in _binary_folds),
+            instructions.COMPARE_OP,
+        ),
+    )
+    def _fold_binary(self, *instrs):
+        a, b, operation = instrs
+        if isinstance(operation, instructions.COMPARE_OP):
+            if operation.arg >= len(_compare_folds):
+                yield from instrs
+                return
+            func = _compare_folds[operation.arg]
+        else:
+            func = _binary_folds[type(operation).__name__]
+
+        yield from self._folded(instrs, func, a.arg, b.arg)
+
+    @pattern(
+        instructions.LOAD_CONST,
+        reduce(op.or_, (getattr(instructions, name) for name in _unary_folds)),
+    )
+    def _fold_unary(self, *instrs):
+        a, operation = instrs
+        yield from self._folded(
+            instrs,
+            _unary_folds[type(operation).__name__],
+            a.arg,
+        )
 
-def _lazy_not(a, *, not_=not_):
-    return thunk(not_, a)
+
+def _specialized_code(f, known):
+    """Create the code for a copy of a function with some of its arguments
+    bound to constants.
+
+    Parameters
+    ----------
+    f : function
+        The strict function to specialize.
+    known : dict[str -> any]
+        The values of the arguments to bind.
+
+    Returns
+    -------
+    code : Code
+        The code of ``f`` without the arguments in ``known``.
+    """
+    pycode = f.__code__
+    nargs = pycode.co_argcount
+    nkwonly = pycode.co_kwonlyargcount
+    positional = pycode.co_varnames[:nargs]
+    kwonly = pycode.co_varnames[nargs:nargs + nkwonly]
+
+    argnames = [name for name in positional if name not in known]
+    varargs = nargs + nkwonly
+    if pycode.co_flags & CO_VARARGS:
+        argnames.append('*' + pycode.co_varnames[varargs])
+        varargs += 1
+    argnames.extend(name for name in kwonly if name not in known)
+    if pycode.co_flags & CO_VARKEYWORDS:
+        argnames.append('**' + pycode.co_varnames[varargs])
+
+    code = Code.from_pycode(pycode)
+    assigned = {
+        instr.arg
+        for instr in code
+        if isinstance(instr, (instructions.STORE_FAST,
+                              instructions.DELETE_FAST))
+    }
+    prologue = []
+    consts = {}
+    for name, value in known.items():
+        if name in code.cellvars:
+            # arguments which are closed over are copied into their cell
+            # when the function is called
+            prologue.append(instructions.LOAD_CONST(value))
+            prologue.append(instructions.STORE_DEREF(name))
+        elif name in assigned:
+            prologue.append(instructions.LOAD_CONST(value))
+            prologue.append(instructions.STORE_FAST(name))
+        else:
+            consts[name] = value
+
+    specializer = _specializer(consts)
+    code = specializer.transform(code)
+    # folding an operation may allow the next one to be folded
+    ninstrs = None
+    while ninstrs != len(code.instrs):
+        ninstrs = len(code.instrs)
+        code = specializer.transform(code)
+
+    # ``CodeTransformer.transform`` drops the ``*`` and ``**`` from the
+    # argument names so the new arguments are set last.
+    return Code(
+        prologue + list(code.instrs),
+        argnames,
+        cellvars=code.cellvars,
+        freevars=code.freevars,
+        name=code.name,
+        filename=code.filename,
+        firstlineno=code.firstlineno,
+        lnotab=code.lnotab,
+        flags=code.flags,
+    )
+
+
+class _LazyFunctionMeta(type(_LazyFunction), type(CodeTransformer)):
+    """The metaclass of ``lazy_function``, which is both a
+    ``_LazyFunction`` and a ``CodeTransformer``.
+    """
 
 
 def _mk_lazy_function(thunk_type, box_functions):
@@ -36,23 +303,67 @@ def _mk_lazy_function(thunk_type, box_functions):
         The lazy_function decorator.
     """
     @instance
-    class lazy_function(CodeTransformer):
-        """
-        Transform a strict python function into a lazy function.
-        """
-        __name__ = 'lazy_function'
+    class lazy_function(
+            _LazyFunction,
+            CodeTransformer,
+            metaclass=_LazyFunctionMeta):
+        __doc__ = _LazyFunction.__doc__
+
+        _thunk_type = thunk_type
+        _box_functions = box_functions
+
+        _inline_globals = None
+
+        def _transform_function(self, f, inline, known):
+            if known:
+                code = _specialized_code(f, known)
+                pycode = code.to_pycode()
+            else:
+                pycode = f.__code__
+                code = Code.from_pycode(pycode)
+
+            if inline:
+                self._inline_globals = f.__globals__
+            try:
+                code = self.transform(code)
+            finally:
+                self._inline_globals = None
 
-        def __call__(self, f):
             fn = FunctionType(
-                self.transform(Code.from_pycode(f.__code__)).to_pycode(),
+                code.to_pycode(),
                 f.__globals__,
                 f.__name__,
-                tuple(map(thunk_type.fromexpr, f.__defaults__ or ())),
+                None,
                 f.__closure__,
             )
-            if box_functions:
-                fn = thunk_type.fromexpr(fn)
-            return fn
+            _box_defaults(fn, f, thunk_type.fromexpr, known)
+            return fn, _may_inline(f) and _is_inlinable(pycode)
+
+        def transform(self, code, **kwargs):
+            new_code = super().transform(code, **kwargs)
+            if code.name == '<listcomp>' and not new_code.is_generator:
+                # ``_list_comprehension`` replaced the ``LIST_APPEND`` with a
+                # ``YIELD_VALUE`` but the flags are copied from ``code``.
+                new_code = Code(
+                    new_code.instrs,
+                    new_code.argnames,
+                    cellvars=new_code.cellvars,
+                    freevars=new_code.freevars,
+                    name=new_code.name,
+                    filename=new_code.filename,
+                    firstlineno=new_code.firstlineno,
+                    lnotab=new_code.lnotab,
+                    flags=dict(new_code.flags, CO_GENERATOR=True),
+                )
+            return new_code
+
+        @staticmethod
+        def _box_function(fn):
+            if fn.__code__.co_name in _streaming_comprehensions:
+                # Comprehensions are called immediately to build the lazy
+                # list.
+                return _stream(fn)
+            return thunk_type.fromexpr(fn)
 
         def transform_consts(self, consts):
             return tuple(
@@ -81,16 +392,16 @@ def _mk_lazy_function(thunk_type, box_functions):
             yield instr
             # TOS = new_function
 
-            yield instructions.LOAD_CONST(thunk_type.fromexpr)
-            # TOS  thunk_type.fromexpr
+            yield instructions.LOAD_CONST(self._box_function)
+            # TOS  self._box_function
             # TOS1 new_function
 
             yield instructions.ROT_TWO()
             # TOS  new_function
-            # TOS1 thunk_type.fromexpr
+            # TOS1 self._box_function
 
             yield instructions.CALL_FUNCTION(1)
-            # TOS  thunk_type.fromexpr(new_function)
+            # TOS  self._box_function(new_function)
 
         @pattern(
             instructions.LOAD_GLOBAL |
@@ -98,15 +409,34 @@ def _mk_lazy_function(thunk_type, box_functions):
             instructions.LOAD_DEREF,
         )
         def _load_name(self, instr):
-            yield instructions.LOAD_CONST(thunk_type.fromexpr).steal(instr)
-            # TOS  thunk_type.fromexpr
+            box = None
+            if (self._inline_globals is not None and
+                    isinstance(instr, instructions.LOAD_GLOBAL)):
+                box = _inlined_global(
+                    self._inline_globals,
+                    instr.arg,
+                    boxcache(thunk_type),
+                )
+
+            if box is None:
+                if isinstance(instr, instructions.LOAD_DEREF):
+                    # Closures may hold a different value on each call, don't
+                    # keep the last one alive.
+                    box = thunk_type.fromexpr
+                else:
+                    # Globals are almost always the same object so each load
+                    # site reuses the thunk that boxed the previous value.
+                    box = boxcache(thunk_type)
+
+            yield instructions.LOAD_CONST(box).steal(instr)
+            # TOS  box
 
             yield instr
             # TOS  v
-            # TOS1 thunk_type.fromexpr
+            # TOS1 box
 
             yield instructions.CALL_FUNCTION(1)
-            # TOS thunk_type.fromexpr(v)
+            # TOS box(v)
 
         @pattern(instructions.LOAD_FAST)
         def _load_fast(self, instr):
@@ -226,11 +556,6 @@ def _mk_lazy_function(thunk_type, box_functions):
 
             return comprehension
 
-        _list_comprehensions = _non_dict_comprehension(
-            instructions.BUILD_LIST,
-            instructions.LIST_APPEND,
-            list,
-        )
         _set_comprehensions = _non_dict_comprehension(
             instructions.BUILD_SET,
             instructions.SET_ADD,
@@ -239,6 +564,45 @@ def _mk_lazy_function(thunk_type, box_functions):
 
         del _non_dict_comprehension
 
+        @pattern(
+            instructions.BUILD_LIST,
+            matchany[var],
+            instructions.LIST_APPEND,
+            matchany[var],
+            instructions.RETURN_VALUE,
+        )
+        def _list_comprehension(self, first, *instrs):
+            """
+            Turn the body of a list comprehension into a generator. The
+            function is wrapped with ``_stream`` when it is created.
+            """
+            *body, ret = instrs
+            append = max(
+                n for n, instr in enumerate(body)
+                if isinstance(instr, instructions.LIST_APPEND)
+            )
+
+            yield instructions.NOP().steal(first)
+            # TOS  iterator
+
+            yield from self.patterndispatcher(body[:append])
+            # TOS  element
+            # TOS1 iterator
+
+            yield instructions.YIELD_VALUE().steal(body[append])
+            # TOS  None
+            # TOS1 iterator
+
+            yield instructions.POP_TOP()
+            # TOS  iterator
+
+            yield from self.patterndispatcher(body[append + 1:])
+
+            yield instructions.LOAD_CONST(None).steal(ret)
+            # TOS  None
+
+            yield instructions.RETURN_VALUE()
+
         if hasattr(instructions, 'STORE_MAP'):
             # Python 3.4
 
@@ -382,3 +746,26 @@ def _mk_lazy_function(thunk_type, box_functions):
 
 
 lazy_function = _mk_lazy_function(thunk, True)
+specialize = lazy_function.specialize
+
+
+def _compile_lazy(source, filename, mode):
+    """Compile source code so that evaluating it builds thunks.
+
+    Parameters
+    ----------
+    source : str
+        The source code to compile.
+    filename : str
+        The name of the file the source came from.
+    mode : {'exec', 'eval'}
+        The kind of code to compile.
+
+    Returns
+    -------
+    code : CodeType
+        The compiled code.
+    """
+    return lazy_function.transform(
+        Code.from_pycode(compile(source, filename, mode)),
+    ).to_pycode()
@@ -0,0 +1,363 @@
+import hashlib
+import os
+import pickle
+import tempfile
+from types import CodeType, FunctionType, ModuleType
+
+from lazy._thunk import thunk, strict
+from lazy.tree import Call, parse
+
+
+def _qualified_name(ob):
+    """The qualified name of a function or class, or None if ``ob`` is not
+    named.
+    """
+    if not callable(ob):
+        return None
+
+    name = getattr(ob, '__qualname__', None) or getattr(ob, '__name__', None)
+    if not isinstance(name, str):
+        return None
+
+    module = getattr(ob, '__module__', None) or type(ob).__module__
+    return '%s.%s' % (module, name)
+
+
+def _join(parts):
+    return b''.join(len(part).to_bytes(8, 'little') + part for part in parts)
+
+
+def _encode_code(code):
+    """Encode the parts of a code object which do not change between
+    processes.
+    """
+    return b'C' + _join([
+        code.co_code,
+        _encode(code.co_names),
+        _encode(code.co_varnames),
+        _encode(code.co_freevars),
+        _join(
+            _encode_code(const) if isinstance(const, CodeType) else
+            _encode(const)
+            for const in code.co_consts
+        ),
+    ])
+
+
+def _encode_callable(ob, name, active):
+    """Encode a named callable along with any state that it captured.
+
+    A function is normally encoded by its qualified name alone. Two
+    functions may share a name, for example lambdas or functions defined
+    inside of another function, so these also encode their code, their
+    defaults, and the values of their closure. Bound methods encode the
+    object they are bound to.
+
+    ``active`` holds the ids of the functions being encoded so that a
+    function which refers to itself through its closure is only expanded
+    once.
+    """
+    self = getattr(ob, '__self__', None)
+    if self is not None and not isinstance(self, ModuleType):
+        func = getattr(ob, '__func__', None)
+        return b'M' + _join([
+            (
+                b'F' + name.encode('utf-8') if func is None else
+                _encode(func, active)
+            ),
+            _encode(self, active),
+        ])
+
+    local = '<lambda>' in name or '<locals>' in name
+    if isinstance(ob, FunctionType):
+        if not (local or ob.__closure__):
+            return b'F' + name.encode('utf-8')
+        if id(ob) in active:
+            return b'R' + name.encode('utf-8')
+
+        active = active | {id(ob)}
+        cells = []
+        for cell in ob.__closure__ or ():
+            try:
+                cells.append(_encode(cell.cell_contents, active))
+            except ValueError:
+                # the cell is empty
+                cells.append(b'E')
+        return b'L' + _join([
+            name.encode('utf-8'),
+            _encode_code(ob.__code__),
+            _encode(ob.__defaults__, active),
+            _encode(ob.__kwdefaults__, active),
+            _join(cells),
+        ])
+
+    if local:
+        raise TypeError(
+            'cannot compute a stable hash of %s, it is not defined at the'
+            ' top level of a module' % name,
+        )
+    return b'F' + name.encode('utf-8')
+
+
+def _encode_scalar(value):
+    """Encode a value of one of the common immutable builtin types, or
+    return None for any other value.
+    """
+    cls = type(value)
+    if value is None:
+        return b'N'
+    if cls is bool:
+        return b'B1' if value else b'B0'
+    if cls is int:
+        return b'I' + str(value).encode('ascii')
+    if cls is float:
+        # ``float.hex`` is exact and tells 0.0 apart from -0.0
+        return b'X' + value.hex().encode('ascii')
+    if cls is complex:
+        return b'J' + _join([
+            value.real.hex().encode('ascii'),
+            value.imag.hex().encode('ascii'),
+        ])
+    if cls is str:
+        return b'U' + value.encode('utf-8', 'surrogatepass')
+    if cls is bytes:
+        return b'Y' + value
+    return None
+
+
+def _encode(value, active=frozenset()):
+    """Encode a value as bytes which are the same across processes.
+    """
+    if isinstance(value, _CachedExpr):
+        return b'K' + value.key.encode('ascii')
+
+    encoded = _encode_scalar(value)
+    if encoded is not None:
+        return encoded
+
+    name = _qualified_name(value)
+    if name is not None:
+        return _encode_callable(value, name, active)
+
+    if type(value) in (tuple, list):
+        parts = [_encode(v, active) for v in value]
+    elif type(value) is dict:
+        parts = [
+            _encode(k, active) + _encode(v, active)
+            for k, v in value.items()
+        ]
+    elif type(value) in (set, frozenset):
+        # The iteration order of a set depends on the hash of the elements
+        # which changes between processes.
+        parts = sorted(_encode(v, active) for v in value)
+    else:
+        return b'P' + pickle.dumps(value, protocol=4)
+
+    return type(value).__name__[0].upper().encode('ascii') + _join(parts)
+
+
+def stable_hash(tree):
+    """Compute a hash of an expression which is the same across processes.
+
+    Parameters
+    ----------
+    tree : LTree
+        The expression to hash.
+
+    Returns
+    -------
+    key : str
+        The hex digest of the expression.
+
+    Raises
+    ------
+    TypeError
+        Raised when the expression contains a class defined inside of a
+        function, which cannot be told apart from other classes with the
+        same name.
+
+    Notes
+    -----
+    Functions and classes are hashed by their qualified name, so changing
+    the body of a function does not change the hash. Lambdas, closures, and
+    functions defined inside of other functions are also hashed by their
+    code, defaults, and the values in their closure, and bound methods by
+    the object they are bound to.
+
+    ``None``, bools, ints, floats, complex numbers, strings, and bytes are
+    encoded directly, and tuples, lists, dicts, sets, and frozensets are
+    encoded element by element. All other ``Normal`` values are hashed by
+    their pickled form. This is a best effort key: pickle's output may
+    depend on object identity, for example an object which holds the same
+    value twice pickles differently from one which holds two equal copies,
+    so equal values may have different keys and miss the cache.
+    """
+    h = hashlib.sha256()
+
+    def update(data):
+        h.update(len(data).to_bytes(8, 'little'))
+        h.update(data)
+
+    def visit(node):
+        if isinstance(node, Call):
+            update(b'call')
+            visit(node.func)
+            update(len(node.args).to_bytes(8, 'little'))
+            for arg in node.args:
+                visit(arg)
+            for key in sorted(node.kwargs):
+                update(key.encode('utf-8'))
+                visit(node.kwargs[key])
+        else:
+            update(_encode(node.value))
+
+    visit(tree)
+    return h.hexdigest()
+
+
+class _CachedExpr:
+    """An expression whose normal form is looked up in a ``DiskCache``.
+    """
+    __slots__ = '_cache', '_expr', 'key', '_normal'
+
+    def __init__(self, cache, expr):
+        self._cache = cache
+        self._expr = expr
+        self.key = stable_hash(parse(expr))
+
+    def __strict__(self):
+        try:
+            return self._normal
+        except AttributeError:
+            pass
+
+        try:
+            normal = self._cache[self.key]
+        except KeyError:
+            normal = strict(self._expr)
+            self._cache[self.key] = normal
+
+        self._normal = normal
+        # Release the expression so that we do not hold onto the graph.
+        self._expr = None
+        return normal
+
+
+class DiskCache:
+    """A cache of the normal forms of expressions that is stored in a
+    directory so that it can be shared across processes and runs.
+
+    Parameters
+    ----------
+    path : str
+        The directory to store the results in. This is created if it does
+        not exist.
+    max_size : int, optional
+        The maximum number of bytes to store. When this is exceeded, the
+        least recently used results are removed. By default the cache is
+        unbounded.
+
+    Examples
+    --------
+    >>> cache = DiskCache('/tmp/lazy-cache', max_size=2 ** 30)
+    >>> result = cache.cached(expensive(data)) + 1
+
+    Notes
+    -----
+    Entries are keyed by ``stable_hash`` of the expression.
+    """
+    _suffix = '.pickle'
+
+    def __init__(self, path, max_size=None):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.max_size = max_size
+
+    def _entry(self, key):
+        return os.path.join(self.path, key + self._suffix)
+
+    def cached(self, expr):
+        """Mark an expression to be stored in this cache.
+
+        Parameters
+        ----------
+        expr : any
+            The expression to cache.
+
+        Returns
+        -------
+        cached : thunk
+            A thunk which evaluates to the normal form of ``expr``. When this
+            is forced, the result is read from the cache without evaluating
+            any of ``expr``. On a miss, ``expr`` is evaluated and the result
+            is stored.
+        """
+        return thunk.fromexpr(_CachedExpr(self, expr))
+
+    def __getitem__(self, key):
+        entry = self._entry(key)
+        try:
+            with open(entry, 'rb') as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            raise KeyError(key)
+
+        try:
+            # Mark the entry as recently used.
+            os.utime(entry)
+        except FileNotFoundError:
+            # Another process evicted this entry.
+            pass
+        return value
+
+    def __setitem__(self, key, value):
+        fd, tmp = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self._entry(key))
+        except BaseException:
+            os.remove(tmp)
+            raise
+
+        if self.max_size is not None:
+            self._evict()
+
+    def __contains__(self, key):
+        return os.path.exists(self._entry(key))
+
+    def _entries(self):
+        for entry in os.scandir(self.path):
+            if entry.name.endswith(self._suffix):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                yield stat.st_mtime, stat.st_size, entry.path
+
+    def _evict(self):
+        entries = sorted(self._entries())
+        size = sum(entry[1] for entry in entries)
+        for _, entry_size, path in entries:
+            if size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            size -= entry_size
+
+    @property
+    def size(self):
+        """The number of bytes stored in the cache.
+        """
+        return sum(entry[1] for entry in self._entries())
+
+    def clear(self):
+        """Remove all of the entries from the cache.
+        """
+        for _, _, path in list(self._entries()):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
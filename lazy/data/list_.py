@@ -96,23 +96,48 @@ class Cons(L):
         try:
             return self._strict
         except AttributeError:
-            self._strict = ns = (strict(self.car),) + strict(self.cdr)
-            return ns
+            pass
+
+        # Walk the cells instead of recursing into ``strict(self.cdr)`` so
+        # that long lists do not hit the recursion limit.
+        elements = []
+        a = self
+        while isinstance(a, Cons):
+            try:
+                tail = a._strict
+                break
+            except AttributeError:
+                pass
+            elements.append(strict(a.car))
+            a = a.cdr
+        else:
+            tail = strict(a)
+
+        self._strict = ns = tuple(elements) + tail
+        return ns
 
     def __getitem__(self, key):
         if isinstance(key, slice):
-            return _from_iter(
-                islice(iter(self), key.start, key.stop, key.step),
-            )
+            return _from_iter(islice(
+                iter(self),
+                strict(key.start),
+                strict(key.stop),
+                strict(key.step),
+            ))
 
         key = strict(index(key))
         if key < 0:
             key = len(self) + key
+            if key < 0:
+                raise IndexError('LazyList index out of range')
 
-        if key == 0:
-            return self.car
-        else:
-            return self.cdr[key - 1]
+        a = self
+        while key:
+            a = a.cdr
+            if not isinstance(a, Cons):
+                return a[key - 1]
+            key -= 1
+        return a.car
 
     def __len__(self):
         return len(strict(self))
@@ -34,6 +34,21 @@ def test_L_slice():
     assert L[0, ..., 9][::2] == (0, 2, 4, 6, 8)
 
 
+def test_long_list():
+    # longer than the recursion limit
+    n = 10000
+    ls = L[0, ..., n - 1]
+    assert ls[n - 1] == n - 1
+    assert ls[-1] == n - 1
+    assert len(ls) == n
+    assert ls == tuple(range(n))
+
+    with pytest.raises(IndexError):
+        ls[n]
+    with pytest.raises(IndexError):
+        ls[-n - 1]
+
+
 def test_index():
     l = L[0, 1, 2]
     for n in range(3):
@@ -0,0 +1,261 @@
+"""Strictly evaluate the thunks inside of containers.
+"""
+from lazy._thunk import (
+    strict,
+    thunk,
+    _eval_call,
+    _finish,
+    _release,
+)
+from lazy.data.list_ import Cons, L, nil
+from lazy.utils import is_pending
+
+
+# The instructions on the stack used by ``deepstrict``.
+_visit = 'visit'
+_alias = 'alias'
+_build = 'build'
+
+
+class _Claims:
+    """The thunks claimed by ``deepstrict`` whose calls have returned but
+    whose normal forms are not known yet.
+
+    Other threads which force these thunks wait for ``deepstrict`` to
+    finish them.
+    """
+    def __init__(self):
+        # id -> (thunk, the result of its call)
+        self._heads = {}
+
+    def force(self, th):
+        """Evaluate the call in a pending thunk without normalizing the
+        result.
+
+        ``strict`` would turn an ``L`` into a tuple by walking the list
+        inside of ``L.__strict__``, this leaves that to ``deepstrict``.
+
+        Returns the result of the call and whether ``th`` was claimed by
+        this call. A thunk that is already claimed returns the result of
+        its call again, a thunk that is in normal form returns its normal
+        form.
+        """
+        try:
+            head = self._heads[id(th)][1]
+        except KeyError:
+            pass
+        else:
+            if isinstance(head, thunk):
+                raise RecursionError('recursivly defined thunk')
+            return head, False
+
+        claimed, head = _eval_call(th)
+        if claimed:
+            self._heads[id(th)] = th, head
+        return head, claimed
+
+    def finish(self, th, normal):
+        del self._heads[id(th)]
+        _finish(th, normal)
+
+    def release(self):
+        heads = self._heads
+        while heads:
+            _, (th, _) = heads.popitem()
+            _release(th)
+
+
+def _list_items(ob, claims):
+    """The elements of an ``L`` without recursing down the list.
+
+    Returns the elements and the thunks claimed as tails of the list along
+    with the index of the element where each tail starts.
+    """
+    items = []
+    tails = []
+    while isinstance(ob, Cons):
+        items.append(ob.car)
+        ob = ob.cdr
+        while is_pending(ob):
+            tail = ob
+            ob, claimed = claims.force(tail)
+            if claimed:
+                tails.append((tail, len(items)))
+        if isinstance(ob, thunk):
+            # a forced tail is already a tuple
+            ob = strict(ob)
+    if ob is not nil:
+        items.extend(ob)
+    return items, tails
+
+
+def _build_list(items, tails, claims):
+    def build(normals):
+        # the elements have been evaluated, store the normal forms of the
+        # thunks which produced the tails of the list
+        if tails:
+            strict_items = tuple(map(strict, items))
+            for th, start in tails:
+                claims.finish(th, strict_items[start:])
+        return tuple(normals)
+
+    return build
+
+
+def _head_normal(head, memo, claims):
+    """The normal form of a thunk whose call returned ``head`` once
+    ``head`` has been visited.
+    """
+    if isinstance(head, L):
+        items, _ = _list_items(head, claims)
+        return tuple(map(strict, items))
+    if isinstance(head, thunk):
+        return strict(head)
+    if type(head) in (list, dict, set, tuple, frozenset):
+        return head
+    return memo[id(head)]
+
+
+def _update_dict(out):
+    def update(items):
+        out.update(zip(items[::2], items[1::2]))
+
+    return update
+
+
+def deepstrict(ob):
+    """Strictly evaluate an object and every thunk inside of it.
+
+    Parameters
+    ----------
+    ob : any
+        The object to evaluate.
+
+    Returns
+    -------
+    normal : any
+        The normal form of ``ob`` where every tuple, list, dict, set,
+        frozenset, and ``lazy.data.L`` has been replaced with a new
+        container of the same type holding the normal forms of its
+        elements. ``L`` is replaced with a tuple, its normal form.
+
+    Raises
+    ------
+    ValueError
+        Raised when a tuple, frozenset, or ``L`` contains itself.
+
+    Notes
+    -----
+    This does not use the Python stack so it may evaluate containers that
+    are nested too deeply for ``strict``. Each thunk is evaluated once and
+    each container is rebuilt once, an object which appears more than once
+    is replaced with the same normal form everywhere. Lists, dicts, and sets
+    may contain themselves. A pending thunk is evaluated by calling its
+    function here, so an ``L`` which it returns, even one whose tails are
+    thunks, is walked one cell at a time instead of through ``strict``.
+
+    Subclasses of the containers and any other objects are evaluated with
+    ``strict`` but their contents are not walked.
+    """
+    claims = _Claims()
+    try:
+        return _walk(ob, claims)
+    except BaseException:
+        # the thunks which were not finished are pending again
+        claims.release()
+        raise
+
+
+def _walk(ob, claims):
+    """Evaluate ``ob`` for ``deepstrict`` with an explicit stack.
+    """
+    # id -> normal form
+    memo = {}
+    # hold the objects in ``memo`` so that their ids are not reused
+    keep = []
+    # the ids of the immutable containers whose elements are being evaluated
+    building = set()
+    results = []
+
+    stack = [(_visit, ob, None)]
+    while stack:
+        instr, ob, arg = stack.pop()
+        if instr is _alias:
+            memo[id(ob)] = results[-1]
+            if arg is not None:
+                head, = arg
+                claims.finish(ob, _head_normal(head, memo, claims))
+            continue
+
+        if instr is _build:
+            out, build, count = arg
+            start = len(results) - count
+            items = results[start:]
+            del results[start:]
+            if out is None:
+                out = memo[id(ob)] = build(items)
+                building.discard(id(ob))
+            else:
+                build(items)
+            results.append(out)
+            continue
+
+        key = id(ob)
+        try:
+            results.append(memo[key])
+            continue
+        except KeyError:
+            pass
+        keep.append(ob)
+
+        if isinstance(ob, thunk):
+            if is_pending(ob):
+                # evaluate the call here so that an ``L`` which it returns
+                # is walked below instead of by ``L.__strict__``
+                head, claimed = claims.force(ob)
+                stack.append((_alias, ob, (head,) if claimed else None))
+            else:
+                head = strict(ob)
+                stack.append((_alias, ob, None))
+            stack.append((_visit, head, None))
+            continue
+
+        cls = type(ob)
+        if cls is list:
+            out = memo[key] = []
+            build = out.extend
+            children = ob
+        elif cls is dict:
+            out = memo[key] = {}
+            build = _update_dict(out)
+            children = [item for pair in ob.items() for item in pair]
+        elif cls is set:
+            out = memo[key] = set()
+            build = out.update
+            children = list(ob)
+        elif cls in (tuple, frozenset) or isinstance(ob, L):
+            if key in building:
+                raise ValueError(
+                    'cannot deepstrict a %s which contains itself' %
+                    cls.__name__,
+                )
+            building.add(key)
+            out = None
+            if cls is frozenset:
+                build = frozenset
+                children = list(ob)
+            elif cls is tuple:
+                build = tuple
+                children = ob
+            else:
+                children, tails = _list_items(ob, claims)
+                build = _build_list(children, tails, claims)
+        else:
+            normal = memo[key] = strict(ob)
+            results.append(normal)
+            continue
+
+        stack.append((_build, ob, (out, build, len(children))))
+        stack.extend((_visit, child, None) for child in reversed(children))
+
+    return results[0]
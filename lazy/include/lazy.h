@@ -3,6 +3,17 @@
 
 #include <Python.h>
 
+/* The version of the ``LzExported`` struct described by this header. Fields
+ * are only ever appended to the struct, so a module built against an older
+ * version of this header can use a newer ``lazy._thunk``. The version that
+ * ``lazy._thunk`` provides is stored in
+ * ``lazy._thunk._exported_symbols_version``.
+ *
+ * Version 1: LzThunk_New, LzThunk_FromExpr, LzThunk_GetChildren
+ * Version 2: LzThunk_Type, LzThunk_Strict, LzThunk_IsNormal,
+ *            LzThunk_NewVector, LzThunk_CallVector */
+#define LZ_EXPORTED_VERSION 2
+
 typedef struct {
     /* Construct a new ``thunk`` object or evaluate a strict type.
      *
@@ -47,10 +58,151 @@ typedef struct {
      * children : tuple
      *     Either (func, args, kwargs) or (normal,). */
     PyObject *(*LzThunk_GetChildren)(PyObject*);
+
+    /* Version 2 -------------------------------------------------------- */
+
+    /* The ``thunk`` type. Use ``LzThunk_Check`` and ``LzThunk_CheckExact``
+     * to test if an object is a thunk without a function call. */
+    PyTypeObject *LzThunk_Type;
+
+    /* Strictly evaluate an expression. This is the same as ``lazy.strict``.
+     *
+     * Parameters
+     * ----------
+     * expr : any
+     *     The expression to evaluate.
+     *
+     * Returns
+     * -------
+     * normal : any
+     *     A new reference to the normal form of ``expr``. */
+    PyObject *(*LzThunk_Strict)(PyObject*);
+
+    /* Check if an expression has already been evaluated. This does not
+     * evaluate the expression and cannot fail.
+     *
+     * Parameters
+     * ----------
+     * expr : any
+     *     The expression to check.
+     *
+     * Returns
+     * -------
+     * is_normal : int
+     *     0 if ``expr`` is a thunk which has not been evaluated, otherwise
+     *     1. Objects which are not thunks are already in normal form. */
+    int (*LzThunk_IsNormal)(PyObject*);
+
+    /* Construct a new ``thunk`` from a C array of positional arguments.
+     * This is ``LzThunk_New`` without packing the arguments into a tuple
+     * first.
+     *
+     * Parameters
+     * ----------
+     * callable : callable
+     *     The callable to use for this thunk
+     * args : PyObject *const *
+     *     The positional arguments to pass to ``callable``.
+     * nargs : Py_ssize_t
+     *     The number of positional arguments.
+     *
+     * Returns
+     * -------
+     * th : any
+     *     A thunk unless callable is the constructor for a strict type. */
+    PyObject *(*LzThunk_NewVector)(PyObject*, PyObject *const*, Py_ssize_t);
+
+    /* Construct a new ``thunk`` with the vectorcall argument convention.
+     *
+     * Parameters
+     * ----------
+     * callable : callable
+     *     The callable to use for this thunk
+     * args : PyObject *const *
+     *     The positional arguments followed by the values of the keyword
+     *     arguments.
+     * nargs : Py_ssize_t
+     *     The number of positional arguments.
+     * kwnames : tuple or NULL
+     *     The names of the keyword arguments.
+     *
+     * Returns
+     * -------
+     * th : any
+     *     A thunk unless callable is the constructor for a strict type. */
+    PyObject *(*LzThunk_CallVector)(PyObject*,
+                                    PyObject *const*,
+                                    Py_ssize_t,
+                                    PyObject*);
 } LzExported;
 
+#ifdef LZ_THUNK_MODULE
+
+/* The definitions used in the implementation of ``lazy._thunk``. */
+
 extern PyTypeObject LzStrict_Type;
 
-#define LzThunk_CheckExact(ob) (Py_TYPE(ob) == (PyTypeObject*) &LzStrict_Type)
+#else
+
+/* Import the exported symbols from ``lazy._thunk``.
+ *
+ * Parameters
+ * ----------
+ * version : int
+ *     The minimum version of the ``LzExported`` struct required, normally
+ *     ``LZ_EXPORTED_VERSION``.
+ *
+ * Returns
+ * -------
+ * symbols : LzExported*
+ *     A borrowed pointer to the exported symbols or NULL with an exception
+ *     raised. */
+static inline LzExported *
+LzExported_Import(long version)
+{
+    PyObject *module;
+    PyObject *provided_ob;
+    long provided = 1;
+
+    if (!(module = PyImport_ImportModule("lazy._thunk"))) {
+        return NULL;
+    }
+    provided_ob = PyObject_GetAttrString(module, "_exported_symbols_version");
+    Py_DECREF(module);
+    if (provided_ob) {
+        provided = PyLong_AsLong(provided_ob);
+        Py_DECREF(provided_ob);
+        if (provided == -1 && PyErr_Occurred()) {
+            return NULL;
+        }
+    }
+    else if (PyErr_ExceptionMatches(PyExc_AttributeError)) {
+        /* Versions were added with version 2. */
+        PyErr_Clear();
+    }
+    else {
+        return NULL;
+    }
+
+    if (provided < version) {
+        PyErr_Format(PyExc_ImportError,
+                     "lazy._thunk provides version %ld of the C API but"
+                     " version %ld is required",
+                     provided,
+                     version);
+        return NULL;
+    }
+    return PyCapsule_Import("lazy._thunk._exported_symbols", 0);
+}
+
+/* Check if an object is a thunk. */
+#define LzThunk_Check(symbols, ob)                                      \
+    PyObject_TypeCheck(ob, (symbols)->LzThunk_Type)
+
+/* Check if an object is exactly a thunk and not a subclass. */
+#define LzThunk_CheckExact(symbols, ob)                                 \
+    (Py_TYPE(ob) == (symbols)->LzThunk_Type)
+
+#endif
 
 #endif
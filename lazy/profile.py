@@ -0,0 +1,220 @@
+"""Attribute the time spent evaluating thunks to the lines which created them.
+
+Evaluation is deferred, so a normal profiler charges the work in a thunk to
+whichever line called ``strict``. While a ``Profile`` is enabled, each thunk
+records the code object and line that built it and the time spent
+evaluating the thunk is charged to that site instead.
+"""
+from collections import namedtuple
+import sys
+
+from lazy._thunk import (
+    _get_site,
+    _profile_data,
+    _set_profiling,
+    get_children,
+    thunk,
+)
+
+
+SiteStats = namedtuple(
+    'SiteStats',
+    'filename lineno name count self_time total_time',
+)
+SiteStats.__doc__ = """The time charged to one creation site.
+
+Parameters
+----------
+filename : str
+    The file that created the thunks.
+lineno : int
+    The line that created the thunks.
+name : str
+    The name of the function that created the thunks.
+count : int
+    The number of thunks from this site which were evaluated.
+self_time : float
+    The seconds spent evaluating the thunks, excluding the thunks they
+    depend on.
+total_time : float
+    The seconds spent evaluating the thunks, including the thunks they
+    depend on.
+"""
+
+_unknown = '<unknown>', 0, '<unknown>'
+
+
+def _site(key):
+    if key is None:
+        return _unknown
+    code, lineno = key
+    return code.co_filename, lineno, code.co_name
+
+
+def creation_site(th):
+    """Get the line that created a thunk.
+
+    Parameters
+    ----------
+    th : thunk
+        The thunk to look up.
+
+    Returns
+    -------
+    site : (str, int, str) or None
+        The filename, line number, and function name, or None if ``th`` was
+        created while no ``Profile`` was enabled.
+    """
+    key = _get_site(th)
+    return None if key is None else _site(key)
+
+
+class Profile:
+    """Profile the evaluation of thunks by creation site.
+
+    Examples
+    --------
+    >>> with Profile() as p:
+    ...     strict(expr)
+    >>> p.print_stats()
+
+    Notes
+    -----
+    Only thunks created while a profile is enabled know their creation
+    site, the time spent evaluating older thunks is charged to
+    ``<unknown>``. The profiler is global so only one profile may be enabled
+    at a time.
+    """
+    def __init__(self):
+        # (filename, lineno, name) -> [count, self_ns, total_ns]
+        self._data = {}
+
+    def enable(self):
+        """Start recording creation sites and evaluation times.
+        """
+        _profile_data(reset=True)
+        _set_profiling(True)
+
+    def disable(self):
+        """Stop recording and collect the times recorded since ``enable``.
+        """
+        _set_profiling(False)
+        for key, values in _profile_data(reset=True).items():
+            totals = self._data.setdefault(_site(key), [0, 0, 0])
+            for n, value in enumerate(values):
+                totals[n] += value
+
+    def __enter__(self):
+        self.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.disable()
+
+    def stats(self):
+        """The time charged to each creation site.
+
+        Returns
+        -------
+        stats : list[SiteStats]
+            The sites ordered by their self time, most expensive first.
+        """
+        return sorted(
+            (
+                SiteStats(*site, count, self_ns / 1e9, total_ns / 1e9)
+                for site, (count, self_ns, total_ns) in self._data.items()
+            ),
+            key=lambda stat: stat.self_time,
+            reverse=True,
+        )
+
+    def print_stats(self, limit=None, file=None):
+        """Print the most expensive creation sites.
+
+        Parameters
+        ----------
+        limit : int, optional
+            The number of sites to print. By default all sites are printed.
+        file : file-like, optional
+            The file to write to. Defaults to ``sys.stdout``.
+        """
+        file = file if file is not None else sys.stdout
+        print(
+            '%10s %12s %12s  %s' % ('count', 'self (s)', 'total (s)', 'site'),
+            file=file,
+        )
+        for stat in self.stats()[:limit]:
+            print(
+                '%10d %12.6f %12.6f  %s:%d(%s)' % (
+                    stat.count,
+                    stat.self_time,
+                    stat.total_time,
+                    stat.filename,
+                    stat.lineno,
+                    stat.name,
+                ),
+                file=file,
+            )
+
+    def format_tree(self, expr):
+        """Format an unevaluated expression with the time charged to the
+        creation site of each node.
+
+        Parameters
+        ----------
+        expr : any
+            The expression to format. This should be built by the same code
+            which was profiled, for example the next call of a function.
+
+        Returns
+        -------
+        formatted : str
+            One line per node, indented under the node which uses it.
+            Nodes that appear more than once are only expanded the first
+            time.
+        """
+        stats = {stat[:3]: stat for stat in self.stats()}
+        lines = []
+        seen = set()
+        stack = [(expr, 0)]
+        while stack:
+            node, depth = stack.pop()
+            indent = '  ' * depth
+            if not isinstance(node, thunk):
+                lines.append('%s%r' % (indent, node))
+                continue
+
+            children = get_children(node)
+            if len(children) == 1:
+                lines.append('%s%r' % (indent, children[0]))
+                continue
+
+            func, args, kwargs = children
+            label = getattr(func, '__name__', None) or repr(func)
+            site = creation_site(node)
+            if site is None:
+                lines.append('%s%s' % (indent, label))
+            else:
+                stat = stats.get(site)
+                lines.append('%s%s  %s:%d(%s)%s' % (
+                    indent,
+                    label,
+                    site[0],
+                    site[1],
+                    site[2],
+                    '' if stat is None else '  self=%.6fs total=%.6fs' % (
+                        stat.self_time,
+                        stat.total_time,
+                    ),
+                ))
+
+            if id(node) in seen:
+                lines[-1] += '  (shared)'
+                continue
+            seen.add(id(node))
+            stack.extend(
+                (child, depth + 1)
+                for child in reversed(args + tuple(kwargs.values()))
+            )
+
+        return '\n'.join(lines)
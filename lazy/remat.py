@@ -0,0 +1,163 @@
+from collections import OrderedDict
+import sys
+from weakref import ref
+
+from lazy._thunk import thunk, strict
+
+
+def _nbytes(ob):
+    """Estimate the number of bytes held by a value.
+    """
+    nbytes = getattr(ob, 'nbytes', None)
+    return nbytes if isinstance(nbytes, int) else sys.getsizeof(ob)
+
+
+class _RematNode:
+    """A call whose result may be released by a ``RematPool`` and
+    recomputed when it is needed again.
+    """
+    __slots__ = (
+        '_pool',
+        '_func',
+        '_args',
+        '_kwargs',
+        '_value',
+        '_computed',
+        'nbytes',
+        '__weakref__',
+    )
+
+    _missing = object()
+
+    def __init__(self, pool, func, args, kwargs):
+        self._pool = pool
+        self._func = func
+        self._args = args
+        self._kwargs = kwargs
+        self._value = self._missing
+        self._computed = False
+        self.nbytes = 0
+
+    def __strict__(self):
+        value = self._value
+        if value is not self._missing:
+            self._pool._touch(self)
+            return value
+
+        value = strict(self._func)(
+            *map(strict, self._args),
+            **{k: strict(v) for k, v in self._kwargs.items()}
+        )
+        self._value = value = strict(value)
+        self._pool._add(self)
+        self._computed = True
+        return value
+
+
+class RematPool:
+    """A memory budget for the results of pure function calls.
+
+    When the results held by the pool exceed ``budget`` bytes, the least
+    recently used results are released. A released result is recomputed
+    from its function and arguments the next time it is forced.
+
+    Parameters
+    ----------
+    budget : int
+        The number of bytes of results to hold.
+    min_size : int, optional
+        Results smaller than this many bytes are always held and are not
+        counted against the budget.
+
+    Attributes
+    ----------
+    bytes_held : int
+        The number of bytes of results currently held by the pool.
+    evictions : int
+        The number of results which have been released.
+    recomputations : int
+        The number of results which were computed again after being
+        released.
+
+    Examples
+    --------
+    >>> pool = RematPool(budget=2 ** 30)
+    >>> features = pool.thunk(compute_features, raw)
+    >>> model = fit(features)
+    >>> # ``features`` may be released here and recomputed below
+    >>> report = score(features, model)
+
+    Notes
+    -----
+    Only use this for pure functions; the function may be called more
+    than once. Releasing a result only frees its memory when nothing else
+    holds a reference to it.
+    """
+    def __init__(self, budget, min_size=0):
+        self.budget = budget
+        self.min_size = min_size
+        self.bytes_held = 0
+        self.evictions = 0
+        self.recomputations = 0
+        # id -> (weakref to the node, nbytes), in least to most recently
+        # used order
+        self._nodes = OrderedDict()
+
+    def thunk(self, func, *args, **kwargs):
+        """Create a thunk whose result is managed by this pool.
+
+        Parameters
+        ----------
+        func : callable
+            The pure function to call.
+        *args, **kwargs
+            The arguments to call ``func`` with.
+
+        Returns
+        -------
+        th : thunk
+            The deferred call.
+        """
+        return thunk.fromexpr(_RematNode(self, func, args, kwargs))
+
+    def _touch(self, node):
+        try:
+            self._nodes.move_to_end(id(node))
+        except KeyError:
+            # small values are not tracked
+            pass
+
+    def _discard(self, key, dead):
+        entry = self._nodes.get(key)
+        if entry is None or entry[0] is not dead:
+            # the node was evicted, or its id was reused by a new node
+            return
+        del self._nodes[key]
+        self.bytes_held -= entry[1]
+
+    def _add(self, node):
+        if node._computed:
+            self.recomputations += 1
+
+        node.nbytes = nbytes = _nbytes(node._value)
+        if nbytes < self.min_size:
+            return
+
+        key = id(node)
+        self._nodes[key] = ref(
+            node,
+            lambda dead, key=key: self._discard(key, dead),
+        ), nbytes
+        self.bytes_held += nbytes
+
+        nodes = self._nodes
+        while self.bytes_held > self.budget and len(nodes) > 1:
+            _, (evicted, nbytes) = nodes.popitem(last=False)
+            self.bytes_held -= nbytes
+            evicted = evicted()
+            if evicted is None:
+                # the node died but its callback has not run yet, it no
+                # longer holds a value
+                continue
+            evicted._value = evicted._missing
+            self.evictions += 1
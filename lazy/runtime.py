@@ -1,8 +1,9 @@
-from sys import _getframe
+from sys import _getframe, version_info
 
-from codetransformer import Code
-
-from .bytecode import lazy_function
+if version_info >= (3, 8):
+    from .source import _compile_lazy
+else:
+    from .bytecode import _compile_lazy
 
 
 def run_lazy(src, name='<string>', mode='exec', globals_=None, locals_=None):
@@ -13,9 +14,7 @@ def run_lazy(src, name='<string>', mode='exec', globals_=None, locals_=None):
     else:
         raise ValueError("mode must be either 'exec' or 'eval'")
     return f(
-        lazy_function.transform(Code.from_pycode(
-            compile(src, name, mode),
-        )).to_pycode(),
+        _compile_lazy(src, name, mode),
         _getframe().f_back.f_globals if globals_ is None else globals_,
         _getframe().f_back.f_locals if locals_ is None else locals_,
     )
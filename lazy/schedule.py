@@ -0,0 +1,145 @@
+from lazy._thunk import strict, get_children
+from lazy.utils import is_pending
+
+
+def _unit_weight(th):
+    return 1
+
+
+def _pending_children(th):
+    func, args, kwargs = get_children(th)
+    children = [func]
+    children.extend(args)
+    children.extend(kwargs.values())
+    return [child for child in children if is_pending(child)]
+
+
+def schedule(expr, weight=None):
+    """Order the evaluation of the pending thunks in an expression to
+    minimize the memory held at once.
+
+    Parameters
+    ----------
+    expr : any
+        The expression to schedule.
+    weight : callable[thunk -> int], optional
+        An estimate of the size of the normal form of a pending thunk. By
+        default every result has a weight of 1.
+
+    Returns
+    -------
+    order : list[thunk]
+        The pending thunks in ``expr`` in the order they should be
+        evaluated. Every thunk appears after all of its children.
+
+    Notes
+    -----
+    The children of each node are ordered by their Sethi-Ullman need, the
+    most memory held at once while evaluating the child, minus the size of
+    the child's result. Evaluating the children with the largest
+    transient memory first means that fewer large results are held while
+    the expensive children run.
+    """
+    if weight is None:
+        weight = _unit_weight
+
+    if not is_pending(expr):
+        return []
+
+    nodes = {id(expr): expr}
+    children = {}
+    size = {}
+    need = {}
+
+    # compute the need of each node in post order
+    stack = [(expr, False)]
+    while stack:
+        th, expanded = stack.pop()
+        key = id(th)
+        if key in need:
+            continue
+
+        if not expanded:
+            stack.append((th, True))
+            children[key] = cs = _pending_children(th)
+            for child in cs:
+                if id(child) not in need:
+                    nodes[id(child)] = child
+                    stack.append((child, False))
+            continue
+
+        size[key] = result_size = weight(th)
+        ordered = sorted(
+            # dedupe while preserving the order of the arguments
+            dict.fromkeys(map(id, children[key])),
+            key=lambda child: need[child] - size[child],
+            reverse=True,
+        )
+        children[key] = ordered
+
+        node_need = held = 0
+        for child in ordered:
+            node_need = max(node_need, held + need[child])
+            held += size[child]
+        need[key] = max(node_need, held + result_size)
+
+    # emit each node after its children in the chosen order
+    order = []
+    emitted = set()
+    stack = [(id(expr), False)]
+    while stack:
+        key, expanded = stack.pop()
+        if key in emitted:
+            continue
+        if expanded:
+            emitted.add(key)
+            order.append(nodes[key])
+            continue
+
+        stack.append((key, True))
+        stack.extend(
+            (child, False)
+            for child in reversed(children[key])
+            if child not in emitted
+        )
+
+    return order
+
+
+def strict_scheduled(expr, weight=None):
+    """Strictly evaluate an expression in the order chosen by ``schedule``.
+
+    Parameters
+    ----------
+    expr : any
+        The expression to evaluate.
+    weight : callable[thunk -> int], optional
+        An estimate of the size of the normal form of a pending thunk. By
+        default every result has a weight of 1.
+
+    Returns
+    -------
+    normal : any
+        The normal form of ``expr``.
+
+    Notes
+    -----
+    Each intermediate result is released as soon as the last thunk which
+    consumes it has been evaluated, unless it is referenced from outside of
+    ``expr``. This does not use the Python stack so it may evaluate
+    expressions that are too deep for ``strict``.
+    """
+    order = schedule(expr, weight)
+    order.reverse()
+    while order:
+        # Popping the thunk drops our reference to it so that its normal
+        # form is only held by the thunks which still need it.
+        th = order.pop()
+        # The children of ``th`` are already in normal form so this only
+        # evaluates the call of ``th`` itself. Going through ``strict``
+        # keeps the claim, deadline, and profiling of the evaluator, and
+        # releases the references that ``th`` holds to its children.
+        strict(th)
+        del th
+
+    return strict(expr)
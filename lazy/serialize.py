@@ -0,0 +1,430 @@
+"""Serialize unevaluated thunk graphs without forcing them.
+
+The graph is written as a table of nodes in dependency order, each node
+refers to its children by their index in the table so shared subgraphs are
+only written once. The leaves of the graph (the functions and ``Normal``
+values) are deduplicated by identity and written in a single pickle.
+
+Layout
+------
+::
+
+    magic      b'LZG'
+    version    1 byte
+    leaves     varint length, then a pickle of the list of leaf values
+    nodes      varint count, then the nodes
+
+    node       VALUE  leaf              a plain value
+               NORMAL leaf              a normal thunk
+               CALL   func nargs arg* nkwargs (key-leaf arg)*
+                                        a pending thunk
+               TUPLE  n item*           a tuple which holds thunks
+               LIST   n item*           a list which holds thunks
+               DICT   n (key value)*    a dict which holds thunks
+
+A NORMAL or CALL code with the TYPED bit set is followed by the leaf of the
+type of the thunk, this is used for subclasses of ``thunk``.
+
+All integers are unsigned LEB128 varints. The last node is the root.
+"""
+from functools import reduce
+from importlib import import_module
+import io
+import pickle
+from types import FunctionType
+
+from lazy._thunk import get_children, strict, thunk
+from lazy.transform import _LazyFunction
+
+
+_magic = b'LZG'
+_version = 1
+
+_VALUE = 0
+_NORMAL = 1
+_CALL = 2
+_TUPLE = 3
+_LIST = 4
+_DICT = 5
+_TYPED = 0x80
+
+# The containers which are written as nodes when they hold thunks.
+_container_codes = {tuple: _TUPLE, list: _LIST, dict: _DICT}
+
+# Out of band buffers were added in protocol 5 (Python 3.8).
+_protocol = min(5, pickle.HIGHEST_PROTOCOL)
+
+
+def _write_varint(out, n):
+    while n > 0x7f:
+        out.append((n & 0x7f) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _read_varint(data, offset):
+    n = 0
+    shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        n |= (byte & 0x7f) << shift
+        if not byte & 0x80:
+            return n, offset
+        shift += 7
+
+
+def _key_holds_pending(key):
+    """Does a dict key hold a thunk which has not been evaluated?
+
+    The keys of a dict are hashed when it is loaded, which would evaluate
+    these thunks.
+    """
+    stack = [key]
+    while stack:
+        ob = stack.pop()
+        if isinstance(ob, thunk):
+            if len(get_children(ob)) == 3:
+                return True
+        elif type(ob) is tuple:
+            stack.extend(ob)
+    return False
+
+
+def _items(container):
+    """The values in a tuple or list, or the keys and values of a dict.
+    """
+    if type(container) is dict:
+        return [ob for item in container.items() for ob in item]
+    return container
+
+
+def _load_lazy_function(module, qualname):
+    """Look up a function created with ``lazy_function`` by name.
+    """
+    return strict(reduce(getattr, qualname.split('.'), import_module(module)))
+
+
+def _lazy_function_name(fn):
+    """The module and qualified name that a function created with
+    ``lazy_function`` may be loaded from, or None.
+    """
+    original = getattr(fn, '__wrapped__', fn)
+    if original not in _LazyFunction._originals:
+        return None
+
+    name = fn.__module__, fn.__qualname__
+    try:
+        found = _load_lazy_function(*name)
+    except Exception:
+        return None
+    # specialized functions and functions that are not bound to their name
+    # cannot be found again
+    return name if found is fn else None
+
+
+class _Pickler(pickle.Pickler):
+    def reducer_override(self, ob):
+        # The transformed function of a lazy function has the name of the
+        # strict function, but that name is bound to the boxed lazy function
+        # so the default pickling by reference fails.
+        if type(ob) is FunctionType:
+            name = _lazy_function_name(ob)
+            if name is not None:
+                return _load_lazy_function, name
+        return NotImplemented
+
+
+class _Writer:
+    def __init__(self):
+        # id -> index, the objects are held in ``leaves`` and ``_nodes``
+        self._leaf_ids = {}
+        self.leaves = []
+        self._node_ids = {}
+        self._nodes = []
+        # id -> does the container hold a thunk?
+        self._holds = {}
+        self.out = bytearray()
+
+    def leaf(self, ob):
+        try:
+            return self._leaf_ids[id(ob)]
+        except KeyError:
+            self._leaf_ids[id(ob)] = ix = len(self.leaves)
+            self.leaves.append(ob)
+            return ix
+
+    def node(self, ob):
+        return self._node_ids[id(ob)]
+
+    def holds_thunks(self, container):
+        """Does a tuple, list, or dict hold a thunk directly or through other
+        tuples, lists, and dicts?
+        """
+        try:
+            return self._holds[id(container)]
+        except KeyError:
+            pass
+
+        holds = self._holds
+        seen = set()
+        stack = [container]
+        found = False
+        while stack:
+            ob = stack.pop()
+            if isinstance(ob, thunk):
+                found = True
+                break
+            if type(ob) not in _container_codes or id(ob) in seen:
+                continue
+            known = holds.get(id(ob))
+            if known is not None:
+                if known:
+                    found = True
+                    break
+                continue
+            seen.add(id(ob))
+            stack.extend(_items(ob))
+
+        if not found:
+            # nothing reachable from ``container`` holds a thunk
+            holds.update(dict.fromkeys(seen, False))
+        holds[id(container)] = found
+        return found
+
+    def add(self, ob, children):
+        out = self.out
+        if isinstance(ob, thunk):
+            code = _NORMAL if len(children) == 1 else _CALL
+            if type(ob) is thunk:
+                out.append(code)
+            else:
+                out.append(code | _TYPED)
+                _write_varint(out, self.leaf(type(ob)))
+
+            if code == _NORMAL:
+                _write_varint(out, self.leaf(children[0]))
+            else:
+                func, args, kwargs = children
+                _write_varint(out, self.node(func))
+                _write_varint(out, len(args))
+                for arg in args:
+                    _write_varint(out, self.node(arg))
+                _write_varint(out, len(kwargs))
+                for key, arg in kwargs.items():
+                    _write_varint(out, self.leaf(key))
+                    _write_varint(out, self.node(arg))
+        elif (type(ob) in _container_codes and
+                self.holds_thunks(ob)):
+            out.append(_container_codes[type(ob)])
+            _write_varint(out, len(ob))
+            for item in _items(ob):
+                _write_varint(out, self.node(item))
+        else:
+            out.append(_VALUE)
+            _write_varint(out, self.leaf(ob))
+
+        self._node_ids[id(ob)] = len(self._nodes)
+        self._nodes.append(ob)
+
+    def write(self, expr):
+        # iterative post-order traversal so that deep graphs do not hit the
+        # recursion limit
+        active = set()
+        stack = [(expr, False)]
+        while stack:
+            ob, ready = stack.pop()
+            if id(ob) in self._node_ids:
+                continue
+
+            children = get_children(ob) if isinstance(ob, thunk) else ()
+            if ready:
+                active.discard(id(ob))
+                self.add(ob, children)
+                continue
+
+            if len(children) == 3:
+                func, args, kwargs = children
+                nested = (func,) + args + tuple(kwargs.values())
+            elif (type(ob) in _container_codes and
+                    self.holds_thunks(ob)):
+                if type(ob) is dict and any(map(_key_holds_pending, ob)):
+                    raise ValueError(
+                        'cannot serialize a dict with a pending thunk in'
+                        ' one of its keys',
+                    )
+                nested = _items(ob)
+            else:
+                self.add(ob, children)
+                continue
+
+            if id(ob) in active:
+                raise ValueError(
+                    'cannot serialize a %s which contains itself' %
+                    type(ob).__name__,
+                )
+            active.add(id(ob))
+            stack.append((ob, True))
+            stack.extend((child, False) for child in reversed(nested))
+
+        return len(self._nodes)
+
+
+def dumps(expr, buffer_callback=None):
+    """Serialize an expression without evaluating it.
+
+    Parameters
+    ----------
+    expr : any
+        The expression to serialize.
+    buffer_callback : callable, optional
+        Passed to the pickler when writing the leaves. When given,
+        values which support pickle protocol 5 such as numpy arrays are not
+        copied into the result, their buffers are passed to this function
+        instead and must be given to ``loads``.
+
+    Returns
+    -------
+    data : bytes
+        The serialized expression.
+
+    Raises
+    ------
+    ValueError
+        Raised when ``buffer_callback`` is given and pickle protocol 5 is
+        not available, when a list or dict which holds thunks contains
+        itself, or when the key of a dict holds a pending thunk.
+
+    Notes
+    -----
+    Each thunk and leaf value is written once no matter how many times it
+    is used, so the sharing in the graph is preserved by ``loads``. The
+    functions and ``Normal`` values are pickled, pickling the functions in
+    ``lazy.operator`` only writes their name.
+
+    Tuples, lists, and dicts which hold thunks are walked like the
+    arguments of a thunk, so the thunks inside of them are written without
+    being evaluated. Thunks inside of any other object cannot be pickled.
+    The keys of a dict are hashed when it is loaded, so they may only hold
+    thunks which are in normal form. A thunk is evaluated when it is hashed
+    so this only excludes thunks which depend on a ``Cell``.
+
+    Functions created with ``lazy_function`` are written by the name they
+    are bound to, so they must be defined at the top level of a module or
+    class on Python 3.8 and newer. Specialized functions and lazy functions
+    defined inside of other functions cannot be written.
+
+    See Also
+    --------
+    loads
+    """
+    if buffer_callback is not None and _protocol < 5:
+        raise ValueError('out of band buffers require pickle protocol 5')
+
+    writer = _Writer()
+    count = writer.write(expr)
+
+    options = {}
+    if buffer_callback is not None:
+        options['buffer_callback'] = buffer_callback
+    leaves = io.BytesIO()
+    _Pickler(leaves, protocol=_protocol, **options).dump(writer.leaves)
+    leaves = leaves.getvalue()
+
+    out = bytearray(_magic)
+    out.append(_version)
+    _write_varint(out, len(leaves))
+    out += leaves
+    _write_varint(out, count)
+    out += writer.out
+    return bytes(out)
+
+
+def loads(data, buffers=None):
+    """Read an expression written by ``dumps``.
+
+    Parameters
+    ----------
+    data : bytes-like
+        The serialized expression.
+    buffers : iterable, optional
+        The buffers passed to the ``buffer_callback`` of ``dumps``.
+
+    Returns
+    -------
+    expr : any
+        The expression. Thunks which were pending when the expression was
+        written are pending again.
+
+    Raises
+    ------
+    ValueError
+        Raised when ``data`` was not written by ``dumps``.
+
+    See Also
+    --------
+    dumps
+    """
+    data = memoryview(data).cast('B')
+    if bytes(data[:len(_magic)]) != _magic:
+        raise ValueError('data is not a serialized lazy expression')
+    if data[len(_magic)] != _version:
+        raise ValueError(
+            'unsupported serialization version: %d' % data[len(_magic)],
+        )
+
+    size, offset = _read_varint(data, len(_magic) + 1)
+    options = {}
+    if buffers is not None:
+        options['buffers'] = buffers
+    leaves = pickle.loads(data[offset:offset + size], **options)
+    offset += size
+
+    count, offset = _read_varint(data, offset)
+    nodes = []
+    for _ in range(count):
+        code = data[offset]
+        offset += 1
+        thunk_type = thunk
+        if code & _TYPED:
+            ix, offset = _read_varint(data, offset)
+            thunk_type = leaves[ix]
+            code &= ~_TYPED
+
+        if code == _VALUE:
+            ix, offset = _read_varint(data, offset)
+            nodes.append(leaves[ix])
+        elif code == _NORMAL:
+            ix, offset = _read_varint(data, offset)
+            nodes.append(thunk_type.fromexpr(leaves[ix]))
+        elif code in (_TUPLE, _LIST, _DICT):
+            size, offset = _read_varint(data, offset)
+            items = []
+            for _ in range(size * 2 if code == _DICT else size):
+                ix, offset = _read_varint(data, offset)
+                items.append(nodes[ix])
+            if code == _TUPLE:
+                nodes.append(tuple(items))
+            elif code == _LIST:
+                nodes.append(items)
+            else:
+                nodes.append(dict(zip(items[::2], items[1::2])))
+        elif code == _CALL:
+            ix, offset = _read_varint(data, offset)
+            func = nodes[ix]
+            nargs, offset = _read_varint(data, offset)
+            args = []
+            for _ in range(nargs):
+                ix, offset = _read_varint(data, offset)
+                args.append(nodes[ix])
+            nkwargs, offset = _read_varint(data, offset)
+            kwargs = {}
+            for _ in range(nkwargs):
+                key, offset = _read_varint(data, offset)
+                ix, offset = _read_varint(data, offset)
+                kwargs[leaves[key]] = nodes[ix]
+            nodes.append(thunk_type(func, *args, **kwargs))
+        else:
+            raise ValueError('invalid node code: %d' % code)
+
+    return nodes[-1]
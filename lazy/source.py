@@ -0,0 +1,1176 @@
+import ast
+from contextlib import contextmanager
+from copy import deepcopy
+from functools import lru_cache, partial
+import linecache
+import operator as op
+from sys import _getframe
+import warnings
+from types import CodeType, FunctionType
+from uuid import uuid4
+
+from lazy._thunk import boxcache, strict, thunk
+from lazy.data.list_ import _from_iter
+from lazy.transform import (
+    _LazyFunction,
+    _box_defaults,
+    _fold,
+    _inlined_global,
+    _is_foldable,
+    _lazy_is,
+    _lazy_is_not,
+    _lazy_not,
+    _may_inline,
+)
+from lazy.utils import instance
+
+
+_binary_ops = {
+    ast.Add: op.add,
+    ast.BitAnd: op.and_,
+    ast.BitOr: op.or_,
+    ast.BitXor: op.xor,
+    ast.Div: op.truediv,
+    ast.FloorDiv: op.floordiv,
+    ast.LShift: op.lshift,
+    ast.MatMult: op.matmul,
+    ast.Mod: op.mod,
+    ast.Mult: op.mul,
+    ast.Pow: op.pow,
+    ast.RShift: op.rshift,
+    ast.Sub: op.sub,
+}
+_unary_ops = {
+    ast.Invert: op.invert,
+    ast.Not: op.not_,
+    ast.UAdd: op.pos,
+    ast.USub: op.neg,
+}
+_compare_ops = {
+    ast.Eq: op.eq,
+    ast.Gt: op.gt,
+    ast.GtE: op.ge,
+    ast.Lt: op.lt,
+    ast.LtE: op.le,
+    ast.NotEq: op.ne,
+}
+
+
+# The most nodes an inlined function may have.
+_inline_max_nodes = 64
+
+# The syntax which only builds thunks when run in a lazy function. Branches
+# would force a value and stores to attributes or items would cause a side
+# effect when the caller is run instead of when the call is forced.
+_inline_node_types = (
+    ast.Assign,
+    ast.Attribute,
+    ast.BinOp,
+    ast.Call,
+    ast.Compare,
+    ast.Constant,
+    ast.Dict,
+    ast.Expr,
+    ast.List,
+    ast.Load,
+    ast.Name,
+    ast.Pass,
+    ast.Return,
+    ast.Set,
+    ast.Slice,
+    ast.Store,
+    ast.Subscript,
+    ast.Tuple,
+    ast.UnaryOp,
+    ast.arg,
+    ast.arguments,
+    ast.cmpop,
+    ast.keyword,
+    ast.operator,
+    ast.unaryop,
+) + ((ast.Index,) if hasattr(ast, 'Index') else ())
+_index_type = getattr(ast, 'Index', ())
+
+
+def _is_inlinable(node):
+    """Can calls to the lazy version of a function be inlined into the
+    caller?
+
+    Parameters
+    ----------
+    node : ast.FunctionDef or ast.Lambda
+        The definition of the function before being transformed.
+
+    Returns
+    -------
+    inlinable : bool
+        True when ``node`` is small and only builds an expression.
+
+    See Also
+    --------
+    lazy.transform._may_inline
+    """
+    nodes = [
+        node
+        for child in ast.iter_child_nodes(node)
+        for node in ast.walk(child)
+    ]
+    return len(nodes) <= _inline_max_nodes and all(
+        isinstance(node, _inline_node_types) and
+        # ``in`` iterates over the thunk
+        not isinstance(node, (ast.In, ast.NotIn)) and
+        not (isinstance(node, (ast.Attribute, ast.Subscript)) and
+             isinstance(node.ctx, ast.Store))
+        for node in nodes
+    )
+
+
+def _import_wrapper(level, fromlist, name, *, _getframe=_getframe):
+    calling_frame = _getframe(1)
+    return thunk(
+        __import__,
+        name,
+        calling_frame.f_globals,
+        calling_frame.f_locals,
+        fromlist,
+        level,
+    )
+
+
+def _construct_map(key_value_pairs):
+    return dict(zip(key_value_pairs[::2], key_value_pairs[1::2]))
+
+
+_scope_types = (
+    ast.AsyncFunctionDef,
+    ast.ClassDef,
+    ast.DictComp,
+    ast.FunctionDef,
+    ast.GeneratorExp,
+    ast.Lambda,
+    ast.ListComp,
+    ast.SetComp,
+)
+_comprehension_types = (
+    ast.DictComp,
+    ast.GeneratorExp,
+    ast.ListComp,
+    ast.SetComp,
+)
+
+
+def _arguments(args):
+    """The names of the parameters of a function.
+    """
+    params = [
+        arg.arg
+        for arg in (
+            getattr(args, 'posonlyargs', []) + args.args + args.kwonlyargs
+        )
+    ]
+    if args.vararg is not None:
+        params.append(args.vararg.arg)
+    if args.kwarg is not None:
+        params.append(args.kwarg.arg)
+    return params
+
+
+def _enclosing_nodes(node):
+    """The parts of a scope which are evaluated in the enclosing scope.
+    """
+    if isinstance(node, _comprehension_types):
+        return [node.generators[0].iter]
+
+    nodes = list(getattr(node, 'decorator_list', ()))
+    if isinstance(node, ast.ClassDef):
+        nodes.extend(node.bases)
+        nodes.extend(keyword.value for keyword in node.keywords)
+    else:
+        nodes.extend(node.args.defaults)
+        nodes.extend(
+            default for default in node.args.kw_defaults
+            if default is not None
+        )
+    return nodes
+
+
+class _Scope:
+    """The names bound in a function, class, or module body.
+
+    Parameters
+    ----------
+    node : ast.AST
+        The node which introduces the scope.
+    parent : _Scope or None
+        The enclosing scope.
+    """
+    __slots__ = (
+        'kind',
+        'parent',
+        'params',
+        'stored',
+        'globals',
+        'nonlocals',
+    )
+
+    def __init__(self, node, parent):
+        self.parent = parent
+        self.globals = set()
+        self.nonlocals = set()
+        self.stored = stored = set()
+
+        if isinstance(node, (ast.Module, ast.Expression, ast.Interactive)):
+            self.kind = 'module'
+            self.params = set()
+            body = node.body
+            if isinstance(node, ast.Expression):
+                body = [body]
+        elif isinstance(node, ast.ClassDef):
+            self.kind = 'class'
+            self.params = set()
+            body = node.body
+        elif isinstance(node, _comprehension_types):
+            self.kind = 'function'
+            self.params = set()
+            first, *rest = node.generators
+            body = [first.target] + first.ifs + rest
+            if isinstance(node, ast.DictComp):
+                body += [node.key, node.value]
+            else:
+                body.append(node.elt)
+        else:
+            self.kind = 'function'
+            self.params = set(_arguments(node.args))
+            body = node.body if isinstance(node.body, list) else [node.body]
+
+        stack = list(body)
+        while stack:
+            node = stack.pop()
+            if isinstance(node, _scope_types):
+                if isinstance(node, (ast.FunctionDef,
+                                     ast.AsyncFunctionDef,
+                                     ast.ClassDef)):
+                    stored.add(node.name)
+                if isinstance(node, _comprehension_types):
+                    # assignment expressions bind in the enclosing function
+                    stored.update(
+                        child.target.id
+                        for child in ast.walk(node)
+                        if isinstance(child, ast.NamedExpr)
+                    )
+                stack.extend(_enclosing_nodes(node))
+                continue
+
+            if isinstance(node, ast.Name):
+                if not isinstance(node.ctx, ast.Load):
+                    stored.add(node.id)
+            elif isinstance(node, ast.Global):
+                self.globals.update(node.names)
+            elif isinstance(node, ast.Nonlocal):
+                self.nonlocals.update(node.names)
+            elif isinstance(node, ast.Import):
+                stored.update(
+                    alias.asname or alias.name.partition('.')[0]
+                    for alias in node.names
+                )
+            elif isinstance(node, ast.ImportFrom):
+                stored.update(
+                    alias.asname or alias.name
+                    for alias in node.names
+                    if alias.name != '*'
+                )
+            elif isinstance(node, ast.ExceptHandler) and node.name:
+                stored.add(node.name)
+            elif getattr(node, 'name', None) and type(node).__name__ in (
+                    'MatchAs', 'MatchStar'):
+                stored.add(node.name)
+            elif getattr(node, 'rest', None) and type(node).__name__ == (
+                    'MatchMapping'):
+                stored.add(node.rest)
+
+            stack.extend(ast.iter_child_nodes(node))
+
+        stored -= self.globals | self.nonlocals
+
+    def binds(self, name):
+        return (
+            name not in self.globals and
+            (name in self.params or name in self.stored)
+        )
+
+
+class _Transformer(ast.NodeTransformer):
+    """Rewrite a syntax tree so that evaluating it builds thunks.
+
+    Parameters
+    ----------
+    scope : _Scope
+        The scope of the outermost node being transformed.
+    freevars : container[str], optional
+        The names which are closed over from outside of the tree.
+    known : dict[str -> any], optional
+        The names in ``scope`` to replace with constants.
+    inline_globals : dict, optional
+        The globals used to inline calls to small lazy functions.
+
+    Notes
+    -----
+    The objects used by the transformed code, like boxed constants, are
+    stored in the code object's constants. The syntax tree can only hold
+    literals so each object is represented with a unique string until the
+    tree is compiled, then the strings are replaced with ``patch``.
+    """
+    def __init__(self, scope, freevars=(), known=None, inline_globals=None):
+        self._scope = self._outer = scope
+        self._freevars = freevars
+        self._known = known or {}
+        self._inline_globals = inline_globals
+        self._prefix = '\0lazy:%s:' % uuid4().hex
+        # placeholder -> object
+        self._objects = {}
+        # id -> placeholder for objects which are reused
+        self._shared = {}
+        # placeholder -> the value of a boxed constant
+        self._constants = {}
+
+    def _object(self, ob, shared=True):
+        """Create a node which loads an object.
+        """
+        if shared:
+            try:
+                return ast.Constant(self._shared[id(ob)])
+            except KeyError:
+                pass
+
+        key = '%s%d' % (self._prefix, len(self._objects))
+        self._objects[key] = ob
+        if shared:
+            self._shared[id(ob)] = key
+        return ast.Constant(key)
+
+    def _call(self, ob, *args):
+        return ast.Call(func=self._object(ob), args=list(args), keywords=[])
+
+    def _constant(self, value):
+        """Create a node which loads a boxed constant.
+        """
+        node = self._object(thunk.fromexpr(value), shared=False)
+        self._constants[node.value] = value
+        return node
+
+    def _constant_value(self, node):
+        """The value of a boxed constant or None.
+
+        Returns
+        -------
+        is_constant : bool
+            Is ``node`` a boxed constant?
+        value : any
+            The value of the constant.
+        """
+        try:
+            return True, self._constants[node.value]
+        except (AttributeError, KeyError, TypeError):
+            return False, None
+
+    def _folded(self, func, node, *operands):
+        """Fold an operation on boxed constants.
+
+        Returns
+        -------
+        folded : ast.AST
+            A boxed constant or a call to ``func``, or ``node`` if any of
+            the operands are not constant.
+        """
+        values = []
+        for operand in operands:
+            is_constant, value = self._constant_value(operand)
+            if not is_constant:
+                return node
+            values.append(value)
+
+        folded, value = _fold(func, *values)
+        if folded:
+            return self._constant(value)
+        # Python would fold the operation on the placeholders.
+        return self._call(thunk, self._object(func), *operands)
+
+    def _box(self, node, box):
+        return ast.copy_location(self._call(box, node), node)
+
+    @contextmanager
+    def _enter(self, node):
+        scope = self._scope
+        self._scope = _Scope(node, scope)
+        try:
+            yield
+        finally:
+            self._scope = scope
+
+    def _resolve(self, name):
+        """Find how a name is loaded.
+
+        Returns
+        -------
+        kind : {'local', 'param', 'free', 'global', 'known'}
+            The kind of variable.
+        """
+        scope = self._scope
+        if scope.kind == 'function':
+            if name in scope.globals:
+                return 'global'
+            if name in scope.nonlocals:
+                return 'free'
+            if scope is self._outer and name in self._known:
+                return 'known'
+            if scope.binds(name):
+                return 'param' if name in scope.params else 'local'
+        elif scope.kind == 'class' and scope.binds(name):
+            return 'global'
+
+        parent = scope.parent
+        while parent is not None:
+            if parent.kind == 'function':
+                if name in parent.globals:
+                    return 'global'
+                if name in parent.nonlocals:
+                    return 'free'
+                if parent is self._outer and name in self._known:
+                    return 'known'
+                if parent.binds(name):
+                    return 'free'
+            parent = parent.parent
+
+        return 'free' if name in self._freevars else 'global'
+
+    def _body(self, body):
+        """Transform the statements of a body, keeping the docstring.
+        """
+        if (body and
+                isinstance(body[0], ast.Expr) and
+                isinstance(body[0].value, ast.Constant) and
+                isinstance(body[0].value.value, str)):
+            docstring, *body = body
+            return [docstring] + self._statements(body)
+        return self._statements(body)
+
+    def _statements(self, body):
+        new_body = []
+        for statement in body:
+            statement = self.visit(statement)
+            if isinstance(statement, list):
+                new_body.extend(statement)
+            else:
+                new_body.append(statement)
+        return new_body
+
+    def visit_Module(self, node):
+        node.body = self._body(node.body)
+        return node
+
+    visit_Interactive = visit_Module
+
+    def visit_Name(self, node):
+        if not isinstance(node.ctx, ast.Load):
+            return node
+
+        kind = self._resolve(node.id)
+        if kind == 'local':
+            # To assign to a name, it must have been a value already so it
+            # is a thunk unless it was passed into the function.
+            return node
+        if kind == 'known':
+            return ast.copy_location(
+                self._constant(self._known[node.id]),
+                node,
+            )
+        if kind in ('param', 'free'):
+            # Closures may hold a different value on each call, don't keep
+            # the last one alive.
+            return self._box(node, thunk.fromexpr)
+
+        box = None
+        if self._inline_globals is not None:
+            box = _inlined_global(
+                self._inline_globals,
+                node.id,
+                boxcache(thunk),
+            )
+        if box is None:
+            # Globals are almost always the same object so each load site
+            # reuses the thunk that boxed the previous value.
+            box = boxcache(thunk)
+        return ast.copy_location(
+            ast.Call(
+                func=self._object(box, shared=False),
+                args=[node],
+                keywords=[],
+            ),
+            node,
+        )
+
+    def visit_Constant(self, node):
+        return ast.copy_location(self._constant(node.value), node)
+
+    def visit_JoinedStr(self, node):
+        # The literal parts of an f-string must stay strings.
+        for value in node.values:
+            if isinstance(value, ast.FormattedValue):
+                value.value = self.visit(value.value)
+                if value.format_spec is not None:
+                    self.visit_JoinedStr(value.format_spec)
+        return node
+
+    def visit_BinOp(self, node):
+        self.generic_visit(node)
+        return ast.copy_location(
+            self._folded(_binary_ops[type(node.op)], node, node.left,
+                         node.right),
+            node,
+        )
+
+    def visit_UnaryOp(self, node):
+        self.generic_visit(node)
+        func = _unary_ops[type(node.op)]
+        new_node = self._folded(func, node, node.operand)
+        if new_node is node and func is op.not_:
+            # ``not`` would call ``bool`` on the thunk
+            new_node = self._call(_lazy_not, node.operand)
+        return ast.copy_location(new_node, node)
+
+    def visit_Compare(self, node):
+        self.generic_visit(node)
+        if len(node.ops) != 1:
+            return node
+
+        cmp, = node.ops
+        right, = node.comparators
+        if isinstance(cmp, (ast.Is, ast.IsNot)):
+            # ``is`` should compare the values that the thunks represent
+            return ast.copy_location(
+                self._call(
+                    _lazy_is if isinstance(cmp, ast.Is) else _lazy_is_not,
+                    node.left,
+                    right,
+                ),
+                node,
+            )
+
+        func = _compare_ops.get(type(cmp))
+        if func is None:
+            return node
+        return ast.copy_location(
+            self._folded(func, node, node.left, right),
+            node,
+        )
+
+    def visit_Subscript(self, node):
+        self.generic_visit(node)
+        if not isinstance(node.ctx, ast.Load):
+            return node
+        slice_ = node.slice
+        if isinstance(slice_, _index_type):
+            # Python 3.8 wraps the subscript
+            slice_ = slice_.value
+        return ast.copy_location(
+            self._folded(op.getitem, node, node.value, slice_),
+            node,
+        )
+
+    def _sequence(self, node, type_):
+        self.generic_visit(node)
+        if not isinstance(node.ctx, ast.Load):
+            return node
+
+        values = []
+        for elt in node.elts:
+            is_constant, value = self._constant_value(elt)
+            if not is_constant:
+                break
+            values.append(value)
+        else:
+            if type_ is tuple and _is_foldable(tuple(values)):
+                return ast.copy_location(self._constant(tuple(values)), node)
+
+        if any(isinstance(elt, ast.Starred) for elt in node.elts):
+            return node
+
+        return ast.copy_location(
+            self._call(
+                partial(thunk, type_),
+                ast.Tuple(elts=node.elts, ctx=ast.Load()),
+            ),
+            node,
+        )
+
+    def visit_Tuple(self, node):
+        return self._sequence(node, tuple)
+
+    def visit_List(self, node):
+        return self._sequence(node, list)
+
+    def visit_Set(self, node):
+        node.ctx = ast.Load()
+        return self._sequence(node, set)
+
+    def visit_Dict(self, node):
+        self.generic_visit(node)
+        if any(key is None for key in node.keys):
+            # ``**`` unpacking
+            return node
+
+        key_value_pairs = []
+        for key, value in zip(node.keys, node.values):
+            key_value_pairs.append(key)
+            key_value_pairs.append(value)
+
+        return ast.copy_location(
+            self._call(
+                partial(thunk, _construct_map),
+                ast.Tuple(elts=key_value_pairs, ctx=ast.Load()),
+            ),
+            node,
+        )
+
+    def _comprehension(self, node):
+        first = node.generators[0]
+        first.iter = self.visit(first.iter)
+        with self._enter(node):
+            first.target = self.visit(first.target)
+            first.ifs = [self.visit(if_) for if_ in first.ifs]
+            for generator in node.generators[1:]:
+                self.generic_visit(generator)
+            if isinstance(node, ast.DictComp):
+                node.key = self.visit(node.key)
+                node.value = self.visit(node.value)
+            else:
+                node.elt = self.visit(node.elt)
+
+        return any(generator.is_async for generator in node.generators)
+
+    def visit_ListComp(self, node):
+        if self._comprehension(node):
+            return node
+
+        # Build the elements on demand.
+        return ast.copy_location(
+            self._call(
+                _from_iter,
+                ast.GeneratorExp(elt=node.elt, generators=node.generators),
+            ),
+            node,
+        )
+
+    def visit_GeneratorExp(self, node):
+        if self._comprehension(node):
+            return node
+        return ast.copy_location(self._call(_from_iter, node), node)
+
+    def visit_SetComp(self, node):
+        if self._comprehension(node):
+            return node
+        return ast.copy_location(self._call(partial(thunk, set), node), node)
+
+    def visit_DictComp(self, node):
+        if self._comprehension(node):
+            return node
+        return ast.copy_location(self._call(partial(thunk, dict), node), node)
+
+    def _arguments(self, args):
+        # defaults are evaluated in the enclosing scope
+        args.defaults = [self.visit(default) for default in args.defaults]
+        args.kw_defaults = [
+            None if default is None else self.visit(default)
+            for default in args.kw_defaults
+        ]
+
+    def visit_FunctionDef(self, node):
+        node.decorator_list = [
+            self.visit(decorator) for decorator in node.decorator_list
+        ]
+        self._arguments(node.args)
+        with self._enter(node):
+            node.body = self._body(node.body)
+
+        name = ast.Name(id=node.name, ctx=ast.Load())
+        rebind = ast.Assign(
+            targets=[ast.Name(id=node.name, ctx=ast.Store())],
+            value=self._call(thunk.fromexpr, name),
+        )
+        return [node, ast.copy_location(rebind, node)]
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_Lambda(self, node):
+        self._arguments(node.args)
+        with self._enter(node):
+            node.body = self.visit(node.body)
+        return ast.copy_location(self._call(thunk.fromexpr, node), node)
+
+    def visit_ClassDef(self, node):
+        # Class statements are evaluated strictly.
+        return node
+
+    def visit_AugAssign(self, node):
+        if not isinstance(node.target, ast.Name):
+            self.generic_visit(node)
+            return node
+
+        # ``x += y`` loads ``x`` without a ``Name`` node to box.
+        return ast.copy_location(
+            ast.Assign(
+                targets=[node.target],
+                value=self.visit(ast.copy_location(
+                    ast.BinOp(
+                        left=ast.Name(id=node.target.id, ctx=ast.Load()),
+                        op=node.op,
+                        right=node.value,
+                    ),
+                    node,
+                )),
+            ),
+            node,
+        )
+
+    def visit_Raise(self, node):
+        self.generic_visit(node)
+        if node.exc is not None:
+            node.exc = self._call(strict, node.exc)
+        if node.cause is not None:
+            node.cause = self._call(strict, node.cause)
+        return node
+
+    def visit_ExceptHandler(self, node):
+        # The exception types are matched strictly.
+        node.body = self._statements(node.body)
+        return node
+
+    def visit_match_case(self, node):
+        # Patterns are matched strictly.
+        if node.guard is not None:
+            node.guard = self.visit(node.guard)
+        node.body = self._statements(node.body)
+        return node
+
+    def _import(self, level, fromlist, name):
+        return self._call(partial(_import_wrapper, level, fromlist, name))
+
+    def visit_Import(self, node):
+        assignments = []
+        for alias in node.names:
+            value = self._import(0, None, alias.name)
+            if alias.asname is None:
+                target = alias.name.partition('.')[0]
+            else:
+                target = alias.asname
+                for attr in alias.name.split('.')[1:]:
+                    value = ast.Attribute(value=value, attr=attr,
+                                          ctx=ast.Load())
+            assignments.append(ast.copy_location(
+                ast.Assign(
+                    targets=[ast.Name(id=target, ctx=ast.Store())],
+                    value=value,
+                ),
+                node,
+            ))
+        return assignments
+
+    def visit_ImportFrom(self, node):
+        if any(alias.name == '*' for alias in node.names):
+            return node
+
+        fromlist = tuple(alias.name for alias in node.names)
+        return [
+            ast.copy_location(
+                ast.Assign(
+                    targets=[ast.Name(id=alias.asname or alias.name,
+                                      ctx=ast.Store())],
+                    value=ast.Attribute(
+                        value=self._import(
+                            node.level,
+                            fromlist,
+                            node.module or '',
+                        ),
+                        attr=alias.name,
+                        ctx=ast.Load(),
+                    ),
+                ),
+                node,
+            )
+            for alias in node.names
+        ]
+
+    def _patch_constant(self, const):
+        if isinstance(const, str):
+            return self._objects.get(const, const)
+        if isinstance(const, CodeType):
+            return self.patch(const)
+        if type(const) is tuple:
+            return tuple(map(self._patch_constant, const))
+        if type(const) is frozenset:
+            return frozenset(map(self._patch_constant, const))
+        if type(const) is slice:
+            return slice(
+                self._patch_constant(const.start),
+                self._patch_constant(const.stop),
+                self._patch_constant(const.step),
+            )
+        return const
+
+    def compile(self, tree, filename, mode):
+        """Compile a transformed tree.
+
+        Parameters
+        ----------
+        tree : ast.AST
+            The transformed tree.
+        filename : str
+            The name of the file the tree came from.
+        mode : {'exec', 'eval'}
+            The kind of code to compile.
+
+        Returns
+        -------
+        code : CodeType
+            The code which loads the objects used by the tree.
+        """
+        with warnings.catch_warnings():
+            # The compiler warns about calls to the placeholders.
+            warnings.simplefilter('ignore', SyntaxWarning)
+            code = compile(ast.fix_missing_locations(tree), filename, mode)
+        return self.patch(code)
+
+    def patch(self, code):
+        """Replace the placeholders in a compiled code object with the
+        objects they represent.
+
+        Parameters
+        ----------
+        code : CodeType
+            The compiled code.
+
+        Returns
+        -------
+        patched : CodeType
+            The code which loads the objects.
+        """
+        return code.replace(
+            co_consts=tuple(map(self._patch_constant, code.co_consts)),
+        )
+
+
+@lru_cache(16)
+def _parse(source, filename):
+    return ast.parse(source, filename)
+
+
+@lru_cache(16)
+def _compile_module(source, filename):
+    with warnings.catch_warnings():
+        # the warnings were already shown when the module was compiled
+        warnings.simplefilter('ignore')
+        return compile(source, filename, 'exec', dont_inherit=True)
+
+
+def _compiles_to(source, code):
+    """Does compiling a module's source produce a code object?
+
+    This tells us if the source that we found for a function is the source
+    that the function was compiled from.
+    """
+    codes = [_compile_module(source, code.co_filename)]
+    while codes:
+        candidate = codes.pop()
+        if candidate == code:
+            return True
+        codes.extend(
+            const for const in candidate.co_consts
+            if isinstance(const, CodeType)
+        )
+    return False
+
+
+def _function_node(f):
+    """Find the definition of a function in its source file.
+
+    Parameters
+    ----------
+    f : function
+        The function to find.
+
+    Returns
+    -------
+    node : ast.FunctionDef, ast.AsyncFunctionDef, or ast.Lambda
+        A copy of the definition of ``f``.
+
+    Raises
+    ------
+    TypeError
+        Raised when the source of ``f`` cannot be found, for example because
+        it was defined with ``exec`` or in the interactive interpreter, or
+        when the source file no longer matches the code of ``f``.
+    """
+    code = f.__code__
+    lines = linecache.getlines(code.co_filename, f.__globals__)
+    if not lines:
+        raise TypeError(
+            'cannot find the source of %s to transform, lazy_function'
+            ' needs the source file of the function' % f.__qualname__,
+        )
+
+    params = list(code.co_varnames[
+        :code.co_argcount + code.co_kwonlyargcount +
+        bool(code.co_flags & 0x04) + bool(code.co_flags & 0x08)
+    ])
+    candidates = []
+    for node in ast.walk(_parse(''.join(lines), code.co_filename)):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            lineno = min(
+                [node.lineno] +
+                [decorator.lineno for decorator in node.decorator_list]
+            )
+            matches = node.name == code.co_name
+        elif isinstance(node, ast.Lambda):
+            lineno = node.lineno
+            matches = code.co_name == '<lambda>'
+        else:
+            continue
+
+        if (matches and
+                lineno == code.co_firstlineno and
+                sorted(_arguments(node.args)) == sorted(params)):
+            candidates.append(node)
+
+    if len(candidates) > 1 and hasattr(code, 'co_positions'):
+        # Many lambdas may be defined on one line.
+        positions = {
+            (lineno, col)
+            for lineno, _, col, _ in code.co_positions()
+        }
+        candidates = [
+            node for node in candidates
+            if (node.body.lineno, node.body.col_offset) in positions
+        ]
+    elif len(candidates) > 1 and code.co_name == '<lambda>':
+        # Without column information, compile each candidate to compare its
+        # constants. These do not depend on the scope the code is compiled
+        # in.
+        candidates = [
+            node for node in candidates
+            if _find_code(
+                compile(ast.Expression(body=node), code.co_filename, 'eval'),
+                code.co_name,
+            ).co_consts == code.co_consts
+        ]
+
+    if len(candidates) != 1:
+        raise TypeError(
+            'cannot find the source of %s to transform' % f.__qualname__,
+        )
+    if not _compiles_to(''.join(lines), code):
+        # The file changed after the function was compiled, transforming
+        # it would silently build different code from what is running.
+        raise TypeError(
+            'the source of %s in %s does not match its code, the file may'
+            ' have changed since it was imported' % (
+                f.__qualname__,
+                code.co_filename,
+            ),
+        )
+    return deepcopy(candidates[0])
+
+
+def _find_code(code, name):
+    """Find a code object by name in the code compiled from a module.
+    """
+    codes = [code]
+    while codes:
+        code = codes.pop(0)
+        if code.co_name == name:
+            return code
+        codes.extend(
+            const for const in code.co_consts
+            if isinstance(const, CodeType)
+        )
+    raise ValueError('no code object named %r' % name)
+
+
+def _compile_function(f, inline, known):
+    """Transform a strict function.
+
+    Parameters
+    ----------
+    f : function
+        The function to transform.
+    inline : bool
+        Should calls to small lazy functions be inlined?
+    known : dict[str -> any]
+        The arguments to bind to constants.
+
+    Returns
+    -------
+    code : CodeType
+        The code of the lazy function.
+    inlinable : bool
+        Can calls to the lazy function be inlined into other lazy functions?
+    """
+    node = _function_node(f)
+    if isinstance(node, ast.Lambda):
+        node = ast.copy_location(
+            ast.FunctionDef(
+                name='<lambda>',
+                args=node.args,
+                body=[ast.copy_location(ast.Return(value=node.body), node)],
+                decorator_list=[],
+                returns=None,
+            ),
+            node,
+        )
+    node.decorator_list = []
+    node.returns = None
+    node.args.defaults = []
+    node.args.kw_defaults = [None] * len(node.args.kwonlyargs)
+    for arg in ast.walk(node.args):
+        if isinstance(arg, ast.arg):
+            arg.annotation = None
+
+    if known:
+        args = node.args
+        for field in ('posonlyargs', 'args', 'kwonlyargs'):
+            if hasattr(args, field):
+                setattr(args, field, [
+                    arg for arg in getattr(args, field)
+                    if arg.arg not in known
+                ])
+        args.kw_defaults = [None] * len(args.kwonlyargs)
+
+        scope = _Scope(node, None)
+        nonlocals = {
+            name
+            for child in ast.walk(node)
+            if isinstance(child, ast.Nonlocal)
+            for name in child.names
+        }
+        prologue = []
+        for name in list(known):
+            if name in scope.stored or name in nonlocals:
+                # The argument is reassigned so it becomes a local which
+                # starts as the boxed value.
+                prologue.append(ast.copy_location(
+                    ast.Assign(
+                        targets=[ast.Name(id=name, ctx=ast.Store())],
+                        value=ast.Constant(known.pop(name)),
+                    ),
+                    node.body[0],
+                ))
+        node.body[:0] = prologue
+
+    inlinable = _may_inline(f) and _is_inlinable(node)
+
+    transformer = _Transformer(
+        _Scope(node, None),
+        freevars=f.__code__.co_freevars,
+        known=known,
+        inline_globals=f.__globals__ if inline else None,
+    )
+    node.body = transformer._body(node.body)
+    definition = node
+
+    # Compile the function inside of a function which defines the names it
+    # closes over, and inside of its class so that private names are
+    # mangled.
+    *path, _ = f.__qualname__.split('.')
+    if path and path[-1] != '<locals>':
+        definition = ast.ClassDef(
+            name=path[-1],
+            bases=[],
+            keywords=[],
+            body=[definition],
+            decorator_list=[],
+        )
+    # The definition binds its name in the factory, which would turn a
+    # reference to the function or its class into a free variable. Declare
+    # the names global so that they are looked up where ``f`` looks them up.
+    bound = sorted(
+        name
+        for name in {definition.name, node.name} - set(f.__code__.co_freevars)
+        if name.isidentifier()
+    )
+    body = [definition]
+    if bound:
+        body.insert(0, ast.Global(names=bound))
+    factory = ast.FunctionDef(
+        name='<lazy>',
+        args=ast.arguments(
+            posonlyargs=[],
+            args=[ast.arg(arg=name) for name in f.__code__.co_freevars],
+            vararg=None,
+            kwonlyargs=[],
+            kw_defaults=[],
+            kwarg=None,
+            defaults=[],
+        ),
+        body=body,
+        decorator_list=[],
+        returns=None,
+    )
+    module = ast.Module(
+        body=[ast.copy_location(factory, node)],
+        type_ignores=[],
+    )
+    code = _find_code(
+        transformer.compile(module, f.__code__.co_filename, 'exec'),
+        f.__code__.co_name,
+    )
+    return code, inlinable
+
+
+def _compile_lazy(source, filename, mode):
+    """Compile source code so that evaluating it builds thunks.
+
+    Parameters
+    ----------
+    source : str
+        The source code to compile.
+    filename : str
+        The name of the file the source came from.
+    mode : {'exec', 'eval'}
+        The kind of code to compile.
+
+    Returns
+    -------
+    code : CodeType
+        The compiled code.
+    """
+    tree = ast.parse(source, filename, mode)
+    transformer = _Transformer(_Scope(tree, None))
+    if isinstance(tree, ast.Expression):
+        tree.body = transformer.visit(tree.body)
+    else:
+        tree = transformer.visit(tree)
+    return transformer.compile(tree, filename, mode)
+
+
+@instance
+class lazy_function(_LazyFunction):
+    __doc__ = _LazyFunction.__doc__
+
+    def _transform_function(self, f, inline, known):
+        code, inlinable = _compile_function(f, inline, dict(known))
+
+        freevars = f.__code__.co_freevars
+        fn = FunctionType(
+            code,
+            f.__globals__,
+            f.__name__,
+            None,
+            tuple(f.__closure__[freevars.index(name)]
+                  for name in code.co_freevars) or None,
+        )
+        fn.__qualname__ = f.__qualname__
+        fn.__doc__ = f.__doc__
+        _box_defaults(fn, f, thunk.fromexpr, known)
+        return fn, inlinable
+
+
+specialize = lazy_function.specialize
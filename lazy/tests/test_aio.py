@@ -0,0 +1,134 @@
+import asyncio
+from itertools import count
+import threading
+
+import pytest
+
+from lazy import thunk, strict, strict_async, get_children
+
+
+def run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+def test_strict_async_sync_graph():
+    expr = thunk(lambda a, b=1: a + b, thunk.fromexpr(1) * 2, b=3)
+    assert run(strict_async(expr)) == 5
+    assert get_children(expr) == (5,)
+
+
+def test_strict_async_awaits_coroutines():
+    async def f(a):
+        await asyncio.sleep(0)
+        return a + 1
+
+    expr = thunk(f, thunk(f, 1)) * 2
+    assert run(strict_async(expr)) == 6
+    assert strict(expr) == 6
+
+
+def test_strict_async_concurrent():
+    counter = count()
+    started = []
+    finished = []
+
+    async def fetch(key):
+        started.append(next(counter))
+        await asyncio.sleep(0.01)
+        finished.append(next(counter))
+        return key
+
+    expr = thunk(fetch, 1) + thunk(fetch, 2) + thunk(fetch, 3)
+    assert run(strict_async(expr)) == 6
+    # all of the fetches start before any of them finish
+    assert max(started) < min(finished)
+
+
+def test_strict_async_shared():
+    calls = []
+
+    async def f(a):
+        calls.append(a)
+        return a
+
+    shared = thunk(f, 1)
+    assert run(strict_async(shared + shared)) == 2
+    assert calls == [1]
+
+
+def test_await_thunk():
+    async def f(a):
+        return a
+
+    async def main():
+        return await (thunk(f, 1) + 1)
+
+    assert run(main()) == 2
+
+
+def test_strict_async_claims_thunk():
+    calls = []
+    started = threading.Event()
+    resume = threading.Event()
+    results = []
+
+    async def f(a):
+        calls.append(a)
+        started.set()
+        while not resume.is_set():
+            await asyncio.sleep(0.001)
+        return a
+
+    th = thunk(f, 1) + 1
+
+    def force():
+        started.wait()
+        resume.set()
+        # waits for the coroutine instead of calling ``f`` again
+        results.append(strict(th))
+
+    thread = threading.Thread(target=force)
+    thread.start()
+    assert run(strict_async(th)) == 2
+    thread.join()
+    assert results == [2]
+    assert calls == [1]
+
+
+def test_strict_async_same_loop_shared():
+    calls = []
+
+    async def f(a):
+        calls.append(a)
+        await asyncio.sleep(0.001)
+        return a
+
+    shared = thunk(f, 1)
+
+    async def main():
+        return await asyncio.gather(
+            strict_async(shared + 1),
+            strict_async(shared + 2),
+        )
+
+    assert run(main()) == [2, 3]
+    assert calls == [1]
+
+
+def test_strict_async_failure_releases():
+    fail = [False, True]
+
+    async def f():
+        if fail.pop():
+            raise ValueError('failed')
+        return 1
+
+    th = thunk(f)
+    with pytest.raises(ValueError):
+        run(strict_async(th))
+    assert len(get_children(th)) == 3
+    assert run(strict_async(th)) == 1
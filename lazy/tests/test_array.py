@@ -0,0 +1,200 @@
+import pytest
+
+from lazy import thunk, strict, get_children, lazy_function
+
+np = pytest.importorskip('numpy')
+
+from lazy.array import FusedKernel, Input, fuse, vectorize  # noqa
+
+
+@pytest.fixture
+def arrays():
+    n = 20000  # larger than the default blocksize
+    return (
+        np.arange(n, dtype='f8'),
+        np.linspace(0, 1, n),
+        np.full(n, 3.0),
+    )
+
+
+def test_ufunc_is_lazy():
+    called = False
+
+    def f():
+        nonlocal called
+        called = True
+        return np.arange(3.0)
+
+    th = np.sin(thunk(f))
+    assert isinstance(th, thunk)
+    assert not called
+
+    np.testing.assert_array_equal(strict(th), np.sin(np.arange(3.0)))
+    assert called
+
+
+def test_ufunc_chain_fused(arrays):
+    a, b, c = arrays
+    expr = np.add(np.multiply(thunk.fromexpr(a), b), c)
+
+    assert isinstance(get_children(expr)[0], FusedKernel)
+    np.testing.assert_allclose(strict(expr), a * b + c)
+
+
+def test_fuse_operators(arrays):
+    a, b, c = map(thunk.fromexpr, arrays)
+    expr = fuse(np.sin(a * b + c) - c ** 2)
+
+    assert isinstance(get_children(expr)[0], FusedKernel)
+    np.testing.assert_allclose(
+        strict(expr),
+        np.sin(arrays[0] * arrays[1] + arrays[2]) - arrays[2] ** 2,
+    )
+
+
+def test_fuse_broadcast():
+    a = thunk.fromexpr(np.arange(6.0).reshape(2, 3))
+    b = thunk.fromexpr(np.arange(3.0))
+    expr = fuse(a * b + 1)
+
+    assert isinstance(get_children(expr)[0], FusedKernel)
+    np.testing.assert_array_equal(
+        strict(expr),
+        np.arange(6.0).reshape(2, 3) * np.arange(3.0) + 1,
+    )
+
+
+def test_fuse_non_array_arguments():
+    expr = fuse(thunk.fromexpr([1]) + [2] + [3])
+    assert isinstance(get_children(expr)[0], FusedKernel)
+    assert strict(expr) == [1, 2, 3]
+
+
+def test_fuse_nested():
+    def f(a):
+        return a
+
+    a = thunk.fromexpr(np.arange(3.0))
+    expr = fuse(thunk(f, a * 2 + 1))
+
+    func, (arg,), _ = get_children(expr)
+    assert func is f
+    assert isinstance(get_children(arg)[0], FusedKernel)
+    np.testing.assert_array_equal(strict(expr), np.arange(3.0) * 2 + 1)
+
+
+def test_array_function():
+    a = thunk.fromexpr(np.arange(3))
+    b = thunk(np.arange, 3, 6)
+    expr = np.concatenate([a, b])
+
+    assert isinstance(expr, thunk)
+    np.testing.assert_array_equal(strict(expr), np.arange(6))
+
+
+def test_ufunc_method():
+    expr = np.add.reduce(thunk.fromexpr(np.arange(4)))
+
+    assert isinstance(expr, thunk)
+    assert strict(expr) == 6
+
+
+def test_ufunc_out_is_strict():
+    out = np.empty(3)
+    ret = np.multiply(thunk.fromexpr(np.arange(3.0)), 2, out=out)
+
+    assert ret is out
+    np.testing.assert_array_equal(out, np.arange(3.0) * 2)
+
+
+def test_vectorize():
+    a = thunk.fromexpr('a')
+    b = thunk.fromexpr('b')
+    vectorized = vectorize(a * 2 + b, ['a', 'b'])
+
+    np.testing.assert_array_equal(
+        vectorized(np.arange(3), np.arange(3, 6)),
+        np.array([3, 6, 9]),
+    )
+
+
+def test_vectorize_bool_arithmetic():
+    a = thunk.fromexpr('a')
+    vectorized = vectorize(~a + (a < 1), ['a'])
+
+    np.testing.assert_array_equal(
+        vectorized([True, False]),
+        np.array([~True + (True < 1), ~False + (False < 1)]),
+    )
+
+
+def test_vectorize_getitem():
+    a = thunk.fromexpr('a')
+    table = thunk.fromexpr(np.array([10, 20, 30]))
+
+    np.testing.assert_array_equal(
+        vectorize(table[a], ['a'])([2, 0]),
+        np.array([30, 10]),
+    )
+    np.testing.assert_array_equal(
+        vectorize(a[1], ['a'])(np.array([[1, 2], [3, 4]])),
+        np.array([2, 4]),
+    )
+
+
+def test_vectorize_fallback():
+    calls = []
+
+    def f(x):
+        calls.append(x)
+        return x % 7 == 3
+
+    a = thunk.fromexpr('a')
+    vectorized = vectorize(thunk(f, a + 1), ['a'])
+
+    np.testing.assert_array_equal(
+        vectorized([2, 3, 9]),
+        np.array([True, False, True]),
+    )
+    assert calls == [3, 4, 10]
+    assert all(type(c) is int for c in calls)
+
+    np.testing.assert_array_equal(
+        vectorize(a[1], ['a'])([(1, 'x'), (3, 'y')]),
+        np.array(['x', 'y']),
+    )
+
+
+def test_vectorize_constant():
+    vectorized = vectorize(thunk.fromexpr(3) + 4, ['a'])
+    np.testing.assert_array_equal(vectorized([1, 2]), np.array([7, 7]))
+
+
+def test_vectorize_input():
+    @strict
+    @lazy_function
+    def f(a, b):
+        return a * 2 + b
+
+    a, b = Input('a'), Input('b')
+    np.testing.assert_array_equal(
+        vectorize(f(a, b), [a, b])(np.arange(3), np.arange(3, 6)),
+        np.array([3, 6, 9]),
+    )
+
+
+def test_vectorize_input_branch():
+    @strict
+    @lazy_function
+    def f(a):
+        if a > 0:
+            return a
+        return -a
+
+    with pytest.raises(TypeError):
+        f(Input('a'))
+
+    # a pending branch is evaluated for each row
+    a = Input('a')
+    vectorized = vectorize(thunk(f, a), [a])
+    np.testing.assert_array_equal(vectorized([-1, 2]), np.array([1, 2]))
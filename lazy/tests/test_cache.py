@@ -0,0 +1,167 @@
+import os
+
+import pytest
+
+from lazy import thunk, strict, parse
+from lazy.cache import DiskCache, stable_hash
+
+
+def _f(a, b):
+    return a + b
+
+
+def _g(a, b):
+    return a - b
+
+
+@pytest.fixture
+def cache(tmpdir):
+    return DiskCache(str(tmpdir))
+
+
+def test_stable_hash():
+    def expr(f, a):
+        return thunk(f, thunk.fromexpr(a) + 1, {'b', 'a'})
+
+    assert stable_hash(parse(expr(_f, 1))) == stable_hash(parse(expr(_f, 1)))
+    assert stable_hash(parse(expr(_f, 1))) != stable_hash(parse(expr(_f, 2)))
+    assert stable_hash(parse(expr(_f, 1))) != stable_hash(parse(expr(_g, 1)))
+
+
+def test_stable_hash_scalars():
+    def key(value):
+        return stable_hash(parse(thunk(_f, value)))
+
+    values = [
+        None,
+        False,
+        True,
+        0,
+        1,
+        0.0,
+        -0.0,
+        1.0,
+        float('nan'),
+        1j,
+        '1',
+        b'1',
+        (1,),
+        [1],
+    ]
+    assert len({key(value) for value in values}) == len(values)
+
+    big = 10 ** 30
+    assert key(big) == key(int(str(big)))
+    assert key(float('nan')) == key(float('nan'))
+    assert key('a' * 100) == key(''.join(['a'] * 100))
+
+
+_calls = []
+
+
+def _record(a):
+    _calls.append(a)
+    return a * 2
+
+
+def test_cached(cache):
+    del _calls[:]
+
+    def expr():
+        return cache.cached(thunk(_record, thunk.fromexpr(2) + 1)) + 1
+
+    assert strict(expr()) == 7
+    assert _calls == [3]
+
+    # A new cache over the same directory simulates a different process.
+    cache = DiskCache(cache.path)
+    assert strict(expr()) == 7
+    assert _calls == [3]
+
+
+def test_cached_miss_on_different_leaves(cache):
+    del _calls[:]
+
+    assert strict(cache.cached(thunk(_record, 1))) == 2
+    assert strict(cache.cached(thunk(_record, 2))) == 4
+    assert _calls == [1, 2]
+
+
+class _Scale:
+    def __init__(self, factor):
+        self.factor = factor
+
+    def scale(self, a):
+        return a * self.factor
+
+
+def _adder(n):
+    def add(a):
+        return a + n
+
+    return add
+
+
+def _local_class():
+    class C:
+        pass
+
+    return C
+
+
+def test_stable_hash_captured_state():
+    def key(f):
+        return stable_hash(parse(thunk(f, 1)))
+
+    # closures over different values
+    assert key(_adder(1)) == key(_adder(1))
+    assert key(_adder(1)) != key(_adder(2))
+
+    # different lambdas on one line
+    fs = lambda a: a + 1, lambda a: a * 2  # noqa
+    assert key(fs[0]) != key(fs[1])
+
+    # defaults bind state like a closure
+    gs = [lambda a, n=n: a + n for n in range(2)]
+    assert key(gs[0]) != key(gs[1])
+
+    # methods bound to different objects
+    assert key(_Scale(2).scale) == key(_Scale(2).scale)
+    assert key(_Scale(2).scale) != key(_Scale(3).scale)
+
+    # a local function which refers to itself
+    def fact(n):
+        return 1 if n <= 1 else n * fact(n - 1)
+
+    assert key(fact) == key(fact)
+
+    with pytest.raises(TypeError):
+        key(_local_class())
+
+
+def test_cached_closures(cache):
+    assert strict(cache.cached(thunk(_adder(1), 1))) == 2
+    assert strict(cache.cached(thunk(_adder(2), 1))) == 3
+    assert strict(cache.cached(thunk(_Scale(2).scale, 5))) == 10
+    assert strict(cache.cached(thunk(_Scale(3).scale, 5))) == 15
+
+
+def test_eviction(tmpdir):
+    cache = DiskCache(str(tmpdir))
+    cache['a'] = b'a' * 1024
+    entry_size = cache.size
+
+    cache.max_size = entry_size * 2
+    os.utime(os.path.join(cache.path, 'a.pickle'), (0, 0))
+    cache['b'] = b'b' * 1024
+    cache['c'] = b'c' * 1024
+
+    assert 'a' not in cache
+    assert cache['b'] == b'b' * 1024
+    assert cache['c'] == b'c' * 1024
+    assert cache.size <= cache.max_size
+
+    cache.clear()
+    assert cache.size == 0
+    with pytest.raises(KeyError):
+        cache['b']
@@ -0,0 +1,120 @@
+import ctypes
+from ctypes import POINTER, PYFUNCTYPE, c_int, c_ssize_t, c_void_p, py_object
+import operator as op
+
+import pytest
+
+from lazy import _thunk, get_children, strict, thunk
+
+
+class LzExported(ctypes.Structure):
+    """The layout of ``LzExported`` in ``lazy/include/lazy.h``.
+    """
+    _fields_ = [
+        ('LzThunk_New', PYFUNCTYPE(
+            py_object,
+            py_object,
+            py_object,
+            py_object,
+        )),
+        ('LzThunk_FromExpr', PYFUNCTYPE(py_object, py_object)),
+        ('LzThunk_GetChildren', PYFUNCTYPE(py_object, py_object)),
+        ('LzThunk_Type', c_void_p),
+        ('LzThunk_Strict', PYFUNCTYPE(py_object, py_object)),
+        ('LzThunk_IsNormal', PYFUNCTYPE(c_int, py_object)),
+        ('LzThunk_NewVector', PYFUNCTYPE(
+            py_object,
+            py_object,
+            POINTER(py_object),
+            c_ssize_t,
+        )),
+        ('LzThunk_CallVector', PYFUNCTYPE(
+            py_object,
+            py_object,
+            POINTER(py_object),
+            c_ssize_t,
+            py_object,
+        )),
+    ]
+
+
+@pytest.fixture(scope='module')
+def api():
+    get_pointer = ctypes.pythonapi.PyCapsule_GetPointer
+    get_pointer.restype = c_void_p
+    get_pointer.argtypes = [py_object, ctypes.c_char_p]
+    address = get_pointer(
+        _thunk._exported_symbols,
+        b'lazy._thunk._exported_symbols',
+    )
+    return LzExported.from_address(address)
+
+
+def _array(*obs):
+    return (py_object * len(obs))(*obs)
+
+
+def _arg(ob):
+    # ctypes would force a thunk while checking the type of the argument
+    return py_object(ob)
+
+
+def test_version():
+    assert _thunk._exported_symbols_version == 2
+
+
+def test_type(api):
+    assert api.LzThunk_Type == id(thunk)
+
+
+def test_strict(api):
+    th = thunk(op.add, 1, 2)
+    assert api.LzThunk_Strict(_arg(th)) == 3
+    assert api.LzThunk_Strict(4) == 4
+
+    def raiser():
+        raise ValueError('ayy')
+
+    with pytest.raises(ValueError):
+        api.LzThunk_Strict(_arg(thunk(raiser)))
+
+
+def test_is_normal(api):
+    th = thunk(op.add, 1, 2)
+    assert not api.LzThunk_IsNormal(_arg(th))
+    strict(th)
+    assert api.LzThunk_IsNormal(_arg(th))
+
+    assert api.LzThunk_IsNormal(_arg(thunk.fromexpr(1)))
+    assert api.LzThunk_IsNormal(1)
+
+
+def test_new_vector(api):
+    th = api.LzThunk_NewVector(op.add, _array(1, 2), 2)
+    assert isinstance(th, thunk)
+    assert get_children(th) == (op.add, (1, 2), {})
+    assert strict(th) == 3
+
+    th = api.LzThunk_NewVector(op.add, _array(), 0)
+    assert get_children(th) == (op.add, (), {})
+
+    class S(strict):
+        def __init__(self, a):
+            self.a = a
+
+    # strict types are constructed immediately
+    s = api.LzThunk_NewVector(S, _array(1), 1)
+    assert not isinstance(s, thunk)
+    assert s.a == 1
+
+
+def test_call_vector(api):
+    def f(a, b, *, c):
+        return a + b + c
+
+    th = api.LzThunk_CallVector(f, _array(1, 2, 3), 2, ('c',))
+    assert get_children(th) == (f, (1, 2), {'c': 3})
+    assert strict(th) == 6
+
+    th = api.LzThunk_CallVector(op.add, _array(1, 2), 2, ())
+    assert get_children(th) == (op.add, (1, 2), {})
@@ -0,0 +1,72 @@
+from lazy import Cell, thunk, strict
+
+
+def test_cell():
+    cell = Cell(1)
+    assert strict(cell) == 1
+
+    cell.set(thunk.fromexpr(2) + 1)
+    assert strict(cell) == 3
+
+    expr = cell + 1
+    assert type(expr) is thunk
+    assert strict(expr) == 4
+
+
+def test_cell_recomputes_dependents():
+    calls = []
+
+    def f(a, b):
+        calls.append((a, b))
+        return a + b
+
+    a = Cell(1)
+    b = Cell(10)
+    left = thunk(f, a, 2)
+    right = thunk(f, b, 3)
+    expr = thunk(f, left, right)
+
+    assert strict(expr) == 16
+    assert calls == [(1, 2), (10, 3), (3, 13)]
+
+    del calls[:]
+    a.set(5)
+    assert strict(expr) == 20
+    # ``right`` does not depend on ``a``
+    assert calls == [(5, 2), (7, 13)]
+
+    del calls[:]
+    assert strict(expr) == 20
+    assert calls == []
+
+
+def test_cell_equal_value_cutoff():
+    calls = []
+
+    def parity(a):
+        return a % 2
+
+    def f(a):
+        calls.append(a)
+        return a
+
+    cell = Cell(1)
+    expr = thunk(f, thunk(parity, cell))
+    assert strict(expr) == 1
+
+    cell.set(3)
+    assert strict(expr) == 1
+    assert calls == [1]
+
+    cell.set(4)
+    assert strict(expr) == 0
+    assert calls == [1, 0]
+
+
+def test_cell_kwargs():
+    cell = Cell(1)
+    expr = thunk(lambda a, b: a - b, 10, b=cell)
+    assert strict(expr) == 9
+
+    cell.set(2)
+    assert strict(expr) == 8
@@ -0,0 +1,106 @@
+import threading
+import time
+
+import pytest
+
+from lazy import Cancelled, Deadline, strict, thunk
+from lazy.utils import is_pending
+
+
+def _graph(n, delay=0.01):
+    def slow(x):
+        time.sleep(delay)
+        return x
+
+    nodes = [thunk(slow, i) for i in range(n)]
+    return nodes, thunk(sum, nodes)
+
+
+def test_no_deadline():
+    deadline = Deadline()
+    assert deadline.remaining is None
+    assert not deadline.expired
+    with deadline:
+        assert strict(thunk.fromexpr(1) + 1) == 2
+
+
+def test_timeout_keeps_partial_work():
+    nodes, expr = _graph(50)
+    with pytest.raises(TimeoutError):
+        strict(expr, deadline=0.05)
+
+    done = [node for node in nodes if not is_pending(node)]
+    assert 0 < len(done) < len(nodes)
+    assert is_pending(expr)
+
+    # the retry only evaluates the rest
+    assert strict(expr) == sum(range(50))
+    assert not any(map(is_pending, nodes))
+
+
+def test_context_manager():
+    _, expr = _graph(50)
+    with pytest.raises(TimeoutError), Deadline(0.05) as deadline:
+        strict(expr)
+    assert deadline.expired
+    assert deadline.remaining == 0
+
+
+def test_expired_before_start():
+    th = thunk.fromexpr(1) + 1
+    with pytest.raises(TimeoutError):
+        strict(th, deadline=0)
+    assert is_pending(th)
+    assert strict(th) == 2
+
+
+def test_cancel():
+    nodes, expr = _graph(50)
+    deadline = Deadline()
+    timer = threading.Timer(0.05, deadline.cancel)
+    timer.start()
+    try:
+        with pytest.raises(Cancelled):
+            strict(expr, deadline=deadline)
+    finally:
+        timer.join()
+
+    assert deadline.cancelled
+    assert deadline.expired
+    assert any(not is_pending(node) for node in nodes)
+
+
+def test_nested():
+    outer = Deadline()
+    outer.cancel()
+    with outer:
+        with Deadline(10):
+            with pytest.raises(Cancelled):
+                strict(thunk.fromexpr(1) + 1)
+
+    # the deadlines are removed on exit
+    assert strict(thunk.fromexpr(1) + 1) == 2
+
+
+def test_only_applies_to_own_thread():
+    deadline = Deadline()
+    deadline.cancel()
+    result = []
+
+    def target():
+        result.append(strict(thunk.fromexpr(1) + 1))
+
+    with deadline:
+        thread = threading.Thread(target=target)
+        thread.start()
+        thread.join()
+
+    assert result == [2]
+
+
+def test_enter_twice():
+    deadline = Deadline()
+    with deadline:
+        with pytest.raises(RuntimeError):
+            with deadline:
+                pass
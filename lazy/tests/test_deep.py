@@ -0,0 +1,192 @@
+import sys
+import threading
+
+import pytest
+
+from lazy import deepstrict, strict, thunk
+from lazy.data import Cons, L, nil
+from lazy.profile import Profile
+from lazy.utils import is_pending
+
+
+def test_nested_containers():
+    one = thunk.fromexpr(0) + 1
+    expr = [one, (one + 1, {'a': one + 2}), {one + 3}, frozenset({one + 4})]
+
+    result = deepstrict(expr)
+    assert result == [1, (2, {'a': 3}), {4}, frozenset({5})]
+    assert type(result[1]) is tuple
+    assert type(result[1][1]) is dict
+    assert type(result[2]) is set
+    assert type(result[3]) is frozenset
+
+    # the input is not changed
+    assert expr[0] is one
+    assert not is_pending(one)
+
+
+def test_thunk_of_container():
+    expr = thunk(list, (thunk.fromexpr(1) + 1, 3))
+    assert deepstrict(expr) == [thunk.fromexpr(1) + 1, 3]
+    assert type(deepstrict(expr)[0]) is int
+
+
+def test_dict_keys():
+    key = thunk.fromexpr(1) + 1
+    result = deepstrict({(key, 'b'): key})
+    assert result == {(2, 'b'): 2}
+    assert all(type(k[0]) is int for k in result)
+
+
+def test_forces_once():
+    calls = []
+
+    def f():
+        calls.append(True)
+        return 1
+
+    shared = thunk(f)
+    deepstrict([shared, (shared, [shared])])
+    assert len(calls) == 1
+
+
+def test_sharing():
+    inner = [thunk.fromexpr(1) + 1]
+    shared = thunk.fromexpr(inner)
+    result = deepstrict((inner, inner, shared, {'a': inner}))
+    assert result[0] is result[1] is result[2] is result[3]['a']
+    assert result[0] is not inner
+
+
+def test_linked_list():
+    expr = [L[1, thunk.fromexpr(1) + 1, 3], nil]
+    assert deepstrict(expr) == [(1, 2, 3), ()]
+    assert deepstrict(Cons(1, Cons(2, nil))) == (1, 2)
+
+
+def test_recursive_mutable():
+    ls = [thunk.fromexpr(1) + 1]
+    ls.append(ls)
+    d = {'a': thunk.fromexpr(2)}
+    d['d'] = d
+
+    result = deepstrict((ls, d))
+    assert result[0][0] == 2
+    assert result[0][1] is result[0]
+    assert result[1]['a'] == 2
+    assert result[1]['d'] is result[1]
+
+
+def test_recursive_tuple():
+    ls = []
+    t = (ls,)
+    ls.append(t)
+    with pytest.raises(ValueError):
+        deepstrict(t)
+
+
+def test_deep_nesting():
+    expr = thunk.fromexpr(0)
+    for _ in range(100000):
+        expr = [expr]
+
+    result = deepstrict(expr)
+    for _ in range(100000):
+        result, = result
+    assert result == 0 and type(result) is int
+
+
+def test_other_objects():
+    class Sub(list):
+        pass
+
+    sub = Sub([thunk.fromexpr(1)])
+    assert deepstrict(sub) is sub
+    assert deepstrict('abc') == 'abc'
+
+
+def _cells(n, i=0):
+    if i == n:
+        return nil
+    # each tail is a pending thunk
+    return Cons(thunk.fromexpr(i) + 1, lambda: thunk(_cells, n, i + 1))
+
+
+def test_long_linked_list():
+    # longer than the recursion limit
+    n = 10000
+    expr = thunk(_cells, n)
+    assert deepstrict(expr) == tuple(range(1, n + 1))
+    assert not is_pending(expr)
+    assert strict(expr) == tuple(range(1, n + 1))
+
+    ls = L[0, ..., n - 1]
+    assert deepstrict(thunk(lambda: ls)) == tuple(range(n))
+
+
+def test_claims_thunks():
+    calls = []
+    started = threading.Event()
+    resume = threading.Event()
+    results = []
+
+    def f():
+        calls.append(True)
+        started.set()
+        resume.wait()
+        return L[1, 2]
+
+    th = thunk(f)
+
+    def force():
+        started.wait()
+        resume.set()
+        # waits for ``deepstrict`` instead of calling ``f`` again
+        results.append(strict(th))
+
+    thread = threading.Thread(target=force)
+    thread.start()
+    assert deepstrict(th) == (1, 2)
+    thread.join()
+    assert results == [(1, 2)]
+    assert calls == [True]
+
+
+def test_failure_releases_thunks():
+    def fail():
+        raise ValueError('failed')
+
+    th = thunk(lambda a: L[1, a], thunk(lambda: 2))
+    tail = thunk(lambda: L[thunk(fail)])
+    expr = (th, Cons(1, lambda: tail))
+    with pytest.raises(ValueError):
+        deepstrict(expr)
+    assert is_pending(tail)
+    assert deepstrict(th) == (1, 2)
+
+
+def test_recursive_thunks():
+    ls = []
+    th = thunk(lambda: ls)
+    ls.append(th)
+    result = deepstrict(th)
+    assert result[0] is result
+
+    a = thunk(lambda: b)
+    b = thunk(lambda: a)
+    with pytest.raises(RecursionError):
+        deepstrict(a)
+    assert is_pending(a) and is_pending(b)
+
+
+def test_profiled():
+    with Profile() as profile:
+        line = sys._getframe().f_lineno + 1
+        expr = [thunk(sum, (1, 2)), thunk(lambda: L[1, 2])]
+        assert deepstrict(expr) == [3, (1, 2)]
+
+    stat, = (
+        stat for stat in profile.stats()
+        if stat.filename == __file__ and stat.lineno == line
+    )
+    assert stat.count == 2
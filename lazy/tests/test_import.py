@@ -0,0 +1,103 @@
+import subprocess
+import sys
+
+import pytest
+
+import lazy
+
+
+def _modules_loaded_by(code):
+    """The modules in ``sys.modules`` after running ``code`` in a new
+    interpreter.
+    """
+    return set(subprocess.check_output(
+        [
+            sys.executable,
+            '-c',
+            code + '\nimport sys\nprint("\\n".join(sys.modules))',
+        ],
+        universal_newlines=True,
+    ).split())
+
+
+_deferred_modules = {
+    'asyncio',
+    'codetransformer',
+    'lazy.aio',
+    'lazy.array',
+    'lazy.bytecode',
+    'lazy.data',
+    'lazy.deep',
+    'lazy.runtime',
+    'lazy.serialize',
+    'lazy.source',
+    'lazy.tree',
+    'numpy',
+}
+
+
+def test_import_is_minimal():
+    loaded = _modules_loaded_by('import lazy')
+    assert 'lazy._thunk' in loaded
+    assert not loaded & _deferred_modules
+
+
+def test_import_operator():
+    loaded = _modules_loaded_by('import lazy.operator')
+    assert not loaded & _deferred_modules
+
+    import lazy.operator as op
+    assert op is lazy.operator
+
+
+@pytest.mark.parametrize('name,module', (
+    ('lazy_function', 'lazy.source'),
+    ('run_lazy', 'lazy.runtime'),
+    ('parse', 'lazy.tree'),
+    ('data', 'lazy.data'),
+    ('deepstrict', 'lazy.deep'),
+))
+def test_deferred_attribute(name, module):
+    if module == 'lazy.source' and sys.version_info < (3, 8):
+        module = 'lazy.bytecode'
+
+    loaded = _modules_loaded_by('import lazy; lazy.%s' % name)
+    assert module in loaded
+    assert name in dir(lazy)
+    assert getattr(lazy, name) is not None
+
+
+def test_missing_attribute():
+    with pytest.raises(AttributeError):
+        lazy.not_an_attribute
+
+
+def test_star_import_without_numpy():
+    # ``None`` in ``sys.modules`` makes the import fail like numpy is not
+    # installed
+    loaded = _modules_loaded_by(
+        "import sys\n"
+        "sys.modules['numpy'] = None\n"
+        "import lazy\n"
+        "assert 'vectorize' not in lazy.__all__\n"
+        "from lazy import *\n"
+    )
+    assert 'lazy' in loaded
+
+
+def test_vectorize_import_errors():
+    loaded = _modules_loaded_by(
+        "import sys\n"
+        "sys.modules['numpy'] = None\n"
+        "import lazy\n"
+        "assert not hasattr(lazy, 'vectorize')\n"
+        "del sys.modules['numpy']\n"
+        "sys.modules['lazy.array'] = None\n"
+        "try:\n"
+        "    lazy.vectorize\n"
+        "except AttributeError:\n"
+        "    raise AssertionError('hid the import error')\n"
+        "except ImportError:\n"
+        "    pass\n"
+    )
+    assert 'lazy' in loaded
@@ -1,8 +1,17 @@
+import linecache
 import sys
 
 import pytest
 
-from lazy import thunk, strict, lazy_function
+from lazy import (
+    get_children,
+    lazy_function,
+    run_lazy,
+    specialize,
+    strict,
+    thunk,
+)
+from lazy.data import L
 
 
 @strict
@@ -23,6 +32,69 @@ def test_not_decorator():
     assert isinstance(g(1, 2), thunk)
 
 
+def test_closure():
+    def outer(k):
+        @lazy_function
+        def g(a, *args, **kwargs):
+            a += k
+            return a, args, kwargs
+
+        return g
+
+    result = outer(10)(1, 2, b=3)
+    assert isinstance(result, thunk)
+    assert strict(result) == (11, (2,), {'b': 3})
+
+
+def test_method():
+    class C:
+        __private = 2
+
+        @lazy_function
+        def m(self, a):
+            return self.__private * a
+
+    assert strict(strict(C.m)(C(), 3)) == 6
+
+
+@lazy_function
+def _fact(n):
+    if n <= 1:
+        return 1
+    return n * _fact(n - 1)
+
+
+def test_recursive():
+    assert strict(_fact(5)) == 120
+
+
+class _Self:
+    @lazy_function
+    def cls(self):
+        return _Self
+
+
+def test_method_uses_own_class():
+    assert strict(strict(_Self.cls)(_Self())) is _Self
+
+
+def test_lambdas_on_one_line():
+    fs = lazy_function(lambda a: a + 1), lazy_function(lambda a: a * 2)
+    assert strict(fs[0](3)) == 4
+    assert strict(fs[1](3)) == 6
+
+
+def test_run_lazy():
+    result = run_lazy('1 + 2', mode='eval')
+    assert isinstance(result, thunk)
+    assert strict(result) == 3
+
+    ns = {}
+    run_lazy('a = 1\nb = a + 2\n', globals_=ns, locals_=ns)
+    assert isinstance(ns['b'], thunk)
+    assert strict(ns['b']) == 3
+
+
 def test_lazy_call():
     called = False
 
@@ -156,11 +228,73 @@ def test_list_comprehension():
     def f():
         return [c for c in 'ab']
 
-    assert isinstance(f(), thunk)
-    assert f() == ['a', 'b']
+    assert isinstance(f(), L)
+    assert f() == ('a', 'b')
     assert isinstance(f()[0], thunk)
 
 
+def test_list_comprehension_streams():
+    calls = []
+
+    def g(n):
+        calls.append(n)
+        return n
+
+    @lazy_function
+    def f():
+        return [g(n) for n in range(1000000) if n % 2][:3]
+
+    assert strict(f()) == (1, 3, 5)
+    assert calls == [1, 3, 5]
+
+
+def test_long_list_comprehension():
+    @lazy_function
+    def f(n):
+        xs = [x * 2 for x in range(n)]
+        return xs, sum(xs), len(xs), xs[n - 1]
+
+    # longer than the recursion limit
+    n = 5000
+    xs, total, length, last = strict(f(n))
+    assert xs == tuple(range(0, 2 * n, 2))
+    assert total == n * (n - 1)
+    assert length == n
+    assert last == 2 * (n - 1)
+
+
+def test_generator_expression():
+    @strict
+    @lazy_function
+    def f():
+        return (c * 2 for c in 'ab')
+
+    assert isinstance(f(), L)
+    assert f() == ('aa', 'bb')
+
+
+def test_container_elements_stay_lazy():
+    calls = []
+
+    def g(n):
+        calls.append(n)
+        return n
+
+    @lazy_function
+    def f():
+        return (
+            {'a': g(1), 'b': g(2)},
+            [g(3), g(4)],
+            (g(5), g(6)),
+        )
+
+    d, l, t = strict(f())
+    assert strict(d['b']) == 2
+    assert strict(l[0]) == 3
+    assert strict(t[1]) == 6
+    assert calls == [2, 3, 6]
+
+
 def test_import_name():
     sys.modules.pop('__hello__', None)
 
@@ -190,3 +324,241 @@ def test_import_from():
     assert '__hello__' not in sys.modules
     assert initialized_thunk
     assert '__hello__' in sys.modules
+
+
+def test_memoize():
+    calls = []
+
+    def record(a):
+        calls.append(a)
+        return a
+
+    @lazy_function(memoize=8)
+    def f(a):
+        return record(a) + 1
+
+    assert isinstance(f(1), thunk)
+    assert not calls
+
+    assert strict(f(1)) == 2
+    assert strict(f(thunk.fromexpr(1))) == 2
+    assert calls == [1]
+
+    info = strict(f.cache_info())
+    assert info.hits == 1
+    assert info.misses == 1
+
+    strict(f.cache_clear())
+    assert strict(f(1)) == 2
+    assert calls == [1, 1]
+
+
+def test_memoize_eviction():
+    calls = []
+
+    def record(a):
+        calls.append(a)
+        return a
+
+    @lazy_function(memoize=1)
+    def f(a):
+        return record(a)
+
+    strict(f(1))
+    strict(f(2))
+    strict(f(1))
+    assert calls == [1, 2, 1]
+
+
+def test_memoize_unhashable():
+    @lazy_function(memoize=8)
+    def f(xs, key=None):
+        return len(xs)
+
+    assert strict(f([1, 2])) == 2
+    assert strict(f((1, 2), key={'a': 1})) == 2
+    assert strict(f.cache_info()).misses == 0
+
+    @lazy_function(memoize=8)
+    def g(a):
+        return 1
+
+    with pytest.raises(TypeError):
+        # errors from the function itself are not hidden
+        strict(g(1, 2))
+
+
+def test_memoize_recursive():
+    @lazy_function(memoize=None)
+    def slow_fib(n):
+        return n if n < 2 else slow_fib(n - 1) + slow_fib(n - 2)
+
+    @lazy_function(memoize=128)
+    def fib(n):
+        return n if n < 2 else fib(n - 1) + fib(n - 2)
+
+    assert strict(fib(100)) == 354224848179261915075
+    assert strict(fib(15)) == strict(slow_fib(15))
+    assert strict(fib.cache_info()).misses == 101
+
+
+_rebound = 1
+
+
+def test_global_load_reuses_box():
+    global _rebound
+
+    @strict
+    @lazy_function
+    def f():
+        return _rebound
+
+    assert f() is f()
+    assert strict(f()) == 1
+
+    _rebound = 2
+    assert strict(f()) == 2
+
+
+@lazy_function
+def _inlined(a, b):
+    return a * 2 + b
+
+
+@lazy_function
+def _not_inlined(a):
+    if a:
+        return a
+    return 0
+
+
+def test_inline():
+    from lazy import operator as op
+
+    @strict
+    @lazy_function(inline=True)
+    def f(a):
+        return _inlined(a, 1) + _not_inlined(a)
+
+    @strict
+    @lazy_function
+    def g(a):
+        return _inlined(a, 1)
+
+    expr = f(3)
+    func, (lhs, rhs), _ = get_children(expr)
+    assert func is op.add
+    # ``_inlined`` was built directly in ``f``
+    assert get_children(lhs)[0] is op.add
+    # ``_not_inlined`` has a branch so it is a deferred call
+    assert get_children(rhs)[0] is _not_inlined
+    assert strict(expr) == 10
+
+    assert get_children(g(3))[0] is _inlined
+
+
+def test_inline_guard():
+    global _inlined
+
+    @strict
+    @lazy_function(inline=True)
+    def f(a):
+        return _inlined(a, 1)
+
+    original = _inlined
+    try:
+        _inlined = lazy_function(lambda a, b: a - b)
+        expr = f(3)
+        assert get_children(expr)[0] is _inlined
+        assert strict(expr) == 2
+    finally:
+        _inlined = original
+
+
+def test_specialize():
+    from lazy import operator as op
+
+    @lazy_function
+    def f(xs, factor, offset=1):
+        return xs * (factor ** 2 + 1) + offset
+
+    g = specialize(f, factor=2)
+    assert strict(g(3)) == strict(f(3, 2)) == 16
+    assert strict(g(3, offset=2)) == 17
+
+    func, (lhs, offset), _ = get_children(strict(g)(3))
+    assert func is op.add
+    func, (xs, factor), _ = get_children(lhs)
+    assert func is op.mul
+    # ``factor ** 2 + 1`` was computed by ``specialize``
+    assert get_children(factor) == (5,)
+
+    # the known arguments are removed from the signature
+    with pytest.raises(TypeError):
+        strict(g(3, 2, 1))
+
+
+def test_specialize_assigned_argument():
+    @lazy_function
+    def f(a, b):
+        b = b + 1
+
+        def g():
+            return a + b
+
+        return g()
+
+    assert strict(specialize(f, a=1, b=2)()) == 4
+    assert strict(specialize(f, a=1)(2)) == 4
+
+
+def test_specialize_memoized():
+    @lazy_function(memoize=8)
+    def f(a, b):
+        return a * b
+
+    assert strict(specialize(specialize(f, a=2), b=3)()) == 6
+
+
+def test_specialize_errors():
+    @lazy_function
+    def f(a, *args):
+        return a
+
+    with pytest.raises(TypeError):
+        specialize(f, b=1)
+
+    with pytest.raises(TypeError):
+        specialize(f, args=())
+
+    with pytest.raises(TypeError):
+        specialize(lambda a: a, a=1)
+
+
+@pytest.mark.skipif(
+    sys.version_info < (3, 8),
+    reason='the bytecode backend does not read the source',
+)
+def test_no_source():
+    namespace = {}
+    exec('def f(a):\n    return a + 1\n', namespace)
+    with pytest.raises(TypeError, match='source'):
+        lazy_function(namespace['f'])
+
+
+@pytest.mark.skipif(
+    sys.version_info < (3, 8),
+    reason='the bytecode backend does not read the source',
+)
+def test_source_changed(tmpdir):
+    path = tmpdir.join('changed.py')
+    path.write('def f(a):\n    return a + 1\n')
+    namespace = {}
+    exec(compile(path.read(), str(path), 'exec'), namespace)
+    f = namespace['f']
+    assert strict(lazy_function(f)(1)) == 2
+
+    path.write('def f(a):\n    return a - 10\n')
+    linecache.checkcache(str(path))
+    with pytest.raises(TypeError, match='does not match'):
+        lazy_function(f)
@@ -0,0 +1,116 @@
+from io import StringIO
+import sys
+
+import pytest
+
+from lazy import lazy_function, strict, thunk
+from lazy.profile import Profile, creation_site
+
+
+def _line():
+    return sys._getframe(1).f_lineno
+
+
+def test_site_only_recorded_while_profiling():
+    a = thunk.fromexpr(1) + 1
+    assert creation_site(a) is None
+
+    with Profile():
+        line = _line() + 1
+        b = thunk.fromexpr(1) + 1
+    c = thunk.fromexpr(1) + 1
+
+    assert creation_site(b) == (
+        __file__,
+        line,
+        'test_site_only_recorded_while_profiling',
+    )
+    assert creation_site(c) is None
+    assert strict(b) == 2
+    assert creation_site(b) is not None
+
+
+def test_lazy_function_sites():
+    line = _line()
+
+    @lazy_function
+    def f(a):
+        b = a + 1
+        c = b * 2
+        return c
+
+    with Profile() as profile:
+        assert strict(f(1)) == 4
+
+    stats = {
+        (stat.lineno, stat.name): stat for stat in profile.stats()
+        if stat.filename == __file__
+    }
+    for lineno in line + 4, line + 5:
+        stat = stats[lineno, 'f']
+        assert stat.count == 1
+        assert 0 <= stat.self_time <= stat.total_time
+
+
+def test_self_and_total_time():
+    def inner():
+        return 1
+
+    def outer(a):
+        return a + 1
+
+    with Profile() as profile:
+        a = thunk(inner)
+        b = thunk(outer, a)
+        assert strict(b) == 2
+
+    stats = {stat.lineno: stat for stat in profile.stats()}
+    a_stat = stats[min(stats)]
+    b_stat = stats[max(stats)]
+    assert a_stat.count == b_stat.count == 1
+    # ``b`` forces ``a`` so its total time includes the time of ``a``
+    assert b_stat.total_time >= b_stat.self_time + a_stat.total_time * 0.99
+
+
+def test_failed_evaluation_not_recorded():
+    def fail():
+        raise ValueError()
+
+    with Profile() as profile:
+        with pytest.raises(ValueError):
+            strict(thunk(fail))
+
+    assert profile.stats() == []
+
+
+def test_print_stats():
+    with Profile() as profile:
+        strict(thunk.fromexpr(1) + 1)
+
+    out = StringIO()
+    profile.print_stats(file=out)
+    header, row = out.getvalue().splitlines()
+    assert header.split() == ['count', 'self', '(s)', 'total', '(s)', 'site']
+    assert row.split()[0] == '1'
+    assert row.endswith('(test_print_stats)')
+
+
+def test_format_tree():
+    def expr():
+        a = thunk.fromexpr(1) + 1
+        return a * a
+
+    with Profile() as profile:
+        assert strict(expr()) == 4
+
+    with Profile():
+        lines = profile.format_tree(expr()).splitlines()
+
+    assert len(lines) == 5
+    assert lines[0].startswith('mul  ')
+    assert 'self=' in lines[0]
+    assert lines[1].startswith('  add  ')
+    assert lines[2] == '    1'
+    assert lines[3] == '    1'
+    assert lines[4].startswith('  add  ')
+    assert lines[4].endswith('(shared)')
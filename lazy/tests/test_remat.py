@@ -0,0 +1,82 @@
+import gc
+from weakref import ref
+
+from lazy import strict
+from lazy.remat import RematPool, _nbytes
+
+
+def test_remat():
+    calls = []
+
+    def f(n):
+        calls.append(n)
+        return bytes(n)
+
+    pool = RematPool(budget=2500)
+    a = pool.thunk(f, 1000)
+    b = pool.thunk(f, 1001)
+    c = pool.thunk(f, 1002)
+
+    assert strict(a) == bytes(1000)
+    assert strict(b) == bytes(1001)
+    assert pool.evictions == 0
+
+    # touch ``a`` so that ``b`` is the least recently used
+    strict(a)
+    assert strict(c) == bytes(1002)
+    assert pool.evictions == 1
+    assert pool.bytes_held <= pool.budget
+    assert calls == [1000, 1001, 1002]
+
+    # ``a`` is still held, ``b`` is recomputed
+    assert strict(a + b) == bytes(1000) + bytes(1001)
+    assert calls == [1000, 1001, 1002, 1001]
+    assert pool.recomputations == 1
+
+
+def test_remat_min_size():
+    pool = RematPool(budget=0, min_size=100)
+    a = pool.thunk(lambda: 1)
+    assert strict(a) == 1
+    assert pool.bytes_held == 0
+    assert pool.evictions == 0
+
+
+def test_remat_arguments():
+    pool = RematPool(budget=0)
+    a = pool.thunk(lambda n: list(range(n)), 3)
+    b = pool.thunk(sum, a)
+
+    assert strict(b) == 3
+    assert strict(a) == [0, 1, 2]
+
+
+def test_remat_releases_dead_nodes():
+    pool = RematPool(budget=10 ** 6)
+    a = pool.thunk(bytes, 100)
+    strict(a)
+    assert pool.bytes_held > 0
+
+    del a
+    gc.collect()
+    assert pool.bytes_held == 0
+
+
+class _Dead:
+    pass
+
+
+def test_remat_evicts_dead_nodes():
+    pool = RematPool(budget=150)
+    a = pool.thunk(bytes, 100)
+    strict(a)
+
+    # replace the entry for ``a`` with a weakref which is dead but whose
+    # callback has not run, like a node which is collected in a cycle
+    (key, (_, nbytes)), = pool._nodes.items()
+    pool._nodes[key] = ref(_Dead()), nbytes
+
+    b = pool.thunk(bytes, 100)
+    strict(b)
+    assert pool.evictions == 0
+    assert pool.bytes_held == _nbytes(strict(b))
@@ -0,0 +1,82 @@
+import sys
+
+from lazy import thunk, strict
+from lazy.profile import Profile
+from lazy.schedule import schedule, strict_scheduled
+
+
+def positions(order):
+    # ``list.index`` would compare the thunks lazily
+    return {id(th): n for n, th in enumerate(order)}
+
+
+def test_schedule_order():
+    def f(*args):
+        return sum(args)
+
+    small = thunk(f, 1)
+    large = thunk(f, thunk(f, thunk(f, 1), thunk(f, 2)), thunk(f, 3))
+    expr = thunk(f, small, large)
+
+    order = schedule(expr)
+    assert order[-1] is expr
+    assert len(order) == 7
+    # the child that needs more memory is evaluated first
+    position = positions(order)
+    assert position[id(large)] < position[id(small)]
+
+
+def test_schedule_weight():
+    def f(*args):
+        return sum(args)
+
+    a = thunk(f, 1)
+    b = thunk(f, 2)
+    expr = thunk(f, a, thunk(f, b))
+
+    weights = {id(a): 10, id(b): 1}
+    position = positions(
+        schedule(expr, weight=lambda th: weights.get(id(th), 1)),
+    )
+    assert position[id(b)] < position[id(a)]
+
+
+def test_strict_scheduled():
+    calls = []
+
+    def f(*args):
+        calls.append(args)
+        return sum(args)
+
+    shared = thunk(f, 1, 2)
+    expr = thunk(f, shared, thunk(f, shared, 3)) + 1
+
+    assert strict_scheduled(expr) == 10
+    assert calls.count((1, 2)) == 1
+    assert strict(expr) == 10
+
+
+def test_strict_scheduled_deep():
+    expr = thunk.fromexpr(0)
+    for _ in range(10000):
+        expr = expr + 1
+
+    assert strict_scheduled(expr) == 10000
+
+
+def test_strict_scheduled_normal():
+    assert strict_scheduled(1) == 1
+    assert strict_scheduled(thunk.fromexpr(1)) == 1
+
+
+def test_strict_scheduled_profiled():
+    with Profile() as profile:
+        line = sys._getframe().f_lineno + 1
+        expr = thunk(sum, (1, 2)) * 2
+        assert strict_scheduled(expr) == 6
+
+    stat, = (
+        stat for stat in profile.stats()
+        if stat.filename == __file__ and stat.lineno == line
+    )
+    assert stat.count == 2
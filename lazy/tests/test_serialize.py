@@ -0,0 +1,195 @@
+import operator as op
+import pickle
+import sys
+
+import pytest
+
+from lazy import (
+    Cell,
+    dumps,
+    get_children,
+    lazy_function,
+    loads,
+    operator,
+    strict,
+    thunk,
+)
+from lazy.utils import is_pending
+
+
+def test_roundtrip():
+    expr = thunk(pow, thunk.fromexpr(2) + 1, exp=3)
+    result = loads(dumps(expr))
+
+    assert is_pending(result)
+    func, args, kwargs = get_children(result)
+    assert func is pow
+    assert list(kwargs) == ['exp']
+    assert strict(result) == strict(expr) == 27
+
+
+_called = []
+
+
+def _record_call():
+    _called.append(True)
+    return 1
+
+
+def test_does_not_force():
+    del _called[:]
+    expr = thunk(_record_call) + 1
+    loads(dumps(expr))
+    assert not _called
+    assert is_pending(expr)
+
+
+def test_sharing():
+    a = thunk.fromexpr(1) + 1
+    b = a * a
+    c = b + a
+
+    data = dumps(c)
+    result = loads(data)
+    _, (result_b, result_a), _ = get_children(result)
+    _, (left, right), _ = get_children(result_b)
+    assert left is right is result_a
+
+    # the shared subexpression is only written once
+    assert len(data) < len(dumps(b + (thunk.fromexpr(1) + 1)))
+
+
+def test_operator_by_name():
+    data = dumps(thunk.fromexpr(1) + 2)
+    func, _, _ = get_children(loads(data))
+    assert func is operator.add
+    assert pickle.dumps(operator.add) not in data
+    assert b'add' in data
+
+
+def test_normal_and_plain_values():
+    normal = thunk.fromexpr([1, 2])
+    expr = thunk(op.add, normal, [3])
+    result = loads(dumps(expr))
+
+    _, (a, b), _ = get_children(result)
+    assert isinstance(a, thunk)
+    assert get_children(a) == ([1, 2],)
+    assert type(b) is list
+    assert strict(result) == [1, 2, 3]
+
+    assert loads(dumps(1)) == 1
+    assert strict(loads(dumps(normal))) == [1, 2]
+
+
+def test_deep():
+    expr = thunk.fromexpr(0)
+    for _ in range(10000):
+        expr = expr + 1
+
+    result = loads(dumps(expr))
+    depth = 0
+    while len(get_children(result)) == 3:
+        _, (result, _), _ = get_children(result)
+        depth += 1
+    assert depth == 10000
+
+
+def test_out_of_band_buffers():
+    np = pytest.importorskip('numpy')
+
+    array = np.arange(100000)
+    buffers = []
+    data = dumps(thunk.fromexpr(array) + 1, buffer_callback=buffers.append)
+    assert len(buffers) == 1
+    assert len(data) < array.nbytes
+
+    result = loads(data, buffers=buffers)
+    np.testing.assert_array_equal(strict(result), array + 1)
+
+
+def test_invalid_data():
+    with pytest.raises(ValueError):
+        loads(b'not a lazy expression')
+
+    data = bytearray(dumps(1))
+    data[3] += 1
+    with pytest.raises(ValueError):
+        loads(data)
+
+
+def test_containers_of_thunks():
+    del _called[:]
+    a = thunk(_record_call)
+    b = a + 1
+    expr = thunk(op.add, (a, [b, 2]), ({'k': b, 'n': 3},))
+    result = loads(dumps(expr))
+
+    assert not _called
+    _, ((ra, (rb, two)), (mapping,)), _ = get_children(result)
+    assert is_pending(ra) and is_pending(rb)
+    assert type(mapping) is dict
+    assert mapping['k'] is rb
+    assert two == 2 and mapping['n'] == 3
+    assert get_children(rb)[1][0] is ra
+
+    assert strict(ra) == 1 and strict(rb) == 2
+
+
+def test_dict_keys():
+    key = thunk.fromexpr(1) + 1
+    # hashing the key evaluates it
+    mapping = {key: thunk.fromexpr(2) + 1}
+    result = loads(dumps(thunk(dict, mapping)))
+    assert strict(result) == {2: 3}
+
+    cell = Cell(1)
+    with pytest.raises(ValueError):
+        dumps(thunk(dict, {(cell + 1, 'a'): thunk.fromexpr(2) + 1}))
+
+
+def test_recursive_containers():
+    plain = [1]
+    plain.append(plain)
+    result = strict(loads(dumps(thunk(len, plain))))
+    assert result == 2
+
+    holds = [thunk.fromexpr(1) + 1]
+    holds.append(holds)
+    with pytest.raises(ValueError):
+        dumps(thunk(len, holds))
+
+
+@lazy_function
+def _lazy_double(a):
+    return a * 2
+
+
+@lazy_function
+def _lazy_expr(a):
+    return _lazy_double(a) + 1
+
+
+@pytest.mark.skipif(
+    sys.version_info < (3, 8),
+    reason='lazy functions are written by name on Python 3.8 and newer',
+)
+def test_lazy_function_graph():
+    expr = _lazy_expr(thunk.fromexpr(3))
+    assert strict(loads(dumps(expr))) == strict(expr) == 7
+    assert strict(loads(dumps(_lazy_double))) is strict(_lazy_double)
+
+
+class _Subclass(thunk):
+    pass
+
+
+def test_thunk_subclass():
+    expr = _Subclass(op.add, _Subclass.fromexpr(1), thunk.fromexpr(2))
+    result = loads(dumps(expr))
+
+    assert type(result) is _Subclass
+    _, (a, b), _ = get_children(result)
+    assert type(a) is _Subclass
+    assert type(b) is thunk
+    assert strict(result) == 3
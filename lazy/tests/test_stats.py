@@ -0,0 +1,73 @@
+import operator as op
+
+import pytest
+
+from lazy import stats, strict, thunk
+from lazy.utils import is_pending
+
+
+@pytest.fixture(autouse=True)
+def reset_stats():
+    stats(reset=True)
+
+
+def test_keys():
+    assert set(stats()) == {
+        'allocated',
+        'deallocated_pending',
+        'forced',
+        'strict_dispatches',
+        'recursion_guard_hits',
+        'max_depth',
+    }
+
+
+def test_allocated_and_forced():
+    a = thunk.fromexpr(1)
+    b = a + 2
+    c = b * 3
+    assert strict(c) == 9
+
+    counters = stats()
+    assert counters['allocated'] == 3
+    assert counters['forced'] == 2
+    assert counters['max_depth'] == 2
+
+
+def test_deallocated_pending():
+    a = thunk.fromexpr(1) + 1
+    assert is_pending(a)
+    del a
+
+    b = thunk.fromexpr(1) + 1
+    strict(b)
+    del b
+
+    assert stats()['deallocated_pending'] == 1
+
+
+def test_strict_dispatches():
+    class C:
+        def __strict__(self):
+            return 1
+
+    assert strict(C()) == 1
+    assert strict(thunk(C)) == 1
+    assert stats()['strict_dispatches'] == 2
+
+
+def test_recursion_guard_hits():
+    def f():
+        # the result of ``th`` is ``th``
+        return th
+
+    th = thunk(f)
+    with pytest.raises(RecursionError):
+        strict(th)
+    assert stats()['recursion_guard_hits'] == 1
+
+
+def test_reset():
+    strict(thunk(op.add, 1, 2))
+    assert stats(reset=True)['forced'] == 1
+    assert stats() == dict.fromkeys(stats(), 0)
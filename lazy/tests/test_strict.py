@@ -1,4 +1,6 @@
-from lazy import strict, thunk
+import pytest
+
+from lazy import strict, strict_many, thunk
 
 
 def test_strict_prim():
@@ -17,3 +19,29 @@ def test_strict_method():
 
     assert strict(C()) is 5
     assert strict(C) is C
+
+
+def test_strict_many():
+    calls = []
+
+    def f(a):
+        calls.append(a)
+        return a
+
+    shared = thunk(f, 1)
+    exprs = [shared + 1, 2, thunk.fromexpr(3), shared * 2]
+    assert strict_many(iter(exprs)) == [2, 2, 3, 2]
+    assert calls == [1]
+
+
+def test_strict_many_return_exceptions():
+    e = ValueError('ayy')
+
+    def f():
+        raise e
+
+    exprs = [thunk(f), thunk.fromexpr(1) + 1]
+    with pytest.raises(ValueError):
+        strict_many(exprs)
+
+    assert strict_many(exprs, return_exceptions=True) == [e, 2]
@@ -0,0 +1,114 @@
+import threading
+import time
+
+import pytest
+
+from lazy import strict, thunk
+from lazy.utils import is_pending
+
+
+def _run_threads(target, count):
+    barrier = threading.Barrier(count)
+    results = [None] * count
+    errors = []
+
+    def run(n):
+        barrier.wait()
+        try:
+            results[n] = target()
+        except BaseException as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run, args=(n,)) for n in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    if errors:
+        raise errors[0]
+    return results
+
+
+def test_single_flight():
+    calls = []
+
+    def slow():
+        calls.append(threading.get_ident())
+        # sleeping releases the GIL so the other threads reach the thunk
+        # while it is being evaluated
+        time.sleep(0.05)
+        return object()
+
+    th = thunk(slow)
+    results = _run_threads(lambda: strict(th), 8)
+
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+
+
+def test_shared_subgraph():
+    calls = []
+
+    def leaf(n):
+        calls.append(n)
+        time.sleep(0.001)
+        return n
+
+    leaves = [thunk(leaf, n) for n in range(20)]
+    total = thunk(sum, leaves)
+    results = _run_threads(lambda: strict(total + 0), 8)
+
+    assert results == [sum(range(20))] * 8
+    assert sorted(calls) == list(range(20))
+
+
+def test_failure_retried_by_waiter():
+    calls = []
+
+    def flaky():
+        calls.append(None)
+        time.sleep(0.05)
+        if len(calls) == 1:
+            raise ValueError('first call fails')
+        return 'ok'
+
+    th = thunk(flaky)
+    outcomes = []
+
+    def target():
+        try:
+            outcomes.append(strict(th))
+        except ValueError:
+            outcomes.append('error')
+
+    _run_threads(target, 4)
+
+    assert len(calls) == 2
+    assert sorted(outcomes) == ['error', 'ok', 'ok', 'ok']
+    assert not is_pending(th)
+
+
+def test_recursion_is_per_thread():
+    started = threading.Event()
+
+    def slow():
+        started.set()
+        time.sleep(0.05)
+        return 1
+
+    th = thunk(slow)
+    thread = threading.Thread(target=strict, args=(th,))
+    thread.start()
+    started.wait()
+    # another thread is evaluating ``th``, this must wait instead of seeing
+    # the recursion guard
+    assert strict(th) == 1
+    thread.join()
+
+    def f():
+        return strict(recursive)
+
+    recursive = thunk(f)
+    with pytest.raises(RecursionError):
+        strict(recursive)
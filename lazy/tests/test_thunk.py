@@ -1,3 +1,4 @@
+import gc
 from itertools import starmap
 import math
 import operator
@@ -229,3 +230,97 @@ def test_subclass_next():
 
 def test_subclass_richcmp(s):
     assert isinstance(s > 0, Sub), 'thunk_richcmp did not return a Sub'
+
+
+def test_boxcache():
+    from lazy._thunk import boxcache
+
+    class sub(thunk):
+        pass
+
+    cache = boxcache(sub)
+    a = cache(len)
+    assert type(a) is sub
+    assert strict(a) is len
+    assert cache(len) is a
+
+    b = cache(abs)
+    assert b is not a
+    assert strict(b) is abs
+
+    th = thunk.fromexpr(1)
+    assert cache(th) is th
+
+    with pytest.raises(TypeError):
+        boxcache(int)
+
+
+def test_gc_untrack_atomic():
+    a = thunk.fromexpr(1)
+    assert not gc.is_tracked(a)
+    b = a + 1
+    assert not gc.is_tracked(b)
+    # ``b`` is pending, its normal form may be part of a cycle
+    assert gc.is_tracked(-b * b)
+    strict(b)
+    assert not gc.is_tracked(b * b)
+
+    assert gc.is_tracked(thunk.fromexpr([]))
+    assert gc.is_tracked(thunk.fromexpr(1) + [])
+    # an untracked dict may be given a reference to the thunk later
+    assert gc.is_tracked(thunk(operator.getitem, {}, 'a'))
+
+    class sub(thunk):
+        pass
+
+    assert gc.is_tracked(sub.fromexpr(1))
+
+
+def test_gc_tracking_after_strict():
+    # ``list`` is a static type so it cannot be part of a cycle
+    a = thunk(list, 'ab')
+    assert not gc.is_tracked(a)
+    strict(a)
+    assert gc.is_tracked(a)
+
+    b = thunk(lambda: 1)
+    assert gc.is_tracked(b)
+    strict(b)
+    assert not gc.is_tracked(b)
+
+
+class _Collectable:
+    pass
+
+
+def _alive():
+    return [ob for ob in gc.get_objects() if type(ob) is _Collectable]
+
+
+def _cycle_through_thunk():
+    c = _Collectable()
+    c.th = thunk(lambda: c)
+    strict(c.th)
+
+
+def test_gc_collects_cycle_through_thunk():
+    _cycle_through_thunk()
+    gc.collect()
+    assert not _alive()
+
+
+def _cycle_through_pending_child():
+    t = thunk(list, ())
+    p = thunk(tuple, t)
+    lst = strict(t)
+    lst.append(p)
+    lst.append(_Collectable())
+
+
+def test_gc_collects_cycle_through_pending_child():
+    # ``p`` must stay tracked while ``t`` is pending, otherwise the cycle
+    # ``lst -> p -> t -> lst`` is hidden from the collector once ``t`` is
+    # forced
+    _cycle_through_pending_child()
+    gc.collect()
+    assert not _alive()
@@ -16,19 +16,21 @@ exprs = tuple(map(
         lambda: _f(_f(1)),
     ),
 ))
+# pytest would read ``__name__`` off of the thunks to build the ids
+expr_ids = 'const', 'call', 'nested_call'
 
 
-@pytest.mark.parametrize('expr', exprs)
+@pytest.mark.parametrize('expr', exprs, ids=expr_ids)
 def test_compile_of_parse_identity(expr):
     assert strict(parse(expr()).lcompile()) == strict(expr())
 
 
-@pytest.mark.parametrize('expr', exprs)
+@pytest.mark.parametrize('expr', exprs, ids=expr_ids)
 def test_tree_eq(expr):
     assert parse(expr()) == parse(expr())
 
 
-@pytest.mark.parametrize('expr', exprs)
+@pytest.mark.parametrize('expr', exprs, ids=expr_ids)
 def test_tree_hash(expr):
     assert hash(parse(expr())) == hash(parse(expr()))
 
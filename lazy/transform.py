@@ -0,0 +1,439 @@
+from abc import ABCMeta, abstractmethod
+from functools import lru_cache, partial, wraps
+import inspect
+from inspect import CO_COROUTINE, CO_GENERATOR, unwrap
+import operator as op
+from operator import is_, is_not, not_
+from types import FunctionType
+from weakref import WeakKeyDictionary, WeakSet
+
+from lazy._thunk import get_children, strict, thunk
+from lazy.data.list_ import _from_iter
+
+
+# Added in Python 3.6.
+CO_ASYNC_GENERATOR = getattr(inspect, 'CO_ASYNC_GENERATOR', 0x200)
+
+
+# These are partials instead of functions so that creating the thunks does not
+# add a Python frame, the profiler charges them to the lazy function.
+_lazy_is = partial(thunk, is_)
+_lazy_is_not = partial(thunk, is_not)
+_lazy_not = partial(thunk, not_)
+
+
+def _memoize(fn, maxsize):
+    """Cache the results of a transformed function.
+
+    Parameters
+    ----------
+    fn : function
+        The transformed function.
+    maxsize : int
+        The maximum number of results to cache.
+
+    Returns
+    -------
+    memoized : function
+        A function which looks up the result of ``fn`` by the normal form
+        of its arguments.
+
+    Notes
+    -----
+    The cached value is the thunk returned by ``fn`` so all of the calls
+    with equal arguments share a single evaluation. Calls with arguments
+    that cannot be hashed, like lists or dicts, are not cached.
+    """
+    cached = lru_cache(maxsize)(fn)
+
+    @wraps(fn)
+    def memoized(*args, **kwargs):
+        args = tuple(map(strict, args))
+        kwargs = {k: strict(v) for k, v in kwargs.items()}
+        try:
+            return cached(*args, **kwargs)
+        except TypeError:
+            try:
+                hash((args, tuple(kwargs.values())))
+            except TypeError:
+                # calls with unhashable arguments are not cached
+                return fn(*args, **kwargs)
+            raise
+
+    memoized.cache_info = cached.cache_info
+    memoized.cache_clear = cached.cache_clear
+    return memoized
+
+
+def _stream(comprehension):
+    """Wrap a list comprehension or generator expression so that calling it
+    returns a lazy list.
+
+    Parameters
+    ----------
+    comprehension : function
+        The function implementing the comprehension. This must return a
+        generator.
+
+    Returns
+    -------
+    stream : function
+        A function which returns a ``lazy.data.L`` of the elements that
+        ``comprehension`` yields. Elements are only produced when the list
+        is indexed or iterated.
+    """
+    @wraps(comprehension)
+    def stream(iterator):
+        return _from_iter(comprehension(iterator))
+
+    return stream
+
+
+# The transformed functions which may be inlined into their callers.
+_inlinable = WeakSet()
+
+
+def _may_inline(f):
+    """Check the properties of a function which prevent inlining no matter
+    what its body does.
+
+    Parameters
+    ----------
+    f : function
+        The function before being transformed.
+
+    Returns
+    -------
+    may_inline : bool
+        False if ``f`` is a generator or coroutine, uses a closure, or
+        refers to its own name.
+    """
+    code = f.__code__
+    return not (
+        code.co_flags & (CO_GENERATOR | CO_COROUTINE | CO_ASYNC_GENERATOR) or
+        code.co_freevars or
+        code.co_cellvars or
+        f.__name__ in code.co_names
+    )
+
+
+def _inline_guard(expected, inlined, box):
+    """Create the function which boxes the value loaded for a global that
+    was inlinable when the caller was transformed.
+
+    Parameters
+    ----------
+    expected : any
+        The value bound to the global when the caller was transformed.
+    inlined : function
+        The transformed function to call directly.
+    box : callable
+        The function used to box the value when the global is rebound.
+
+    Returns
+    -------
+    guard : callable
+        A function which returns ``inlined`` if the loaded value is still
+        ``expected``, otherwise ``box(value)``.
+    """
+    def guard(value):
+        if value is expected:
+            # Calling the transformed function directly builds the
+            # callee's expression in the caller.
+            return inlined
+        return box(value)
+
+    return guard
+
+
+def _inlined_global(globals_, name, box):
+    """Create the guard for loading a global which is bound to an inlinable
+    lazy function.
+
+    Parameters
+    ----------
+    globals_ : dict
+        The globals of the function being transformed.
+    name : str
+        The name of the global.
+    box : callable
+        The function used to box the value when the global is rebound.
+
+    Returns
+    -------
+    guard : callable or None
+        The guard or None if ``name`` cannot be inlined.
+    """
+    try:
+        expected = globals_[name]
+    except KeyError:
+        return None
+
+    fn = expected
+    if isinstance(fn, thunk):
+        children = get_children(fn)
+        if len(children) != 1:
+            return None
+        fn, = children
+
+    if not (isinstance(fn, FunctionType) and fn in _inlinable):
+        return None
+
+    return _inline_guard(expected, fn, box)
+
+
+# The types whose operations are pure and cannot be overridden.
+_foldable_types = frozenset({
+    bool,
+    bytes,
+    complex,
+    float,
+    int,
+    str,
+    type(None),
+})
+
+# The largest folded results, like the limits of CPython's own constant
+# folding. Larger values are computed when the function is called.
+_fold_max_bits = 128
+_fold_max_len = 4096
+
+
+def _is_foldable(value):
+    if type(value) in (tuple, frozenset):
+        return all(map(_is_foldable, value))
+    return type(value) in _foldable_types
+
+
+def _fold(func, *args):
+    """Compute an operation on constants.
+
+    Parameters
+    ----------
+    func : callable
+        The operation from the ``operator`` module.
+    *args
+        The operands.
+
+    Returns
+    -------
+    folded : bool
+        Was the operation folded?
+    value : any
+        The result of the operation if it was folded.
+    """
+    if not all(map(_is_foldable, args)):
+        return False, None
+
+    if len(args) == 2:
+        a, b = args
+        if type(a) in (str, bytes) and func is op.mod:
+            # formatting can build arbitrarily large strings
+            return False, None
+        if isinstance(a, int) and isinstance(b, int) and (
+                (func is op.pow and a.bit_length() * b > _fold_max_bits) or
+                (func is op.lshift and a.bit_length() + b > _fold_max_bits)):
+            return False, None
+        if func is op.mul:
+            if isinstance(b, (str, bytes, tuple)):
+                a, b = b, a
+            if (isinstance(a, (str, bytes, tuple)) and
+                    isinstance(b, int) and
+                    len(a) * b > _fold_max_len):
+                return False, None
+
+    try:
+        value = func(*args)
+    except Exception:
+        # raise the error when the function is called
+        return False, None
+
+    if isinstance(value, (str, bytes, tuple)) and len(value) > _fold_max_len:
+        return False, None
+    return True, value
+
+
+def _box_defaults(fn, f, box, known=()):
+    """Copy the default arguments of a strict function onto its transformed
+    version.
+
+    Parameters
+    ----------
+    fn : function
+        The transformed function.
+    f : function
+        The strict function.
+    box : callable
+        The function used to box each default.
+    known : container[str], optional
+        The arguments which were removed from ``fn``.
+    """
+    code = f.__code__
+    defaults = f.__defaults__ or ()
+    names = code.co_varnames[code.co_argcount - len(defaults):]
+    fn.__defaults__ = tuple(
+        box(value)
+        for name, value in zip(names, defaults)
+        if name not in known
+    ) or None
+    fn.__kwdefaults__ = {
+        name: box(value)
+        for name, value in (f.__kwdefaults__ or {}).items()
+        if name not in known
+    } or None
+
+
+class _LazyFunction(metaclass=ABCMeta):
+    """
+    Transform a strict python function into a lazy function.
+
+    Parameters
+    ----------
+    f : function
+        The function to transform.
+    memoize : int, optional
+        The maximum number of results to cache. When a call to the
+        function is forced, the normal form of the arguments is used to
+        look up the result from a previous call. The cache is exposed
+        with ``cache_info`` and ``cache_clear`` like
+        ``functools.lru_cache``. By default results are not cached.
+    inline : bool, optional
+        Inline calls to small lazy functions. When a global that is
+        bound to a small, non-recursive lazy function is called, the
+        callee's expression is built directly in this function instead
+        of deferring a call. If the global is rebound, the call is
+        deferred like normal.
+
+    Notes
+    -----
+    When ``f`` is not passed, this returns a decorator, for example:
+    ``@lazy_function(memoize=128)``.
+
+    List comprehensions and generator expressions evaluate to a
+    ``lazy.data.L`` which produces its elements on demand, so
+    ``[f(x) for x in xs][:10]`` only builds ten elements. Passing the
+    list to another lazy call forces the whole list.
+
+    On Python 3.8 and newer the function is transformed from its source
+    code, so it must be defined in a source file which has not changed
+    since it was imported. Functions defined with ``exec`` or in the
+    interactive interpreter raise a ``TypeError``.
+    """
+    __name__ = 'lazy_function'
+
+    # The subclass of thunk used to box all expressions.
+    _thunk_type = thunk
+
+    # Should the top level value decorated be a thunk?
+    _box_functions = True
+
+    # transformed function -> (strict function, inline, known arguments)
+    _originals = WeakKeyDictionary()
+
+    @abstractmethod
+    def _transform_function(self, f, inline, known):
+        """Transform a strict function. Each backend implements this.
+
+        Parameters
+        ----------
+        f : function
+            The function to transform.
+        inline : bool
+            Should calls to small lazy functions be inlined?
+        known : dict[str -> any]
+            The arguments to bind to constants.
+
+        Returns
+        -------
+        fn : function
+            The transformed function with its defaults boxed.
+        inlinable : bool
+            Can calls to ``fn`` be inlined into other lazy functions?
+        """
+
+    def __call__(self, f=None, *, memoize=None, inline=False):
+        if f is None:
+            return partial(self, memoize=memoize, inline=inline)
+
+        return self._make(f, memoize, inline, {})
+
+    def _make(self, f, memoize, inline, known):
+        fn, inlinable = self._transform_function(f, inline, known)
+        self._originals[fn] = f, inline, known
+        if memoize is not None:
+            fn = _memoize(fn, memoize)
+        elif inlinable:
+            _inlinable.add(fn)
+        if self._box_functions:
+            fn = self._thunk_type.fromexpr(fn)
+        return fn
+
+    def specialize(self, fn, **known):
+        """Create a version of a lazy function with some of its arguments
+        bound to constants.
+
+        Parameters
+        ----------
+        fn : function
+            A function created with this decorator.
+        **known
+            The values of the arguments to bind.
+
+        Returns
+        -------
+        specialized : function
+            The lazy function without the arguments in ``known``.
+
+        Raises
+        ------
+        TypeError
+            Raised when ``fn`` was not created with this decorator or when
+            an argument in ``known`` cannot be bound.
+
+        Examples
+        --------
+        >>> @lazy_function
+        ... def scale(xs, factor):
+        ...     return xs * (factor ** 2 + 1)
+        >>> scale_by_5 = specialize(scale, factor=2)
+        >>> strict(scale_by_5(3))
+        15
+
+        Notes
+        -----
+        Operations from the ``operator`` module on known values and other
+        constants of the builtin immutable types are computed once, here,
+        instead of building a thunk on every call. The known values are
+        boxed once instead of on every call.
+
+        The result of ``fn`` is not memoized, even if ``fn`` was.
+        """
+        if isinstance(fn, thunk):
+            children = get_children(fn)
+            if len(children) == 1:
+                fn, = children
+
+        if isinstance(fn, FunctionType):
+            fn = unwrap(fn, stop=lambda f: f in self._originals)
+        try:
+            f, inline, previous = self._originals[fn]
+        except (KeyError, TypeError):
+            raise TypeError(
+                'cannot specialize %s objects, expected a function'
+                ' created with lazy_function' % type(fn).__name__,
+            )
+
+        code = f.__code__
+        arguments = code.co_varnames[
+            :code.co_argcount + code.co_kwonlyargcount
+        ]
+        for name in known:
+            if name not in arguments or name in previous:
+                raise TypeError(
+                    '%s() has no argument %r that can be specialized' % (
+                        f.__name__,
+                        name,
+                    ),
+                )
+
+        return self._make(f, None, inline, dict(previous, **known))
@@ -2,9 +2,8 @@ from functools import reduce, partial
 from itertools import chain
 import operator as op
 
-from codetransformer.utils.immutable import immutable
-
 from ._thunk import thunk, get_children
+from .utils import immutable
 
 
 _leaves = op.methodcaller('leaves')
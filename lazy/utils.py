@@ -1,5 +1,7 @@
 from uuid import uuid4
 
+from lazy._thunk import thunk, get_children
+
 
 def safesetattr(obj, attr, value):
     """
@@ -54,3 +56,73 @@ def instance(cls):
     Class decorator for creating single instances.
     """
     return cls()
+
+
+def is_pending(ob):
+    """
+    Is ``ob`` a thunk whose call can be evaluated from its children?
+
+    This is false for thunks in normal form and for thunk subclasses that
+    define their own evaluation with ``__strict__``.
+    """
+    return (
+        isinstance(ob, thunk) and
+        len(get_children(ob)) == 3 and
+        (type(ob) is thunk or not hasattr(type(ob), '__strict__'))
+    )
+
+
+class immutable:
+    """A base class for objects whose ``__slots__`` are set once by
+    ``__init__``.
+
+    The slots may be passed positionally, in order, or by name. Subclasses
+    get a namedtuple-like repr.
+    """
+    __slots__ = ()
+
+    def __init__(self, *args, **kwargs):
+        slots = type(self).__slots__
+        if len(args) > len(slots):
+            raise TypeError(
+                '%s() takes %d arguments but %d were given' % (
+                    type(self).__name__,
+                    len(slots),
+                    len(args),
+                ),
+            )
+
+        values = dict(zip(slots, args))
+        for name, value in kwargs.items():
+            if name not in slots or name in values:
+                raise TypeError(
+                    '%s() got an unexpected or repeated argument %r' % (
+                        type(self).__name__,
+                        name,
+                    ),
+                )
+            values[name] = value
+
+        missing = [name for name in slots if name not in values]
+        if missing:
+            raise TypeError(
+                '%s() missing arguments: %s' % (
+                    type(self).__name__,
+                    ', '.join(missing),
+                ),
+            )
+
+        for name, value in values.items():
+            safesetattr(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('cannot mutate immutable object')
+
+    def __repr__(self):
+        return '%s(%s)' % (
+            type(self).__name__,
+            ', '.join(
+                '%s=%r' % (name, getattr(self, name))
+                for name in type(self).__slots__
+            ),
+        )
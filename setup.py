@@ -40,6 +40,6 @@ setup(
         ),
     ],
     install_requires=[
-        'codetransformer>=0.4.4',
+        'codetransformer>=0.4.4; python_version < "3.8"',
     ],
 )